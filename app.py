@@ -1,10 +1,8 @@
 import streamlit as st
 import json
 from pathlib import Path
-import subprocess
 import os
 import sys
-import time
 from datetime import datetime
 
 # --- 1. CONFIGURACIÓN INICIAL ---
@@ -44,7 +42,6 @@ try:
 except:
     pass
 
-PIPELINE_SCRIPT = ROOT_DIR / "scripts" / "pipeline_run.py"
 GATE_REPORT  = ROOT_DIR / "ops" / "gate_report.json"
 DQ_REPORT    = ROOT_DIR / "data" / "dq_report.json"
 XBRL_FILE    = ROOT_DIR / "xbrl" / "informe.xbrl"
@@ -53,53 +50,75 @@ MANIFEST     = ROOT_DIR / "evidence" / "evidence_manifest.json"
 
 DIRS = ["data/normalized", "ops", "raga", "xbrl", "evidence", "eee", "ontology"]
 
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+import dashboard_data as dd
+import pipeline_jobs as jobs
+
 # --- 4. FUNCIONES DE UTILIDAD ---
 
 def ensure_dirs():
     for d in DIRS:
         (ROOT_DIR / d).mkdir(parents=True, exist_ok=True)
 
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_json(path: str, mtime_ns: int, size: int):
+    # un parseo por versión del fichero (mtime + tamaño). cache_resource no copia
+    # el objeto en cada rerun (cache_data lo re-deserializaría): tratarlo como solo lectura
+    return dd.parse_json(path)
+
 def get_data_or_fallback(path, fallback_data):
-    """Intenta leer el archivo. Si falla, devuelve el dato de respaldo (DEMO)."""
-    try:
-        if path.exists():
-            content = path.read_text(encoding="utf-8").strip()
-            if content:
-                return json.loads(content)
-    except:
-        pass
+    """Intenta leer el archivo (cacheado). Si falla, devuelve el dato de respaldo (DEMO)."""
+    stamp = dd.file_stamp(path)
+    if stamp is not None:
+        try:
+            data = load_json(str(path), *stamp)
+            if data is not None:
+                return data
+        except:
+            pass
     # Si llegamos aquí, falló la lectura. Usamos respaldo.
     return fallback_data
 
-def run_simulation():
-    """Ejecuta el script real pero asegura la experiencia de usuario."""
-    placeholder = st.empty()
-    with placeholder.container():
-        st.info("🚀 Ejecutando Auditoría...")
-        progress = st.progress(0)
-        
-        # Simulación visual
-        for i in range(1, 101, 20):
-            time.sleep(0.2)
-            progress.progress(i, text=f"Procesando bloque {i}%...")
-        
-        # Ejecución técnica real (silenciosa)
-        try:
-            if PIPELINE_SCRIPT.exists():
-                subprocess.run([sys.executable, str(PIPELINE_SCRIPT)], capture_output=True)
-        except:
-            pass # No interrumpimos la UI si el script falla
-            
-        # Creamos un archivo "testigo" para saber que ya corrió
+def paginator(key: str, total: int) -> int:
+    # selector de página compacto; devuelve la página elegida (desde 1)
+    pages = max(1, -(-total // dd.PAGE_SIZE))
+    if pages == 1:
+        return 1
+    return st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+
+def launch_pipeline():
+    """Lanza el pipeline en segundo plano (no bloquea la UI); si ya hay uno en curso, se muestra ese."""
+    try:
+        jobs.start()
+    except jobs.JobRunning:
+        st.toast("Ya hay una auditoría en curso: se muestra su progreso.")
+
+def render_job(job_id):
+    s = jobs.status(job_id)
+    if not s["done"]:
+        running = ", ".join(s["running"]) or "arrancando"
+        st.progress(s["progress"], text=f"Paso {len(s['finished'])}/{len(s['steps']) or '?'} · {running}")
+    for name, e in s["finished"].items():
+        icon = "♻️" if e.get("cached") else ("✅" if e["ok"] else "⛔")
+        st.caption(f"{icon} {name} ({e['duration_sec']:.2f}s)")
+    if s["done"] and not s["ok"]:
+        failed = [n for n, e in s["finished"].items() if not e["ok"]]
+        st.error(f"Auditoría con errores: {', '.join(failed) or s['error']}")
+        with st.expander("Ver salida"):
+            for n in failed:
+                st.code(s["finished"][n].get("stderr", ""), language=None)
+            st.code(jobs.output(job_id), language=None)
+    return s
+
+@st.fragment(run_every=1.0)
+def job_progress(job_id):
+    # solo este fragmento se re-ejecuta mientras corre el pipeline; al terminar, rerun completo
+    s = render_job(job_id)
+    if s["done"]:
         ensure_dirs()
         if not GATE_REPORT.exists():
             GATE_REPORT.write_text(json.dumps(DEMO_GATE))
-            
-        progress.empty()
-        st.success("✅ Auditoría Completada")
-        time.sleep(0.5)
-    
-    placeholder.empty()
+        st.rerun()
 
 def reset_all():
     ensure_dirs()
@@ -107,6 +126,7 @@ def reset_all():
     if GATE_REPORT.exists():
         GATE_REPORT.unlink()
     st.cache_data.clear()
+    st.cache_resource.clear()
 
 # --- 5. INTERFAZ GRÁFICA ---
 
@@ -115,18 +135,27 @@ with st.sidebar:
     st.header("🛡️ STEELTRACE™")
     st.markdown("---")
     
-    if st.button("▶️ EJECUTAR AUDITORÍA", type="primary", use_container_width=True):
+    active_job = jobs.current()
+    if st.button("▶️ EJECUTAR AUDITORÍA", type="primary", use_container_width=True, disabled=active_job is not None):
         # 1. Aseguramos carpetas
         ensure_dirs()
-        # 2. Corremos simulación/script
-        run_simulation()
-        # 3. Recargamos para mostrar resultados
+        # 2. Lanzamos el pipeline en segundo plano
+        launch_pipeline()
+        # 3. Recargamos: el progreso se sondea sin bloquear
         st.rerun()
 
-    if st.button("🔄 REINICIAR", use_container_width=True):
+    if st.button("🔄 REINICIAR", use_container_width=True, disabled=active_job is not None):
         reset_all()
         st.rerun()
 
+    # progreso de la ejecución en curso (la misma para todas las sesiones) o de la última
+    if active_job is not None:
+        st.info("🚀 Ejecutando Auditoría...")
+        job_progress(active_job)
+    elif jobs.latest() is not None:
+        with st.expander("Última ejecución"):
+            render_job(jobs.latest())
+
     st.markdown("---")
     # Estado basado en si existe el archivo testigo
     state_ok = GATE_REPORT.exists()
@@ -194,13 +223,36 @@ else:
         c1, c2 = st.columns(2)
         c1.metric("Score Calidad", f"{dq.get('dq_score', 0)*100:.0f}%")
         c2.metric("Reglas Ejecutadas", dq.get("rules_executed", 0))
-        with st.expander("Ver Detalle JSON"):
-            st.json(dq)
+        # solo resúmenes y páginas: el reporte completo puede pesar decenas de MB
+        overview = dd.dq_overview(dq)
+        if overview:
+            st.dataframe(overview, hide_index=True)
+            domain = st.selectbox("Dominio", [r["domain"] for r in overview], key="dq_domain")
+            rules = dd.dq_rules(dq, domain)
+            if rules:
+                st.dataframe(rules, hide_index=True)
+            errors = dd.dq_errors(dq, domain)
+            if errors:
+                st.write(f"**Errores de esquema:** {len(errors)}")
+                rows, _ = dd.page(errors, paginator(f"dq_errors_{domain}", len(errors)))
+                st.dataframe([{"index": e.get("index"), "errors": "; ".join(e.get("errors", []))} for e in rows],
+                             hide_index=True)
+            with st.expander("Ver Detalle JSON"):
+                st.json(dd.dq_domain_detail(dq, domain))
+        else:
+            with st.expander("Ver Detalle JSON"):
+                st.json(dq)
 
     with tab2:
         st.write("### Explicabilidad IA")
         st.info("Razonamiento del modelo sobre las normas ESRS.")
-        st.json(explain)
+        query = st.text_input("Filtrar DP", key="explain_query")
+        keys = dd.explain_keys(explain, query)
+        shown, _ = dd.page(keys, paginator("explain_page", len(keys)))
+        st.caption(f"{len(keys)} DPs")
+        for k in shown:
+            with st.expander(k, expanded=len(keys) <= 3):
+                st.json(explain[k])
 
     with tab3:
         st.write("### Paquete Regulatorio")
@@ -0,0 +1,40 @@
+"""
+Modo lote multi-tenant: T tenants sobre los data/samples del repo, cada uno en
+su espacio de trabajo (en frío, sin caché de pasos), con 1, 2, 4... plazas
+simultáneas. Mide el throughput (tenants/hora), el pico de RSS por ejecución y
+la aceleración frente a 1 plaza; debería escalar con el número de núcleos
+hasta que el tope de memoria limite la admisión.
+
+    python benchmarks/bench_batch.py --tenants 8 --workers 1,2,4
+"""
+import argparse, os, shutil, sys, tempfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import batch_run
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tenants", type=int, default=8)
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--max-memory-mb", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    tenants = [f"T{i:03d}" for i in range(args.tenants)]
+    print(f"{args.tenants} tenants, cpus={os.cpu_count()}, tope={args.max_memory_mb or 'sin tope'} MB")
+    print(f"{'workers':>7} {'seconds':>8} {'tenants/h':>10} {'speedup':>8} {'rss_mb':>7} ok")
+    base = None
+    for w in [int(x) for x in args.workers.split(",")]:
+        tmp = Path(tempfile.mkdtemp(prefix="steeltrace_batch_"))
+        try:
+            s = batch_run.run_batch(batch_run.cross(tenants, ["2024-01"]), w, args.max_memory_mb,
+                                    pipeline_args=["--jobs", "1"], root=tmp)
+            base = base or s["wall_sec"]
+            print(f"{w:>7} {s['wall_sec']:>8.1f} {s['tenants_per_hour']:>10.0f} {base / s['wall_sec']:>7.2f}x "
+                  f"{s['peak_rss_mb']:>7.0f} {s['ok'] == s['runs']}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Consola Streamlit con reportes grandes: genera un dq_report.json de ~S MB (errores
+de esquema por registro) y un explain.json con D DPs en un directorio temporal,
+y mide con streamlit.testing (AppTest) la primera carga y cada interacción
+(rerun, cambio de página, filtro de DPs, cambio de dominio). El objetivo es
+< 200 ms por interacción con 50 MB. --baseline mide además el app.py del commit
+indicado (p.ej. HEAD~1) para comparar.
+
+    python benchmarks/bench_dashboard.py --dq-mb 50 --dps 10000
+"""
+import argparse, json, random, shutil, subprocess, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+
+def write_reports(root: Path, dq_mb: int, dps: int, seed: int = 4) -> None:
+    rnd = random.Random(seed)
+    (root / "ops").mkdir(parents=True)
+    (root / "data").mkdir()
+    (root / "raga").mkdir()
+    (root / "evidence").mkdir()
+    (root / "ops" / "gate_report.json").write_text(json.dumps(
+        {"global_decision": "PUBLISH", "eee_score": 0.91, "threshold": 0.8}), encoding="utf-8")
+    (root / "evidence" / "evidence_manifest.json").write_text(json.dumps({"merkle_root": "SHA256:" + "ab" * 32}))
+    rules = {"completeness": [{"rule": {"field": "kwh", "rule": "not_null"}, "pass_rate": 0.99}],
+             "validity": [{"rule": {"field": "kwh", "rule": ">=0"}, "pass_rate": 0.97}]}
+    per_domain = dq_mb * 2**20 // 3 // 72  # ~72 bytes por error
+    domains = {}
+    for d in ("energy", "hr", "ethics"):
+        errors = [{"index": i, "errors": [f"{rnd.random():.6f} is less than the minimum of 0"]}
+                  for i in range(per_domain)]
+        domains[d] = {"source": f"data/samples/{d}.json", "schema": f"contracts/{d}.schema.json",
+                      "records_total": per_domain * 20, "records_valid": per_domain * 19,
+                      "schema_errors": errors,
+                      "dq": {"by_rule": rules, "aggregate": {"completeness": 0.99, "validity": 0.97, "dq_pass": True}}}
+    (root / "data" / "dq_report.json").write_text(json.dumps({"domains": domains, "dq_pass": True}), encoding="utf-8")
+    kpis = ["E1-1.total_co2e_tons", "S1-1.employee_turnover", "G1-1.resolution_rate_pct"]
+    explain = {f"{kpis[i % 3]}@LE{i:05d}/2024-01": {
+        "hypothesis": "Σ(kWh_i * emission_factor_i)/1000", "evidence": ["data/normalized/energy_2024-01.json"],
+        "citations": [{"id": "ESRS_E1_DR1"}], "residual": 0.0} for i in range(dps)}
+    (root / "raga" / "explain.json").write_text(json.dumps(explain, indent=2), encoding="utf-8")
+
+def timed(label: str, fn, rows: list) -> None:
+    t0 = time.perf_counter()
+    at = fn()
+    rows.append((label, (time.perf_counter() - t0) * 1e3, len(at.exception) == 0))
+
+def measure(app: Path, timeout: int) -> list:
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(app), default_timeout=timeout)
+    rows = []
+    timed("primera carga", at.run, rows)
+    timed("rerun", at.run, rows)
+    if at.number_input:
+        at.number_input[0].set_value(3)
+        timed("página errores", at.run, rows)
+    if at.text_input:
+        at.text_input(key="explain_query").set_value("S1-1")
+        timed("filtro DPs", at.run, rows)
+    if at.selectbox:
+        at.selectbox(key="dq_domain").set_value("hr")
+        timed("cambio dominio", at.run, rows)
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dq-mb", type=int, default=50)
+    ap.add_argument("--dps", type=int, default=10_000)
+    ap.add_argument("--baseline", help="commit cuyo app.py se mide también (p.ej. HEAD~1)")
+    ap.add_argument("--timeout", type=int, default=600)
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_app_"))
+    try:
+        write_reports(tmp, args.dq_mb, args.dps)
+        shutil.copytree(REPO / "scripts", tmp / "scripts", ignore=shutil.ignore_patterns("__pycache__"))
+        shutil.copy(REPO / "app.py", tmp / "app.py")
+        apps = [("actual", tmp / "app.py")]
+        if args.baseline:
+            src = subprocess.run(["git", "-C", str(REPO), "show", f"{args.baseline}:app.py"],
+                                 capture_output=True, text=True, check=True).stdout
+            (tmp / "app_baseline.py").write_text(src, encoding="utf-8")
+            apps.append((args.baseline, tmp / "app_baseline.py"))
+        size = (tmp / "data" / "dq_report.json").stat().st_size / 2**20
+        print(f"dq_report.json {size:.0f} MB, explain.json {args.dps} DPs")
+        print(f"{'app':>10} {'interacción':>16} {'ms':>8} ok")
+        for name, app in apps:
+            for label, ms, ok in measure(app, args.timeout):
+                print(f"{name:>10} {label:>16} {ms:>8.0f} {ok}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
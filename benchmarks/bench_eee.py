@@ -0,0 +1,56 @@
+"""
+Escalado del EEE gate por DP: genera N datapoints sintéticos (entidad x periodo x
+KPI) con explicaciones variadas y mide eee_gate.score_dps. El tiempo por DP debe
+mantenerse constante (escalado lineal) hasta 10^5 DPs. Las evidencias se
+comprueban una vez por ruta gracias a cached_exists.
+
+    python benchmarks/bench_eee.py --sizes 1000,10000,100000
+"""
+import argparse, random, sys, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import eee_gate
+
+KPIS = ["E1-1.total_co2e_tons", "S1-1.employee_turnover", "G1-1.resolution_rate_pct", "X9-1.other"]
+
+def synth(n: int, seed: int = 1) -> tuple[dict, dict]:
+    rnd = random.Random(seed)
+    kpis, explain = {}, {}
+    for i in range(n):
+        dp = f"{KPIS[i % len(KPIS)]}@LE{i // 96:05d}/{2023 + (i // 4) % 24 // 12}-{(i // 4) % 12 + 1:02d}"
+        kpis[dp] = rnd.random()
+        explain[dp] = {
+            "hypothesis": "h" if rnd.random() > 0.02 else "",
+            "evidence": [f"data/normalized/energy_{2023 + (i // 4) % 24 // 12}.json", "ontology/validation.log"]
+                        if rnd.random() > 0.05 else [],
+            "citations": [{"id": "ESRS_E1_DR1"}] if rnd.random() > 0.1 else [],
+            "residual": rnd.choice([0.0, 0.005, 0.03, 0.2]),
+        }
+    return kpis, explain
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    args = ap.parse_args(argv)
+    cfg = eee_gate.load_yaml(REPO / "ops" / "eee_gate.yaml")
+
+    print(f"{'dps':>8} {'seconds':>8} {'us/dp':>7} {'disk_checks':>11} {'publish':>8} {'review':>7} {'block':>6}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        kpis, explain = synth(n)
+        calls = []
+        check = eee_gate.cached_exists()
+        def counted(p, _check=check):
+            calls.append(p)
+            return _check(p)
+        t0 = time.perf_counter()
+        details = eee_gate.score_dps(kpis, explain, cfg, counted)
+        dt = time.perf_counter() - t0
+        # rutas distintas = comprobaciones reales de disco (el resto sale de la caché)
+        counts = {k: sum(1 for d in details if d["decision"] == k) for k in ("publish", "review", "block")}
+        print(f"{n:>8} {dt:>8.3f} {dt / n * 1e6:>7.1f} {len(set(calls)):>11} "
+              f"{counts['publish']:>8} {counts['review']:>7} {counts['block']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Hash SHA-256 de artefactos: Path.read_bytes() (camino original de merkle) frente
+a lectura en flujo con buffer fijo, mmap y hash en paralelo de varios ficheros
+(utils_hash.sha256_files). Cada modo corre en un proceso hijo para medir su pico
+de RSS; se informa el throughput en GB/s.
+
+    python benchmarks/bench_hash.py --files 4 --size-mb 512
+"""
+import argparse, hashlib, json, os, resource, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+MODES = ["read_bytes", "buffered", "mmap", "parallel"]
+
+def child(mode: str, paths: list[str]) -> None:
+    import utils_hash
+    t0 = time.perf_counter()
+    if mode == "read_bytes":
+        out = {p: hashlib.sha256(Path(p).read_bytes()).hexdigest() for p in paths}
+    elif mode == "parallel":
+        out = utils_hash.sha256_files(paths)
+    else:
+        out = {p: utils_hash.sha256_file(p, use_mmap=mode == "mmap") for p in paths}
+    dt = time.perf_counter() - t0
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+    print(json.dumps({"seconds": dt, "rss_mb": rss_mb, "digest": hashlib.sha256("".join(out[p] for p in paths).encode()).hexdigest()}))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=4)
+    ap.add_argument("--size-mb", type=int, default=512, help="tamaño de cada fichero")
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        return child(args.child[0], args.child[1:])
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_hash_"))
+    try:
+        paths = []
+        for i in range(args.files):
+            p = tmp / f"extract_{i}.bin"
+            with open(p, "wb") as f:
+                for _ in range(args.size_mb):
+                    f.write(os.urandom(1 << 20))
+            paths.append(str(p))
+        total = args.files * args.size_mb * 2**20
+        print(f"{args.files} ficheros x {args.size_mb} MB, {os.cpu_count()} CPUs")
+        print(f"{'mode':>11} {'seconds':>8} {'GB/s':>6} {'peak_rss_mb':>12} digest")
+        for mode in args.modes.split(","):
+            proc = subprocess.run([sys.executable, __file__, "--child", mode, *paths],
+                                  capture_output=True, text=True, check=True)
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{mode:>11} {r['seconds']:>8.2f} {total / r['seconds'] / 1e9:>6.2f} "
+                  f"{r['rss_mb']:>12.0f} {r['digest'][:12]}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Escalado de mcp_ingest.run_ingest con el número de procesos: genera N shards
+sintéticos del feed de energía (uno por planta) en un directorio temporal y
+mide registros/s para cada valor de --workers. Comprueba además que el
+reporte DQ es idéntico para todos los tamaños de pool.
+
+    python benchmarks/bench_ingest_scaling.py --shards 16 --rows 200000 --workers 1,2,4,8
+"""
+import argparse, json, os, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import mcp_ingest
+
+def write_shard(path: Path, rows: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(rows):
+            f.write(("" if i == 0 else ",\n") + json.dumps({
+                "company_id": f"SITE{seed:03d}",
+                "period_start": "2024-01-01",
+                "period_end": "2024-01-31",
+                "kwh": round(rnd.uniform(0, 50000), 2) if rnd.random() > 0.005 else -1,
+                "emission_factor_co2e": 0.23,
+                "source_system": "erp_v2",
+            }))
+        f.write("\n]\n")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shards", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=100_000, help="filas por shard")
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--stream", action="store_true")
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_bench_"))
+    cwd = os.getcwd()
+    try:
+        shutil.copytree(REPO / "contracts", tmp / "contracts")
+        (tmp / "data" / "samples").mkdir(parents=True)
+        for s in range(args.shards):
+            write_shard(tmp / "data" / "samples" / f"energy_2024-01.site{s:03d}.json", args.rows, s)
+        os.chdir(tmp)
+        samples = {"energy": {
+            "input": "data/samples/energy_2024-01.site*.json",
+            "schema": "contracts/erp_energy.schema.json",
+            "normalized": "data/normalized/energy_2024-01.json",
+        }}
+        rules = mcp_ingest.load_yaml(mcp_ingest.DQ_RULES_FILE)
+        total = args.shards * args.rows
+
+        print(f"{args.shards} shards x {args.rows} filas = {total} registros (cpus={os.cpu_count()})")
+        print(f"{'workers':>8} {'seconds':>8} {'rec/s':>10} {'speedup':>8} same_report")
+        base_t, base_report = None, None
+        for w in [int(x) for x in args.workers.split(",")]:
+            t0 = time.perf_counter()
+            _, summary, _ = mcp_ingest.run_ingest(samples, rules, workers=w, stream=args.stream)
+            dt = time.perf_counter() - t0
+            base_t = base_t or dt
+            base_report = base_report or summary
+            print(f"{w:>8} {dt:>8.2f} {total / dt:>10.0f} {base_t / dt:>7.2f}x {summary == base_report}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+KPIs por (company_id, period): acumulación fila a fila en dicts de Python frente
+al group-by vectorizado de kpi_engine, sobre datos sintéticos de E entidades x P
+periodos (varias filas de energía por celda, una de RRHH y una de ética).
+Comprueba que ambas tablas coinciden.
+
+    python benchmarks/bench_kpis.py --entities 1000 --periods 24 --energy-rows 8
+"""
+import argparse, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import numpy as np
+import kpi_engine
+
+def synth(entities: int, periods: int, energy_rows: int, seed: int = 11) -> dict:
+    rnd = random.Random(seed)
+    months = [f"{2023 + m // 12}-{m % 12 + 1:02d}" for m in range(periods)]
+    energy, hr, ethics = [], [], []
+    for e in range(entities):
+        cid = f"LE{e:05d}"
+        for m in months:
+            for _ in range(energy_rows):
+                energy.append({"company_id": cid, "period_start": f"{m}-01", "period_end": f"{m}-28",
+                               "kwh": round(rnd.uniform(0, 50000), 2),
+                               "emission_factor_co2e": rnd.choice([0.201, 0.231, 0.25])})
+            start = rnd.randint(20, 5000)
+            hr.append({"company_id": cid, "period": m, "employees_start": start,
+                       "employees_end": start + rnd.randint(-10, 10), "exits": rnd.randint(0, 30)})
+            closed = rnd.randint(0, 20)
+            ethics.append({"company_id": cid, "period": m, "cases_opened": closed + rnd.randint(0, 5),
+                           "cases_closed": closed, "closed_with_resolution": rnd.randint(0, closed)})
+    return {"energy": energy, "hr": hr, "ethics": ethics}
+
+def rowwise(data: dict) -> dict:
+    cells = {}
+    def cell(cid, period):
+        return cells.setdefault((cid, period), dict.fromkeys(kpi_engine.PARTIALS, 0.0))
+    for r in data["energy"]:
+        cell(r["company_id"], r["period_start"][:7])["co2e_kg"] += r["kwh"] * r.get("emission_factor_co2e", 0.23)
+    for r in data["hr"]:
+        c = cell(r["company_id"], r["period"])
+        c["exits"] += r["exits"]
+        c["avg_employees"] += (r["employees_start"] + r["employees_end"]) / 2
+    for r in data["ethics"]:
+        c = cell(r["company_id"], r["period"])
+        c["cases_closed"] += r["cases_closed"]
+        c["closed_with_resolution"] += r["closed_with_resolution"]
+    out = {}
+    for key, c in cells.items():
+        out[key] = (round(c["co2e_kg"] / 1000.0, 3),
+                    round(c["exits"] / (c["avg_employees"] or 1), 4),
+                    round(c["closed_with_resolution"] / (c["cases_closed"] or 1) * 100, 2))
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entities", type=int, default=1000)
+    ap.add_argument("--periods", type=int, default=24)
+    ap.add_argument("--energy-rows", type=int, default=4, help="filas de energía por entidad y periodo")
+    args = ap.parse_args(argv)
+
+    data = synth(args.entities, args.periods, args.energy_rows)
+    n = sum(len(v) for v in data.values())
+
+    t0 = time.perf_counter()
+    ref = rowwise(data)
+    t1 = time.perf_counter()
+    table = kpi_engine.kpi_table(kpi_engine.partials(data))
+    t2 = time.perf_counter()
+
+    got = table.set_index(kpi_engine.KEYS)[kpi_engine.KPI_COLUMNS]
+    exp = np.array([ref[k] for k in got.index])
+    # np.round y round() pueden diferir en empates: tolerancia de una unidad del último decimal
+    unit = np.array([1e-3, 1e-4, 1e-2]) * 1.000001
+    equal = len(ref) == len(got) and bool((np.abs(got.to_numpy() - exp) <= unit).all())
+    print(f"{args.entities} entidades x {args.periods} periodos = {len(ref)} celdas, {n} registros")
+    print(f"{'rowwise_s':>10} {'grouped_s':>10} {'speedup':>8} equal")
+    print(f"{t1 - t0:>10.2f} {t2 - t1:>10.2f} {(t1 - t0) / (t2 - t1):>7.1f}x {equal}")
+
+if __name__ == "__main__":
+    main()
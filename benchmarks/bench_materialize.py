@@ -0,0 +1,76 @@
+"""
+Materialización del linaje RDF E1: g.add triple a triple + Turtle con prefijos
+(camino original) frente a addN por lotes + N-Triples, y frente a escribir los
+triples en flujo sin construir el grafo. Cada modo se ejecuta en un proceso
+hijo para medir su pico de RSS por separado.
+
+    python benchmarks/bench_materialize.py --sizes 100000,1000000
+"""
+import argparse, json, random, resource, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+MODES = ["add+turtle", "addN+nt", "stream+nt"]
+
+def write_records(path: Path, n: int, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "company_id": f"SITE{rnd.randrange(50):03d}",
+                "period_start": "2024-01-01",
+                "period_end": "2024-01-31",
+                "kwh": f"{rnd.uniform(0, 50000):.2f}",
+                "emission_factor_co2e": 0.23,
+            }) + "\n")
+
+def child(mode: str, data: Path, out: Path) -> None:
+    from rdflib import Graph
+    import shacl_validate as sv
+    t0 = time.perf_counter()
+    if mode == "stream+nt":
+        with open(out, "w", encoding="utf-8") as f:
+            sv.write_ntriples(f, sv.e1_triples(data))
+    else:
+        g = Graph()
+        if mode == "add+turtle":
+            for t in sv.e1_triples(data):
+                g.add(t)
+            g.serialize(destination=out, format="turtle")
+        else:
+            sv.materialize_e1(g, data)
+            with open(out, "w", encoding="utf-8") as f:
+                sv.write_ntriples(f, g)
+    dt = time.perf_counter() - t0
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+    print(json.dumps({"seconds": dt, "rss_mb": rss_mb, "bytes": out.stat().st_size}))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="100000,1000000")
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--child", nargs=3, metavar=("MODE", "DATA", "OUT"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    if args.child:
+        mode, data, out = args.child
+        return child(mode, Path(data), Path(out))
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_rdf_"))
+    print(f"{'records':>9} {'mode':>11} {'seconds':>8} {'peak_rss_mb':>12} {'out_mb':>8}")
+    try:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            data = tmp / f"energy_{n}.ndjson"
+            write_records(data, n)
+            for mode in args.modes.split(","):
+                out = tmp / f"linaje_{n}.ttl"
+                proc = subprocess.run([sys.executable, __file__, "--child", mode, str(data), str(out)],
+                                      capture_output=True, text=True, check=True)
+                r = json.loads(proc.stdout.strip().splitlines()[-1])
+                print(f"{n:>9} {mode:>11} {r['seconds']:>8.2f} {r['rss_mb']:>12.0f} {r['bytes'] / 2**20:>8.1f}")
+                out.unlink()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
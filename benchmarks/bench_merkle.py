@@ -0,0 +1,48 @@
+"""
+Árbol Merkle persistente (merkle.MerkleTree) con N hojas: construcción en disco,
+actualización de una hoja (solo su camino) frente a recalcular la raíz completa
+con merkle_root_from_hashes, pruebas de inclusión y verificación autónoma
+(merkle_verify.verify_proof). Comprueba que ambas raíces coinciden.
+
+    python benchmarks/bench_merkle.py --leaves 1000000
+"""
+import argparse, hashlib, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import merkle, merkle_verify
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--leaves", type=int, default=1_000_000)
+    ap.add_argument("--proofs", type=int, default=1000)
+    args = ap.parse_args(argv)
+    rnd = random.Random(5)
+    hashes = [hashlib.sha256(i.to_bytes(8, "little")).hexdigest() for i in range(args.leaves)]
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_merkle_"))
+    try:
+        t0 = time.perf_counter()
+        tree = merkle.MerkleTree(tmp / "tree")
+        tree.append(hashes)
+        t1 = time.perf_counter()
+        i = rnd.randrange(args.leaves)
+        hashes[i] = hashlib.sha256(b"corregido").hexdigest()
+        tree.update({i: hashes[i]})
+        root = tree.root()
+        t2 = time.perf_counter()
+        full = merkle.merkle_root_from_hashes(hashes)
+        t3 = time.perf_counter()
+        idx = [rnd.randrange(args.leaves) for _ in range(args.proofs)]
+        proofs = [tree.proof(j) for j in idx]
+        t4 = time.perf_counter()
+        ok = all(merkle_verify.verify_proof(hashes[j], j, p, root) for j, p in zip(idx, proofs))
+        t5 = time.perf_counter()
+        print(f"{args.leaves} hojas, profundidad {len(tree.counts) - 1}")
+        print(f"{'build_s':>8} {'update1_ms':>10} {'full_root_s':>11} {'proof_us':>8} {'verify_us':>9} equal verified")
+        print(f"{t1 - t0:>8.2f} {(t2 - t1) * 1e3:>10.2f} {t3 - t2:>11.2f} {(t4 - t3) / args.proofs * 1e6:>8.1f} "
+              f"{(t5 - t4) / args.proofs * 1e6:>9.1f} {root == full} {ok}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Formato de los normalizados: array JSON con indent=2 (utils_hash.write_json,
+formato original), NDJSON (mcp_ingest --stream) y Parquet tipado
+(normalized_store), sobre datos sintéticos de E entidades x P periodos. Mide
+escritura, tamaño en disco y las lecturas de aguas abajo: sumas parciales de
+KPIs (kpi_engine.load_partials, con proyección en Parquet), iteración de
+registros con las columnas de SHACL y, solo en Parquet, lectura de dos columnas
+y filtro por entidad. Comprueba que los KPIs coinciden en los tres formatos y
+que un registro con una fecha imposible (2024-01-32, que el contrato no rechaza)
+pasa por mcp_ingest.py en Parquet con el mismo dq_report que en --format json.
+
+    python benchmarks/bench_normalized.py --entities 2000 --periods 24 --energy-rows 8
+"""
+import argparse, json, os, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import kpi_engine, normalized_store
+from jsonstream import iter_records, write_ndjson
+from utils_hash import write_json
+from bench_kpis import synth
+
+CONTRACTS = {"energy": "erp_energy", "hr": "hr_people", "ethics": "ethics_cases"}
+SHACL_COLUMNS = {
+    "energy": ["company_id", "period_start", "period_end", "kwh", "emission_factor_co2e"],
+    "hr": ["company_id", "period", "employees_start", "employees_end", "exits"],
+    "ethics": ["company_id", "period", "cases_opened", "cases_closed", "closed_with_resolution"],
+}
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+def write_all(fmt: str, root: Path, data: dict, schemas: dict) -> list[Path]:
+    root.mkdir()
+    paths = []
+    for domain, rows in data.items():
+        if fmt == "parquet":
+            p = root / f"{domain}_2024-01.parquet"
+            normalized_store.write(p, normalized_store.coerce(rows, schemas[domain]), schemas[domain])
+        elif fmt == "ndjson":
+            p = root / f"{domain}_2024-01.ndjson"
+            with open(p, "w", encoding="utf-8") as f:
+                write_ndjson(f, rows)
+        else:
+            p = root / f"{domain}_2024-01.json"
+            write_json(p, rows)
+        paths.append(p)
+    return paths
+
+def check_invalid_date(tmp: Path) -> None:
+    # la fecha imposible la puntúa la regla DQ is_date; no debe abortar la escritura del Parquet
+    ws = tmp / "ingest"
+    shutil.copytree(REPO / "contracts", ws / "contracts")
+    shutil.copytree(REPO / "data" / "samples", ws / "data" / "samples")
+    sample = ws / "data" / "samples" / "energy_2024-01.json"
+    rows = json.loads(sample.read_text(encoding="utf-8"))
+    rows.append({**rows[0], "period_start": "2024-01-32"})
+    sample.write_text(json.dumps(rows), encoding="utf-8")
+    reports = {}
+    for args in (["--format", "json"], ["--format", "parquet"], ["--format", "json", "--stream"],
+                 ["--format", "parquet", "--stream"]):
+        subprocess.run([sys.executable, str(REPO / "scripts" / "mcp_ingest.py"), *args], cwd=ws, check=True,
+                       stdout=subprocess.DEVNULL, env={**os.environ, "PYTHONPATH": str(REPO / "scripts")})
+        reports[" ".join(args)] = json.loads((ws / "data" / "dq_report.json").read_text(encoding="utf-8"))
+    ref = reports["--format json"]
+    validity = ref["domains"]["energy"]["dq"]["aggregate"]["validity"]
+    if validity >= 1 or ref["dq_pass"]:
+        raise SystemExit("fecha imposible: la regla is_date no la ha puntuado")
+    for name, report in reports.items():
+        if report != ref:
+            raise SystemExit(f"fecha imposible: dq_report de {name} distinto de --format json")
+    print(f"fecha imposible: mismo dq_report en json/parquet (validez energía {validity})")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entities", type=int, default=2000)
+    ap.add_argument("--periods", type=int, default=24)
+    ap.add_argument("--energy-rows", type=int, default=8)
+    args = ap.parse_args(argv)
+
+    data = synth(args.entities, args.periods, args.energy_rows)
+    for rows in data.values():
+        for r in rows:
+            r["source_system"] = "erp_v2"
+    schemas = {d: json.loads((REPO / "contracts" / f"{c}.schema.json").read_text(encoding="utf-8"))
+               for d, c in CONTRACTS.items()}
+    n = sum(len(v) for v in data.values())
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_normalized_"))
+    try:
+        check_invalid_date(tmp)
+        print(f"{n:,} registros ({len(data['energy']):,} de energía)")
+        print(f"{'formato':>8} {'escritura_s':>11} {'MB':>7} {'kpis_s':>7} {'registros_s':>11}")
+        ref = None
+        for fmt in ("json", "ndjson", "parquet"):
+            root = tmp / fmt
+            t_write, paths = timed(lambda: write_all(fmt, root, data, schemas))
+            mb = sum(p.stat().st_size for p in paths) / 2**20
+            t_kpis, parts = timed(lambda: kpi_engine.load_partials(root))
+            table = kpi_engine.kpi_table(parts)
+            if ref is None:
+                ref = table
+            elif not table[kpi_engine.KPI_COLUMNS].equals(ref[kpi_engine.KPI_COLUMNS]):
+                raise SystemExit(f"{fmt}: KPIs distintos de json")
+            t_recs, _ = timed(lambda: [sum(1 for _ in iter_records(p, columns=SHACL_COLUMNS[d]))
+                                       for d, p in zip(data, paths)])
+            print(f"{fmt:>8} {t_write:>11.2f} {mb:>7.1f} {t_kpis:>7.2f} {t_recs:>11.2f}")
+
+        energy = tmp / "parquet" / "energy_2024-01.parquet"
+        t_load, _ = timed(lambda: json.loads((tmp / "json" / "energy_2024-01.json").read_text(encoding="utf-8")))
+        t_proj, _ = timed(lambda: normalized_store.read_table(energy, ["company_id", "kwh"]))
+        t_filt, t = timed(lambda: normalized_store.read_table(energy, filters=[("company_id", "=", "LE00000")]))
+        print(f"energía: json.loads completo {t_load:.2f}s · Parquet 2 columnas {t_proj:.3f}s · "
+              f"Parquet una entidad {t_filt:.3f}s ({t.num_rows} filas)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
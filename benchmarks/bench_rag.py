@@ -0,0 +1,90 @@
+"""
+Citas RAG sobre un corpus sintético grande: cite() y search() originales
+(parseo de index.jsonl en cada llamada, regex sin compilar por línea) frente al
+índice binario mapeado en memoria de rag_index (mapa de ids + índice invertido).
+
+    python benchmarks/bench_rag.py --passages 50000 --queries 200
+"""
+import argparse, json, random, re, shutil, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import rag_index
+
+WORDS = ("clima emisiones energía plantilla rotación empleados conducta denuncia resolución "
+         "biodiversidad agua residuos gobernanza metas políticas riesgos cadena valor").split()
+STANDARDS = ["E1", "E2", "E3", "E4", "E5", "S1", "S2", "S3", "S4", "G1"]
+
+def write_corpus(path: Path, n: int, seed: int = 3) -> list[str]:
+    rnd = random.Random(seed)
+    ids = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            std = STANDARDS[i % len(STANDARDS)]
+            id_ = f"ESRS_{std}_DR{i}"
+            ids.append(id_)
+            f.write(json.dumps({
+                "id": id_, "title": f"ESRS {std} - DR{i}", "jurisdiction": "EU",
+                "valid_from": "2023-07-31", "valid_to": None, "source": "EU 2023/2772",
+                "snippet": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(8, 30))),
+            }, ensure_ascii=False) + "\n")
+    return ids
+
+def cite_jsonl(path: Path, ids: list[str]):
+    idx = [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()]
+    by_id = {x["id"]: x for x in idx}
+    return [by_id[i] for i in ids if i in by_id]
+
+def search_jsonl(path: Path, query: str, limit=5):
+    items = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        obj = json.loads(line)
+        if (query.lower() in obj["id"].lower()) or (re.search(query, obj["title"], re.I) is not None):
+            items.append(obj)
+        if len(items) >= limit: break
+    return items
+
+def per_call_ms(fn, args_list) -> float:
+    t0 = time.perf_counter()
+    for a in args_list:
+        fn(*a)
+    return (time.perf_counter() - t0) / len(args_list) * 1000
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--passages", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--baseline-calls", type=int, default=20, help="llamadas medidas del camino original (lento)")
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_rag_"))
+    try:
+        src, dst = tmp / "index.jsonl", tmp / "index.bin"
+        ids = write_corpus(src, args.passages)
+        rnd = random.Random(5)
+        cites = [([rnd.choice(ids)],) for _ in range(args.queries)]
+        queries = [(f"{rnd.choice(WORDS)} {rnd.choice(STANDARDS)}",) for _ in range(args.queries)]
+
+        t0 = time.perf_counter()
+        rag_index.build(src, dst)
+        t_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        idx = rag_index.load(src, dst)
+        t_load = time.perf_counter() - t0
+
+        nb = args.baseline_calls
+        rows = [
+            ("cite", per_call_ms(lambda i: cite_jsonl(src, i), cites[:nb]), per_call_ms(idx.get_many, cites)),
+            ("search", per_call_ms(lambda q: search_jsonl(src, q), queries[:nb]), per_call_ms(idx.search, queries)),
+        ]
+        same = all(cite_jsonl(src, c) == idx.get_many(c) for c, in cites[:nb])
+        print(f"{args.passages} pasajes, binario {dst.stat().st_size / 2**20:.1f} MB "
+              f"(build {t_build:.2f}s, load {t_load * 1000:.1f} ms), cite idéntico: {same}")
+        print(f"{'op':>7} {'jsonl_ms':>9} {'index_ms':>9} {'speedup':>8}")
+        for op, old, new in rows:
+            print(f"{op:>7} {old:>9.2f} {new:>9.3f} {old / new:>7.0f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
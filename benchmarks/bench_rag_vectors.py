@@ -0,0 +1,68 @@
+"""
+Recuperación vectorial de citas (rag_vectors) sobre un corpus sintético: tiempo
+de embedding por lotes + índice, consultas en lote para miles de hipótesis de
+KPI (con HNSW si hnswlib está disponible, exacta si no) y efecto de la caché LRU
+de embeddings de consulta al repetir las mismas hipótesis.
+
+    python benchmarks/bench_rag_vectors.py --passages 50000 --kpis 5000 --backend hashing
+"""
+import argparse, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import numpy as np
+import rag_vectors
+from bench_rag import STANDARDS, WORDS, write_corpus
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--passages", type=int, default=50_000)
+    ap.add_argument("--kpis", type=int, default=5_000)
+    ap.add_argument("--distinct", type=int, default=500, help="hipótesis distintas entre los KPIs")
+    ap.add_argument("--backend", choices=["auto", "model", "hashing"], default="hashing")
+    ap.add_argument("-k", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_vec_"))
+    try:
+        src = tmp / "index.jsonl"
+        write_corpus(src, args.passages)
+        rnd = random.Random(9)
+        hyps = [f"{rnd.choice(STANDARDS)} " + " ".join(rnd.sample(WORDS, 4)) for _ in range(args.distinct)]
+        queries = [rnd.choice(hyps) for _ in range(args.kpis)]
+
+        t0 = time.perf_counter()
+        vi = rag_vectors.build(src, args.backend, tmp / "cache")
+        t_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vi = rag_vectors.load(src, args.backend, tmp / "cache")
+        t_load = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        hits = vi.search_batch(queries, args.k)
+        t_cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vi.search_batch(queries, args.k)
+        t_warm = time.perf_counter() - t0
+
+        # recall@k del ANN frente a la búsqueda exacta sobre el memmap
+        recall = None
+        if vi.ann is not None:
+            sample = queries[:200]
+            q = vi.embed_queries(sample)
+            exact = np.argsort(-(q @ vi.vectors.T), axis=1)[:, :args.k]
+            got = vi.search_batch(sample, args.k)
+            recall = np.mean([len({vi.ids[j] for j in e} & {i for i, _ in g}) / args.k for e, g in zip(exact, got)])
+
+        print(f"{args.passages} pasajes, backend {vi.emb.name}, dim {vi.emb.dim}, "
+              f"ann {'hnsw' if vi.ann is not None else 'exacto'}")
+        print(f"build {t_build:.2f}s ({args.passages / t_build:.0f} pasajes/s), load {t_load * 1000:.1f} ms")
+        print(f"{args.kpis} KPIs ({args.distinct} hipótesis distintas): "
+              f"frío {t_cold:.3f}s, caché {t_warm:.3f}s, {len(hits)} resultados"
+              + (f", recall@{args.k} {recall:.3f}" if recall is not None else ""))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
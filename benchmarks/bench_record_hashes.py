@@ -0,0 +1,70 @@
+"""
+Coste de los hashes por registro en la ingesta: mcp_ingest.run_ingest en modo
+streaming sobre N registros de energía, sin y con hashes (líneas NDJSON en forma
+canónica + sidecar .sha256 + árbol Merkle de registros). El objetivo es que el
+sobrecoste quede por debajo del 15% a 10^7 registros. Mide también la consulta
+del hash de un registro por ordinal.
+
+    python benchmarks/bench_record_hashes.py --records 10000000
+"""
+import argparse, json, os, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import mcp_ingest, record_hashes
+
+def write_source(path: Path, n: int, seed: int = 3) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "company_id": f"SITE{rnd.randrange(50):03d}",
+                "period_start": "2024-01-01",
+                "period_end": "2024-01-31",
+                "kwh": round(rnd.uniform(0, 50000), 2),
+                "emission_factor_co2e": 0.23,
+                "source_system": "erp_v2",
+            }) + "\n")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=1_000_000)
+    ap.add_argument("--lookups", type=int, default=10_000)
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_rechash_"))
+    cwd = os.getcwd()
+    try:
+        shutil.copytree(REPO / "contracts", tmp / "contracts")
+        (tmp / "data" / "samples").mkdir(parents=True)
+        write_source(tmp / "data" / "samples" / "energy_2024-01.ndjson", args.records)
+        os.chdir(tmp)
+        samples = {"energy": {
+            "input": "data/samples/energy_2024-01.ndjson",
+            "schema": "contracts/erp_energy.schema.json",
+            "normalized": "data/normalized/energy_2024-01.json",
+        }}
+        rules = mcp_ingest.load_yaml(mcp_ingest.DQ_RULES_FILE)
+        times = {}
+        for hashes in (False, True):
+            t0 = time.perf_counter()
+            _, _, lineage = mcp_ingest.run_ingest(samples, rules, stream=True, hashes=hashes)
+            times[hashes] = time.perf_counter() - t0
+        side = Path(lineage[0]["records_sha256"])
+        n = record_hashes.count(side)
+        rnd = random.Random(0)
+        t0 = time.perf_counter()
+        for _ in range(args.lookups):
+            record_hashes.lookup(side, rnd.randrange(n))
+        lookup_us = (time.perf_counter() - t0) / args.lookups * 1e6
+
+        print(f"{args.records} registros, sidecar {side.stat().st_size / 2**20:.0f} MB")
+        print(f"{'plain_s':>8} {'hashed_s':>9} {'overhead':>9} {'lookup_us':>10}")
+        print(f"{times[False]:>8.2f} {times[True]:>9.2f} {(times[True] / times[False] - 1) * 100:>8.1f}% {lookup_us:>10.1f}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Paquete de auditoría sobre un conjunto de artefactos de G GB: zipfile en serie
+(modo original) frente al almacén de contenido (release_store): primera release
+(compresión en paralelo de todos los blobs), release sin cambios (todo
+deduplicado, solo se copia) y release con un artefacto modificado. Comprueba
+los zips con testzip.
+
+    python benchmarks/bench_release.py --total-gb 5 --files 20
+"""
+import argparse, json, os, random, shutil, sys, tempfile, time, zipfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import artifacts, release_store
+
+def write_artifacts(root: Path, files: int, size: int, seed: int = 9) -> list[str]:
+    # JSON Lines con valores aleatorios (compresión realista, ~3-4x)
+    rnd = random.Random(seed)
+    pool = "".join(json.dumps({"company_id": f"LE{rnd.randrange(10**5):05d}", "period": "2024-01",
+                               "kwh": round(rnd.uniform(0, 5e4), 2), "ef": rnd.choice([0.201, 0.23])}) + "\n"
+                   for _ in range(60_000)).encode()
+    paths = []
+    for i in range(files):
+        p = root / f"artifact_{i:03d}.ndjson"
+        with open(p, "wb") as f:
+            written = 0
+            while written < size:
+                off = rnd.randrange(len(pool) // 2)
+                block = pool[off:off + min(len(pool) - off, size - written)]
+                f.write(block)
+                written += len(block)
+        paths.append(str(p))
+    return paths
+
+def store_release(paths: list[str], store: Path, out: Path, workers: int) -> float:
+    t0 = time.perf_counter()
+    hashes = {p: artifacts.sha256(p) for p in paths}
+    release_store.put_many([(p, hashes[p]) for p in paths], store, workers=workers)
+    with open(out, "wb") as f:
+        release_store.write_zip(f, [{"name": Path(p).name, "sha256": hashes[p]} for p in paths], store)
+    return time.perf_counter() - t0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--total-gb", type=float, default=1.0)
+    ap.add_argument("--files", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=release_store.WORKERS)
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_release_"))
+    cwd = os.getcwd()
+    try:
+        os.chdir(tmp)  # registro de hashes (.cache/artifacts) aislado del repo
+        (tmp / "arts").mkdir()
+        size = int(args.total_gb * 2**30 / args.files)
+        paths = write_artifacts(tmp / "arts", args.files, size)
+        total = size * args.files
+        rows = []
+
+        t0 = time.perf_counter()
+        with zipfile.ZipFile(tmp / "zipfile.zip", "w", zipfile.ZIP_DEFLATED) as z:
+            for p in paths:
+                z.write(p, Path(p).name)
+        rows.append(("zipfile serie", time.perf_counter() - t0, tmp / "zipfile.zip"))
+
+        store = tmp / "store"
+        rows.append(("store 1ª", store_release(paths, store, tmp / "r1.zip", args.workers), tmp / "r1.zip"))
+        rows.append(("store sin cambios", store_release(paths, store, tmp / "r2.zip", args.workers), tmp / "r2.zip"))
+        with open(paths[0], "r+b") as f:
+            f.write(b'{"corregido": true}\n')
+        rows.append(("store 1 cambio", store_release(paths, store, tmp / "r3.zip", args.workers), tmp / "r3.zip"))
+
+        print(f"{args.files} artefactos, {total / 2**30:.1f} GB, {args.workers} hilos (cpus={os.cpu_count()})")
+        print(f"{'mode':>18} {'seconds':>8} {'MB/s':>7} {'zip_mb':>7} ok")
+        for name, dt, z in rows:
+            ok = zipfile.ZipFile(z).testzip() is None
+            print(f"{name:>18} {dt:>8.2f} {total / dt / 2**20:>7.0f} {z.stat().st_size / 2**20:>7.0f} {ok}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Validación SHACL E1: pyshacl (inference="rdfs", como el pipeline original)
+frente al validador nativo de scripts/shacl_fast.py, sobre el grafo materializado
+y directamente desde los registros (una pasada, sin construir el grafo).
+Comprueba que el reporte es idéntico allí donde se ejecuta pyshacl.
+
+    python benchmarks/bench_shacl.py --sizes 10000,100000,1000000 --pyshacl-max 20000
+"""
+import argparse, json, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+from rdflib import Graph
+import shacl_fast
+import shacl_validate as sv
+
+def write_records(path: Path, n: int, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "company_id": f"SITE{rnd.randrange(50):03d}",
+                "period_start": "2024-01-01",
+                "period_end": "2024-01-31",
+                # Decimal válido como texto; algún negativo para que haya resultados
+                "kwh": f"{rnd.uniform(0, 50000):.2f}" if rnd.random() > 0.001 else "-1",
+                "emission_factor_co2e": 0.23,
+            }) + "\n")
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--pyshacl-max", type=int, default=20_000,
+                    help="por encima de este tamaño no se ejecuta pyshacl (minutos y GB de RAM)")
+    args = ap.parse_args(argv)
+
+    ont = Graph().parse(REPO / "ontology" / "esrs.owl", format="turtle")
+    sh = Graph().parse(REPO / "contracts" / "shacl_e1.ttl", format="turtle")
+    plan = shacl_fast.compile_shapes(sh)
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_shacl_"))
+    print(f"{'records':>9} {'build_s':>8} {'pyshacl_s':>10} {'graph_s':>8} {'records_s':>9} {'speedup':>8} same_report")
+    try:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            data = tmp / f"energy_{n}.ndjson"
+            write_records(data, n)
+
+            # nativo desde los registros: generador de triples agrupado por sujeto
+            t_rec, (rep_rec,) = timed(lambda: shacl_fast.validate([plan], sv.e1_triples(data), ont, grouped=True))
+
+            g = Graph()
+            for p, ns in ont.namespaces():
+                g.bind(p, ns)
+            t_build, _ = timed(lambda: [g.parse(REPO / "ontology" / "esrs.owl", format="turtle"),
+                                        sv.materialize_e1(g, data)])
+            t_graph, (rep_graph,) = timed(lambda: shacl_fast.validate([plan], g, g))
+
+            t_py, same = None, rep_graph == rep_rec
+            if n <= args.pyshacl_max:
+                sh_py = Graph().parse(REPO / "contracts" / "shacl_e1.ttl", format="turtle")
+                t_py, (_, text) = timed(lambda: sv.run_shacl(g, sh_py, "SHACL E1"))
+                same = same and text == sv.section("SHACL E1", *rep_graph)
+            speed = f"{t_py / t_graph:>7.1f}x" if t_py else f"{'-':>8}"
+            py = f"{t_py:>10.2f}" if t_py else f"{'-':>10}"
+            print(f"{n:>9} {t_build:>8.2f} {py} {t_graph:>8.2f} {t_rec:>9.2f} {speed} {same}")
+            del g
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
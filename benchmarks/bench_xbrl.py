@@ -0,0 +1,67 @@
+"""
+Instancias XBRL por entidad: camino original (árbol lxml en memoria con
+build_xml + XSD re-parseado en cada validación + tree.write) frente a escritura
+incremental con etree.xmlfile, esquema compilado una vez y un pool de procesos
+(xbrl_generate.generate_entities). Comprueba que las instancias son idénticas.
+
+    python benchmarks/bench_xbrl.py --entities 1000 --workers 1,2,4
+"""
+import argparse, os, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO / "scripts"))
+import pandas as pd
+from lxml import etree
+import xbrl_generate
+from kpi_engine import KPI_COLUMNS
+
+def synth(entities: int, periods: int, seed: int = 2) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    rows = [{"company_id": f"LE{e:05d}", "period": f"2024-{m + 1:02d}",
+             KPI_COLUMNS[0]: round(rnd.uniform(0, 500), 3), KPI_COLUMNS[1]: round(rnd.random() / 10, 4),
+             KPI_COLUMNS[2]: round(rnd.uniform(0, 100), 2)}
+            for e in range(entities) for m in range(periods)]
+    return pd.DataFrame(rows)
+
+def original(tasks: list[tuple]) -> None:
+    for path, entity, period, kpis in tasks:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tree = etree.ElementTree(xbrl_generate.build_xml(entity, period, kpis))
+        schema = etree.XMLSchema(etree.parse(str(REPO / xbrl_generate.XSD_FILE)))
+        schema.validate(tree)
+        tree.write(path, encoding="utf-8", xml_declaration=True, pretty_print=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entities", type=int, default=1000)
+    ap.add_argument("--periods", type=int, default=1)
+    ap.add_argument("--workers", default="1,2,4")
+    args = ap.parse_args(argv)
+
+    table = synth(args.entities, args.periods)
+    tmp = Path(tempfile.mkdtemp(prefix="steeltrace_xbrl_"))
+    cwd = os.getcwd()
+    try:
+        os.chdir(REPO)  # el XSD se resuelve relativo a la raíz
+        ref_tasks = xbrl_generate.entity_tasks(table, tmp / "original")
+        t0 = time.perf_counter()
+        original(ref_tasks)
+        base = time.perf_counter() - t0
+        print(f"{len(ref_tasks)} instancias (cpus={os.cpu_count()})")
+        print(f"{'mode':>14} {'seconds':>8} {'inst/s':>8} {'speedup':>8} valid identical")
+        print(f"{'original':>14} {base:>8.2f} {len(ref_tasks) / base:>8.0f} {1.0:>7.1f}x")
+        for w in [int(x) for x in args.workers.split(",")]:
+            tasks = xbrl_generate.entity_tasks(table, tmp / f"stream{w}")
+            t0 = time.perf_counter()
+            results = xbrl_generate.generate_entities(tasks, workers=w)
+            dt = time.perf_counter() - t0
+            valid = all(ok for _, ok, _ in results)
+            same = all(Path(a[0]).read_bytes() == Path(b[0]).read_bytes() for a, b in zip(ref_tasks, tasks))
+            print(f"{f'xmlfile w={w}':>14} {dt:>8.2f} {len(tasks) / dt:>8.0f} {base / dt:>7.1f}x {valid} {same}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
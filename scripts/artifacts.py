@@ -0,0 +1,97 @@
+import atexit, json, os, stat as _stat, threading
+from pathlib import Path
+from utils_hash import WORKERS, sha256_file, sha256_files
+
+# Registro compartido de artefactos: el sha256 de cada ruta se guarda en disco
+# indexado por (size, mtime_ns, inode), de modo que un artefacto sin cambios
+# (aunque ocupe GB) no se vuelve a leer entre ejecuciones. Gate, linaje, Merkle,
+# release y la caché de pasos del pipeline consultan este registro en lugar de
+# hashear por su cuenta. stat no se memoriza: cada consulta ve el fichero actual
+# y un fichero reescrito cambia de huella sin que nadie tenga que avisar.
+
+REGISTRY = Path(".cache/artifacts/sha256.json")
+
+_lock = threading.Lock()
+_hashes: dict[str, list] | None = None  # ruta → [size, mtime_ns, inode, sha256]
+_dirty = False
+
+def _key(path) -> str:
+    return os.path.normpath(str(path))
+
+def stat(path) -> os.stat_result | None:
+    """stat de la ruta; None si no existe o no es un fichero."""
+    try:
+        st = os.stat(_key(path))
+    except OSError:
+        return None
+    return st if _stat.S_ISREG(st.st_mode) else None
+
+def exists(path) -> bool:
+    return stat(path) is not None
+
+def _load() -> dict:
+    global _hashes
+    if _hashes is None:
+        try:
+            _hashes = json.loads(REGISTRY.read_text(encoding="utf-8"))
+        except Exception:
+            _hashes = {}
+    return _hashes
+
+def _cached(k: str):
+    # (huella, sha256 registrado o None si hay que leer el fichero)
+    st = stat(k)
+    if st is None:
+        raise FileNotFoundError(k)
+    fp = [st.st_size, st.st_mtime_ns, st.st_ino]
+    with _lock:
+        row = _load().get(k)
+    return fp, (row[3] if row is not None and row[:3] == fp else None)
+
+def _record(k: str, fp: list, h: str) -> None:
+    global _dirty
+    with _lock:
+        _load()[k] = fp + [h]
+        _dirty = True
+
+def sha256(path) -> str:
+    """sha256 del fichero; solo se lee el contenido si cambió su huella (size, mtime_ns, inode)."""
+    k = _key(path)
+    fp, h = _cached(k)
+    if h is None:
+        h = sha256_file(k)
+        _record(k, fp, h)
+    return h
+
+def sha256_many(paths, workers: int = WORKERS) -> dict[str, str]:
+    """Como sha256() para varias rutas; las que hay que leer se hashean en paralelo."""
+    out, stale = {}, {}
+    for p in paths:
+        k = _key(p)
+        fp, h = _cached(k)
+        if h is None:
+            stale[k] = fp
+        out[str(p)] = h if h is not None else k
+    fresh = sha256_files(stale, workers)
+    for k, h in fresh.items():
+        _record(k, stale[k], h)
+    return {p: fresh.get(v, v) for p, v in out.items()}
+
+def flush() -> None:
+    """Persiste las huellas nuevas, fusionando con lo que otros procesos hayan escrito."""
+    global _dirty
+    with _lock:
+        if not _dirty or _hashes is None:
+            return
+        try:
+            merged = json.loads(REGISTRY.read_text(encoding="utf-8"))
+        except Exception:
+            merged = {}
+        merged.update(_hashes)
+        REGISTRY.parent.mkdir(parents=True, exist_ok=True)
+        tmp = REGISTRY.with_name(f"{REGISTRY.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(merged, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(REGISTRY)
+        _dirty = False
+
+atexit.register(flush)
@@ -0,0 +1,274 @@
+import argparse, json, os, re, shutil, signal, subprocess, sys, time, uuid
+from collections import deque
+from pathlib import Path
+import yaml
+from mcp_ingest import SAMPLES
+from slo_sketch import dd_add, dd_new, dd_quantile
+
+# Modo lote multi-tenant sobre pipeline_run.py. Cada (tenant, periodo) tiene su
+# espacio de trabajo aislado en runs/<tenant>/<periodo>/ (datos, salidas, .cache
+# y SLO propios); las entradas compartidas (contratos, ontología, índice RAG,
+# esquema XBRL, scripts) se enlazan desde el repo. Sin inputs, cada dominio se
+# toma de data/samples/<dominio>_<periodo>.json del periodo pedido; si no existe,
+# el lote falla antes de lanzar nada. Las ejecuciones son procesos
+# independientes planificados en un pool de N plazas con un tope global de
+# memoria: solo se admite una ejecución más si la suma de la RSS de las que
+# están en marcha (medida en /proc por sesión) más la estimación de la nueva
+# cabe en el tope. Al final se consolida un resumen SLO del lote.
+
+ROOT = Path(__file__).resolve().parents[1]
+PIPELINE = ROOT / "scripts" / "pipeline_run.py"
+RUNS = Path("runs")
+SHARED = ["contracts", "ontology/esrs.owl", "rag/index.jsonl", "ops/eee_gate.yaml",
+          "xbrl/schema", "docs/hitl_reviews.csv", "scripts"]
+PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+POLL = 0.2
+
+def _slug(s: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", s)
+
+def _link(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.is_symlink() and os.readlink(dst) == str(src):
+        return
+    if dst.is_symlink() or dst.is_file():
+        dst.unlink()
+    elif dst.is_dir():
+        shutil.rmtree(dst)
+    dst.symlink_to(src)
+
+def _key(run: dict) -> str:
+    return f"{_slug(run['tenant'])}__{_slug(run['period'])}"
+
+def check_unique(runs: list[dict]) -> None:
+    # dos ejecuciones con la misma clave compartirían espacio de trabajo y logs
+    seen = {}
+    for r in runs:
+        k = _key(r)
+        if k in seen:
+            raise ValueError(f"ejecución duplicada: {r['tenant']} {r['period']} "
+                             f"(mismo espacio de trabajo que {seen[k]['tenant']} {seen[k]['period']})")
+        seen[k] = r
+
+def sample_input(domain: str, period: str) -> Path:
+    # data/samples/<dominio>_<periodo>.json: la muestra del repo para ese periodo
+    s = Path(SAMPLES[domain]["input"])
+    return ROOT / s.parent / f"{domain}_{_slug(period)}{s.suffix}"
+
+def resolve_inputs(runs: list[dict]) -> None:
+    """Completa los inputs de cada ejecución con las muestras de su periodo; ValueError si falta alguna."""
+    missing = []
+    for r in runs:
+        for domain in SAMPLES:
+            if not r["inputs"].get(domain):
+                path = sample_input(domain, r["period"])
+                if path.exists():
+                    r["inputs"][domain] = str(path)
+                else:
+                    missing.append(f"{r['tenant']} {r['period']}: {domain} ({path.relative_to(ROOT)})")
+    if missing:
+        raise ValueError("sin datos de entrada (usa inputs en --spec): " + "; ".join(missing))
+
+def load_spec(path: str | Path) -> list[dict]:
+    """
+    Lista de ejecuciones desde JSON/YAML: [{tenant, period, inputs?: {dominio: ruta}}]
+    (o {"runs": [...]}). Las rutas relativas se resuelven respecto al fichero;
+    sin inputs se usan los data/samples del repo del mismo periodo.
+    """
+    path = Path(path)
+    spec = yaml.safe_load(path.read_text(encoding="utf-8"))
+    runs = spec["runs"] if isinstance(spec, dict) else spec
+    out = []
+    for r in runs:
+        inputs = {d: str((path.parent / p).resolve()) for d, p in (r.get("inputs") or {}).items()}
+        unknown = set(inputs) - set(SAMPLES)
+        if unknown:
+            raise ValueError(f"{r['tenant']}: dominios desconocidos {sorted(unknown)}")
+        out.append({"tenant": str(r["tenant"]), "period": str(r["period"]), "inputs": inputs})
+    check_unique(out)
+    resolve_inputs(out)
+    return out
+
+def cross(tenants: list[str], periods: list[str]) -> list[dict]:
+    return [{"tenant": t, "period": p, "inputs": {}} for t in tenants for p in periods]
+
+def workspace(run: dict, root: Path = RUNS) -> Path:
+    """Crea (o refresca) el espacio de trabajo de la ejecución y lo devuelve."""
+    ws = (root / _slug(run["tenant"]) / _slug(run["period"])).resolve()
+    for rel in SHARED:
+        if (ROOT / rel).exists():
+            _link(ROOT / rel, ws / rel)
+    # los pasos leen nombres fijos (SAMPLES): cada dominio del tenant se enlaza con ese nombre
+    for domain, s in SAMPLES.items():
+        _link(Path(run["inputs"][domain]), ws / s["input"])
+    return ws
+
+def _session_rss(sid: int) -> int:
+    # RSS (bytes) de todos los procesos de la sesión sid: el pipeline y sus pools
+    total = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            stat = Path(f"/proc/{pid}/stat").read_text()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(")") + 2:].split()
+        if int(fields[3]) == sid:
+            total += int(fields[21]) * PAGE
+    return total
+
+def available_mb() -> int | None:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * PAGE // 2**20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def _result(run: dict, ws: Path, log_dir: Path) -> dict:
+    # estado final a partir de los eventos y del slo_report del espacio de trabajo
+    done = {}
+    try:
+        for line in (log_dir / f"{run['key']}.events.jsonl").read_text(encoding="utf-8").splitlines():
+            e = json.loads(line)
+            if e["event"] == "done":
+                done = e
+    except (OSError, ValueError):
+        pass
+    try:
+        slo = json.loads((ws / "ops" / "slo_report.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        slo = {}
+    try:
+        gate = json.loads((ws / "ops" / "gate_report.json").read_text(encoding="utf-8")).get("global_decision")
+    except (OSError, ValueError):
+        gate = None
+    return {
+        "tenant": run["tenant"], "period": run["period"], "workspace": str(ws),
+        "ok": run["returncode"] == 0 and done.get("ok", False),
+        "returncode": run["returncode"], "seconds": round(run["seconds"], 3),
+        "peak_rss_mb": round(run["peak"] / 2**20, 1), "gate": gate,
+        "failed": done.get("failed", []), "cache_hits": done.get("cache_hits", []),
+        # los pasos servidos desde caché no cuentan en los cuantiles del lote
+        "steps": {s["name"]: s["duration_sec"] for s in slo.get("last_run", []) if not s.get("cached")},
+    }
+
+def run_batch(runs: list[dict], workers: int = os.cpu_count() or 1, max_memory_mb: int | None = None,
+              mem_per_run_mb: int = 600, pipeline_args: list[str] | None = None,
+              root: Path = RUNS, batch_id: str | None = None) -> dict:
+    """Ejecuta runs en paralelo respetando workers y el tope de memoria; devuelve el resumen del lote."""
+    check_unique(runs)
+    resolve_inputs(runs)
+    batch_id = batch_id or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:6]
+    log_dir = (root / "batches" / batch_id).resolve()
+    log_dir.mkdir(parents=True, exist_ok=True)
+    cap = max_memory_mb * 2**20 if max_memory_mb else None
+    estimate = mem_per_run_mb * 2**20
+    pending, running, finished = deque(runs), [], []
+    t0 = time.perf_counter()
+
+    try:
+        while pending or running:
+            # admisión: plazas libres y memoria (siempre se admite al menos una para no bloquear)
+            while pending and len(running) < workers:
+                used = sum(max(r["rss"], estimate) for r in running)
+                if running and cap is not None and used + estimate > cap:
+                    break
+                run = pending.popleft()
+                run["key"] = _key(run)
+                ws = workspace(run, root)
+                env = {**os.environ, "STEELTRACE_RUN_ID": f"{run['tenant']}-{run['period']}"}
+                with open(log_dir / f"{run['key']}.log", "wb") as log:
+                    run["proc"] = subprocess.Popen(
+                        [sys.executable, str(PIPELINE), "--events", str(log_dir / f"{run['key']}.events.jsonl"),
+                         *(pipeline_args or [])],
+                        cwd=ws, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+                run.update(ws=ws, start=time.perf_counter(), rss=0, peak=0)
+                running.append(run)
+
+            time.sleep(POLL)
+            for run in list(running):
+                run["rss"] = _session_rss(run["proc"].pid) if Path("/proc").is_dir() else 0
+                run["peak"] = max(run["peak"], run["rss"])
+                if run["proc"].poll() is None:
+                    continue
+                running.remove(run)
+                run.update(returncode=run["proc"].returncode, seconds=time.perf_counter() - run["start"])
+                # la estimación pasa a ser el mayor pico observado (+10 %)
+                if run["peak"]:
+                    estimate = max(estimate if finished else 0, int(run["peak"] * 1.1))
+                finished.append(_result(run, run["ws"], log_dir))
+                print(f"[{len(finished)}/{len(runs)}] {run['tenant']} {run['period']}: "
+                      f"{'OK' if finished[-1]['ok'] else 'FALLO'} {run['seconds']:.1f}s "
+                      f"{run['peak'] / 2**20:.0f} MB")
+    finally:
+        # si el planificador falla (o Ctrl-C), no deja pipelines huérfanos: cada uno es líder de su sesión
+        for run in running:
+            try:
+                os.killpg(run["proc"].pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            run["proc"].wait()
+
+    summary = summarize(finished, time.perf_counter() - t0, workers, max_memory_mb)
+    summary["batch_id"] = batch_id
+    (log_dir / "summary.json").write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    return summary
+
+def summarize(results: list[dict], wall: float, workers: int, max_memory_mb: int | None) -> dict:
+    """Resumen SLO del lote: throughput, cuantiles por paso entre tenants y fallos."""
+    sketches, totals = {}, dd_new()
+    for r in results:
+        dd_add(totals, r["seconds"])
+        for step, sec in r["steps"].items():
+            dd_add(sketches.setdefault(step, dd_new()), sec)
+    def stats(sk):
+        return {"count": sk["count"], "p50_sec": round(dd_quantile(sk, 0.5), 4),
+                "p95_sec": round(dd_quantile(sk, 0.95), 4), "max_sec": round(sk["max"], 4)}
+    ok = [r for r in results if r["ok"]]
+    return {
+        "utc": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "runs": len(results), "ok": len(ok), "workers": workers, "cpus": os.cpu_count(),
+        "max_memory_mb": max_memory_mb, "wall_sec": round(wall, 3),
+        "tenants_per_hour": round(len(ok) / wall * 3600, 1) if wall > 0 else None,
+        "peak_rss_mb": max((r["peak_rss_mb"] for r in results), default=0),
+        "run_sec": stats(totals) if results else {},
+        "steps": {name: stats(sk) for name, sk in sketches.items()},
+        "failed": [{"tenant": r["tenant"], "period": r["period"], "steps": r["failed"],
+                    "returncode": r["returncode"]} for r in results if not r["ok"]],
+        "results": results,
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pipeline STEELTRACE en lote (multi-tenant)")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--spec", help="JSON/YAML con [{tenant, period, inputs?}]")
+    src.add_argument("--tenants", help="tenants separados por comas (con --periods; entradas de data/samples/<dominio>_<periodo>.json)")
+    ap.add_argument("--periods", default="2024-01", help="periodos separados por comas (con --tenants)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="ejecuciones simultáneas")
+    ap.add_argument("--max-memory-mb", type=int, default=None,
+                    help="tope global de memoria (por defecto, 80%% de la memoria libre)")
+    ap.add_argument("--mem-per-run-mb", type=int, default=600,
+                    help="estimación inicial por ejecución; se sustituye por el pico observado")
+    ap.add_argument("--jobs", type=int, default=1, help="pasos en paralelo dentro de cada ejecución")
+    ap.add_argument("--force", action="store_true", help="ignora la caché de pasos de cada espacio de trabajo")
+    ap.add_argument("--root", default=str(RUNS), help="directorio de los espacios de trabajo")
+    args = ap.parse_args(argv)
+
+    runs = load_spec(args.spec) if args.spec else cross(
+        [t.strip() for t in args.tenants.split(",") if t.strip()],
+        [p.strip() for p in args.periods.split(",") if p.strip()])
+    cap = args.max_memory_mb
+    if cap is None and (free := available_mb()):
+        cap = int(free * 0.8)
+    pipeline_args = ["--jobs", str(args.jobs)] + (["--force"] if args.force else [])
+    summary = run_batch(runs, args.workers, cap, args.mem_per_run_mb, pipeline_args, Path(args.root))
+
+    print(f"Lote {summary['batch_id']}: {summary['ok']}/{summary['runs']} OK en {summary['wall_sec']:.1f}s, "
+          f"{summary['tenants_per_hour']} tenants/h ({args.workers} plazas, tope {cap} MB)")
+    for name, st in summary["steps"].items():
+        print(f"  {name:<16} p50 {st['p50_sec']:.3f}s  p95 {st['p95_sec']:.3f}s")
+    print("Resumen →", Path(args.root) / "batches" / summary["batch_id"] / "summary.json")
+    return 0 if summary["ok"] == summary["runs"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
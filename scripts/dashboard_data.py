@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+# Vistas para la consola Streamlit (app.py): funciones puras sobre los reportes
+# ya parseados. app.py cachea el parseo por (ruta, mtime_ns, size) y aquí solo se
+# derivan resúmenes pequeños y páginas, para que cada interacción toque una
+# fracción acotada de reportes grandes (dq_report.json, explain.json).
+
+PAGE_SIZE = 25
+
+def file_stamp(path: str | Path) -> tuple[int, int] | None:
+    """(mtime_ns, size) de un fichero, o None si no existe."""
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def parse_json(path: str | Path):
+    content = Path(path).read_text(encoding="utf-8").strip()
+    return json.loads(content) if content else None
+
+def page(items: list, number: int, size: int = PAGE_SIZE) -> tuple[list, int]:
+    """Elementos de la página number (desde 1) y número total de páginas."""
+    pages = max(1, -(-len(items) // size))
+    number = min(max(1, number), pages)
+    return items[(number - 1) * size:number * size], pages
+
+def dq_overview(dq: dict) -> list[dict]:
+    """Una fila por dominio: registros, errores de esquema y tasas agregadas."""
+    rows = []
+    for domain, d in (dq.get("domains") or {}).items():
+        if not isinstance(d, dict):
+            continue
+        agg = (d.get("dq") or {}).get("aggregate", {})
+        rows.append({
+            "domain": domain,
+            "records_total": d.get("records_total"),
+            "records_valid": d.get("records_valid"),
+            "schema_errors": len(d.get("schema_errors") or []),
+            **{k: v for k, v in agg.items() if k != "dq_pass"},
+            "dq_pass": agg.get("dq_pass"),
+        })
+    return rows
+
+def dq_rules(dq: dict, domain: str) -> list[dict]:
+    """Tasa de paso por regla de un dominio."""
+    by_rule = (((dq.get("domains") or {}).get(domain) or {}).get("dq") or {}).get("by_rule", {})
+    return [{"category": cat, "rule": json.dumps(r["rule"], ensure_ascii=False), "pass_rate": r["pass_rate"]}
+            for cat, rules in by_rule.items() for r in rules]
+
+def dq_errors(dq: dict, domain: str) -> list[dict]:
+    return ((dq.get("domains") or {}).get(domain) or {}).get("schema_errors") or []
+
+def dq_domain_detail(dq: dict, domain: str) -> dict:
+    # el detalle JSON sin la lista de errores (se pagina aparte)
+    d = (dq.get("domains") or {}).get(domain) or {}
+    return {k: v for k, v in d.items() if k != "schema_errors"} if isinstance(d, dict) else d
+
+def explain_keys(explain: dict, query: str = "") -> list[str]:
+    """DPs de explain.json, filtrados por subcadena (sin distinguir mayúsculas)."""
+    q = query.strip().lower()
+    return [k for k in explain if q in k.lower()] if q else list(explain)
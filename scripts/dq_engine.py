@@ -0,0 +1,259 @@
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
+
+# Motor DQ vectorizado: las reglas de contracts/dq_rules.yaml se compilan una
+# sola vez en predicados por columna (DataFrame → máscara booleana NumPy).
+# La semántica replica apply_rule fila a fila, que se conserva como referencia.
+# El DataFrame confunde clave ausente, None y NaN (los tres son nulos), y
+# apply_rule no: NaN cuenta como no nulo, una clave ausente vale "" en las reglas
+# de texto y 0 en las enteras, y None vale "None" y no convierte a int.
+# to_frame anota en df.attrs["nulls"] qué es cada nulo; en un DataFrame sin esa
+# anotación los nulos se tratan como None.
+
+CATEGORIES = ["completeness", "validity", "consistency", "timeliness"]
+
+# -------- Helpers escalares (referencia) --------
+def is_date_iso(s: str) -> bool:
+    try:
+        datetime.strptime(s, "%Y-%m-%d")
+        return True
+    except Exception:
+        return False
+
+def is_yyyy_mm(s: str) -> bool:
+    return bool(re.fullmatch(r"\d{4}-\d{2}", s))
+
+def within_month(date_str: str, month: str) -> bool:
+    # month = 'YYYY-MM'
+    return date_str.startswith(month)
+
+def apply_rule(row: dict, rule: dict, domain: str) -> bool:
+    # Supports simple predicates used in dq_rules.yaml
+    name = rule.get("rule")
+    field = rule.get("field")
+    if name == "not_null":
+        return row.get(field) is not None
+    if name == "is_date":
+        return is_date_iso(str(row.get(field, "")))
+    if name == "is_yyyy_mm":
+        return is_yyyy_mm(str(row.get(field, "")))
+    if name == ">=0":
+        try:
+            val = row.get(field)
+            if val is None: return False
+            return float(val) >= 0
+        except Exception:
+            return False
+    if name and name.startswith("within_month("):
+        m = re.search(r"within_month\('([^']+)'\)", name)
+        month = m.group(1) if m else ""
+        return within_month(str(row.get(field, "")), month)
+    if name and name.startswith("equals("):
+        m = re.search(r"equals\('([^']+)'\)", name)
+        ref = m.group(1) if m else ""
+        return str(row.get(field, "")) == ref
+    if name == "period_start <= period_end":
+        try:
+            ps = datetime.strptime(row.get("period_start"), "%Y-%m-%d")
+            pe = datetime.strptime(row.get("period_end"), "%Y-%m-%d")
+            return ps <= pe
+        except Exception:
+            return False
+    if name == "employees_end <= employees_start + 1000":
+        try:
+            return int(row.get("employees_end", 0)) <= int(row.get("employees_start", 0)) + 1000
+        except Exception:
+            return False
+    if name == "closed_with_resolution <= cases_closed":
+        try:
+            return int(row.get("closed_with_resolution", 0)) <= int(row.get("cases_closed", 0))
+        except Exception:
+            return False
+    return True
+
+def evaluate_rowwise(records: list[dict], rules: dict, domain: str) -> dict:
+    # implementación original fila a fila; se usa para verificar el motor vectorizado
+    counts = {cat: [sum(1 for row in records if apply_rule(row, r, domain)) for r in rules.get(cat, [])]
+              for cat in CATEGORIES}
+    return summarize(compile_rules(rules), counts, len(records))
+
+# -------- Predicados por columna --------
+def _nulls(df: pd.DataFrame, field: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+    # (máscara de nulos, de claves ausentes, de None, valores no None que pandas ve como nulos por fila)
+    isna = df[field].isna().to_numpy()
+    absent, present = df.attrs.get("nulls", {}).get(field, (None, {}))
+    if absent is None:
+        absent = np.zeros(len(df), dtype=bool)
+    none = isna & ~absent
+    if present:
+        none[list(present)] = False
+    return isna, absent, none, present
+
+def _by_unique(s: pd.Series, fn, missing) -> np.ndarray:
+    # evalúa fn una vez por valor distinto (fechas, periodos... tienen cardinalidad baja)
+    codes, uniques = pd.factorize(s)
+    lut = np.fromiter((fn(u) for u in uniques), dtype=bool, count=len(uniques))
+    lut = np.append(lut, fn(missing))  # código -1 (nulo) → último elemento
+    return lut[codes]
+
+def _str_pred(fn):
+    # replica str(row.get(field, "")): clave ausente → "", None → "None", NaN → "nan"
+    def pred(df: pd.DataFrame, field: str) -> np.ndarray:
+        if field not in df.columns:
+            return np.full(len(df), fn(""), dtype=bool)
+        out = _by_unique(df[field], lambda u: fn(str(u)), "")
+        isna, absent, none, present = _nulls(df, field)
+        if isna.any():
+            out[none] = fn("None")
+            for i, v in present.items():
+                out[i] = fn(str(v))
+        return out
+    return pred
+
+def _not_null(df: pd.DataFrame, field: str) -> np.ndarray:
+    # row.get(field) is not None: un NaN cuenta como valor
+    if field not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    isna, absent, none, present = _nulls(df, field)
+    return ~(absent | none)
+
+def _ge0_scalar(v) -> bool:
+    if v is None: return False
+    try:
+        return float(v) >= 0
+    except Exception:
+        return False
+
+def _ge0(df: pd.DataFrame, field: str) -> np.ndarray:
+    if field not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    s = df[field]
+    if is_numeric_dtype(s) and not is_bool_dtype(s):
+        return (s >= 0).to_numpy()  # NaN → False
+    return _by_unique(s, _ge0_scalar, None)
+
+def _parse_date(v):
+    try:
+        return datetime.strptime(v, "%Y-%m-%d")
+    except Exception:
+        return None
+
+def _dates(df: pd.DataFrame, field: str) -> np.ndarray:
+    if field not in df.columns:
+        return np.full(len(df), np.datetime64("NaT"), dtype="datetime64[s]")
+    codes, uniques = pd.factorize(df[field])
+    lut = [_parse_date(u) for u in uniques] + [None]
+    lut = np.array([np.datetime64(d, "s") if d else np.datetime64("NaT") for d in lut], dtype="datetime64[s]")
+    return lut[codes]
+
+def _to_int(v):
+    try:
+        return int(v)
+    except Exception:
+        return None
+
+def _ints(df: pd.DataFrame, field: str) -> tuple[np.ndarray, np.ndarray]:
+    # (valores, máscara de conversión correcta) como int(row.get(field, 0)): clave
+    # ausente → 0, None y NaN → fallo
+    n = len(df)
+    if field not in df.columns:
+        return np.zeros(n, dtype=np.int64), np.ones(n, dtype=bool)
+    s = df[field]
+    if is_integer_dtype(s) and not is_bool_dtype(s):
+        return s.to_numpy(dtype=np.int64), np.ones(n, dtype=bool)
+    codes, uniques = pd.factorize(s)
+    vals = [_to_int(u) for u in uniques] + [None]
+    ok = np.array([v is not None for v in vals], dtype=bool)[codes]
+    arr = np.array([0 if v is None else v for v in vals], dtype=object)[codes]
+    isna, absent, none, present = _nulls(df, field)
+    if absent.any():
+        arr[absent], ok[absent] = 0, True
+    for i, v in present.items():
+        arr[i] = _to_int(v) or 0
+        ok[i] = _to_int(v) is not None
+    return arr, ok
+
+def _int_le(left: str, right: str, offset: int = 0):
+    def pred(df: pd.DataFrame) -> np.ndarray:
+        a, ok_a = _ints(df, left)
+        b, ok_b = _ints(df, right)
+        return ok_a & ok_b & np.asarray(a <= b + offset, dtype=bool)
+    return pred
+
+def _period_order(df: pd.DataFrame) -> np.ndarray:
+    return _dates(df, "period_start") <= _dates(df, "period_end")  # NaT → False
+
+_is_date = _str_pred(is_date_iso)
+_is_yyyy_mm = _str_pred(is_yyyy_mm)
+
+ROW_RULES = {
+    "period_start <= period_end": _period_order,
+    "employees_end <= employees_start + 1000": _int_le("employees_end", "employees_start", 1000),
+    "closed_with_resolution <= cases_closed": _int_le("closed_with_resolution", "cases_closed"),
+}
+
+# -------- Compilación --------
+def compile_rule(rule: dict):
+    name = rule.get("rule")
+    field = rule.get("field")
+    if name == "not_null":
+        return lambda df: _not_null(df, field)
+    if name == "is_date":
+        return lambda df: _is_date(df, field)
+    if name == "is_yyyy_mm":
+        return lambda df: _is_yyyy_mm(df, field)
+    if name == ">=0":
+        return lambda df: _ge0(df, field)
+    if name and name.startswith("within_month("):
+        m = re.search(r"within_month\('([^']+)'\)", name)
+        month = m.group(1) if m else ""
+        pred = _str_pred(lambda s: within_month(s, month))
+        return lambda df: pred(df, field)
+    if name and name.startswith("equals("):
+        m = re.search(r"equals\('([^']+)'\)", name)
+        ref = m.group(1) if m else ""
+        pred = _str_pred(lambda s: s == ref)
+        return lambda df: pred(df, field)
+    if name in ROW_RULES:
+        return ROW_RULES[name]
+    return lambda df: np.ones(len(df), dtype=bool)
+
+def compile_rules(rules: dict) -> dict:
+    return {cat: [(r, compile_rule(r)) for r in rules.get(cat, [])] for cat in CATEGORIES}
+
+def to_frame(records: list[dict]) -> pd.DataFrame:
+    if not records:
+        return pd.DataFrame()
+    df = pd.DataFrame.from_records(records)
+    # solo se recorren las filas nulas de las columnas que tienen alguna
+    nulls = {}
+    for field in df.columns[df.isna().any().to_numpy()]:
+        absent, present = np.zeros(len(df), dtype=bool), {}
+        for i in np.flatnonzero(df[field].isna().to_numpy()):
+            r = records[i]
+            if field not in r:
+                absent[i] = True
+            elif r[field] is not None:
+                present[int(i)] = r[field]
+        nulls[field] = (absent, present)
+    df.attrs["nulls"] = nulls
+    return df
+
+def count_passes(df: pd.DataFrame, compiled: dict) -> dict:
+    # conteos enteros por regla: se pueden sumar entre bloques sin perder exactitud
+    return {cat: [int(np.count_nonzero(pred(df))) for _, pred in preds] for cat, preds in compiled.items()}
+
+def merge_counts(a: dict, b: dict) -> dict:
+    return {cat: [x + y for x, y in zip(a[cat], b[cat])] for cat in a}
+
+def summarize(compiled: dict, counts: dict, total: int) -> dict:
+    res = {cat: [{"rule": r, "pass_rate": passed / max(1, total)}
+                 for (r, _), passed in zip(compiled[cat], counts[cat])]
+           for cat in CATEGORIES}
+    # Aggregate
+    agg = {k: (sum(x["pass_rate"] for x in v) / max(1, len(v))) if v else 1.0 for k, v in res.items()}
+    agg["dq_pass"] = all(v >= 0.95 for v in agg.values())
+    return {"by_rule": res, "aggregate": agg}
@@ -1,4 +1,6 @@
 import json, re
+import numpy as np
+import artifacts
 from pathlib import Path
 from datetime import datetime
 
@@ -12,14 +14,52 @@ def load_yaml(p: Path):
     return yaml.safe_load(p.read_text(encoding="utf-8"))
 
 def exists(path: str) -> bool:
-    return Path(path).exists()
-
-def evidence_component(cfg) -> tuple[float, dict]:
+    # un stat por llamada (el registro ya no memoriza); cached_exists evita repetirlo por DP
+    return artifacts.exists(path)
+
+def cached_exists():
+    # memo local por ruta (miles de DPs comparten las mismas evidencias)
+    seen = {}
+    def check(path: str) -> bool:
+        r = seen.get(path)
+        if r is None:
+            r = seen[path] = exists(path)
+        return r
+    return check
+
+def compile_patterns(patterns: list[str]) -> re.Pattern:
+    """critical_dps de ops/eee_gate.yaml como una sola regex (anclada al inicio del DP)."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns) or r"(?!)")
+
+def evidence_component(cfg, check=exists) -> tuple[float, dict]:
     arts = cfg["eee_gate"]["required_artifacts"]
-    ok = sum(1 for a in arts if exists(a))
+    ok = sum(1 for a in arts if check(a))
     comp = ok / max(1, len(arts))
     return comp, {"artifacts_present": ok, "artifacts_total": len(arts)}
 
+def _flags(explain: dict, dps: list[str], key: str) -> np.ndarray:
+    return np.fromiter((bool(explain.get(dp, {}).get(key)) for dp in dps), dtype=bool, count=len(dps))
+
+def explicit_scores(explain: dict, dps: list[str]) -> tuple[np.ndarray, ...]:
+    """(hyp, ev, cit, score) por DP: hipótesis, evidencias y cita presentes."""
+    hyp, ev, cit = (_flags(explain, dps, k).astype(float) for k in ("hypothesis", "evidence", "citations"))
+    return hyp, ev, cit, (hyp + ev + cit) / 3.0
+
+def epistemic_scores(explain: dict, dps: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(residual, score) por DP con los tramos 0.01 / 0.05."""
+    r = np.fromiter((float(explain.get(dp, {}).get("residual", 1.0)) for dp in dps), dtype=float, count=len(dps))
+    return r, np.select([r <= 0.01, r <= 0.05], [1.0, 0.7], default=0.3)
+
+def evidence_scores(explain: dict, dps: list[str], required: list[str], check=exists) -> np.ndarray:
+    """Fracción presente de los artefactos requeridos más las evidencias propias de cada DP."""
+    req = set(required)
+    req_ok = sum(1 for a in req if check(a))
+    out = np.empty(len(dps))
+    for i, dp in enumerate(dps):
+        extra = [p for p in explain.get(dp, {}).get("evidence") or [] if p not in req]
+        out[i] = (req_ok + sum(1 for p in extra if check(p))) / max(1, len(req) + len(extra))
+    return out
+
 def explicit_component(explain: dict) -> tuple[float, dict]:
     """
     mide completitud de explicaciones:
@@ -31,16 +71,10 @@ def explicit_component(explain: dict) -> tuple[float, dict]:
     dps = list(explain.keys())
     if not dps:
         return 0.0, {"details":[]}
-    scores = []
-    details = []
-    for dp, ex in explain.items():
-        hyp = 1.0 if ex.get("hypothesis") else 0.0
-        ev  = 1.0 if ex.get("evidence") else 0.0
-        cit = 1.0 if ex.get("citations") else 0.0
-        s = (hyp + ev + cit) / 3.0
-        scores.append(s)
-        details.append({"dp": dp, "hyp": hyp, "ev": ev, "cit": cit, "score": s})
-    return sum(scores)/len(scores), {"details": details}
+    hyp, ev, cit, s = explicit_scores(explain, dps)
+    details = [{"dp": dp, "hyp": h, "ev": e, "cit": c, "score": x}
+               for dp, h, e, c, x in zip(dps, hyp.tolist(), ev.tolist(), cit.tolist(), s.tolist())]
+    return float(s.mean()), {"details": details}
 
 def epistemic_component(explain: dict) -> tuple[float, dict]:
     """
@@ -53,33 +87,47 @@ def epistemic_component(explain: dict) -> tuple[float, dict]:
     dps = list(explain.keys())
     if not dps:
         return 0.0, {"details":[]}
-    m = []
-    details = []
-    for dp, ex in explain.items():
-        r = float(ex.get("residual", 1.0))
-        if r <= 0.01: s = 1.0
-        elif r <= 0.05: s = 0.7
-        else: s = 0.3
-        m.append(s)
-        details.append({"dp": dp, "residual": r, "score": s})
-    return sum(m)/len(m), {"details": details}
+    r, s = epistemic_scores(explain, dps)
+    details = [{"dp": dp, "residual": x, "score": y} for dp, x, y in zip(dps, r.tolist(), s.tolist())]
+    return float(s.mean()), {"details": details}
 
 def decision(score: float, th: float) -> str:
     if score >= th: return "publish"
     if score >= (th - 0.1): return "review"
     return "block"
 
-def main():
+def decisions(scores: np.ndarray, th: float) -> np.ndarray:
+    # misma regla que decision(), sobre el array de scores
+    return np.where(scores >= th, "publish", np.where(scores >= (th - 0.1), "review", "block"))
+
+def score_dps(kpis: dict, explain: dict, cfg: dict, check=exists) -> list[dict]:
+    """Score EEE y decisión por DP, con sus tres componentes calculados como arrays."""
+    g, dps = cfg["eee_gate"], list(kpis.keys())
+    w, th = g["weights"], g["threshold_score"]
+    _, _, _, ex = explicit_scores(explain, dps)
+    _, ep = epistemic_scores(explain, dps)
+    ev = evidence_scores(explain, dps, g["required_artifacts"], check)
+    eee = np.round(w["epistemic"] * ep + w["explicit"] * ex + w["evidence"] * ev, 4)
+    critical = compile_patterns(g.get("critical_dps", []))
+    return [{"dp": dp, "epistemic": a, "explicit": b, "evidence": c, "eee_score": s, "decision": d,
+             "critical": critical.match(dp) is not None}
+            for dp, a, b, c, s, d in zip(dps, ep.tolist(), ex.tolist(), ev.tolist(), eee.tolist(),
+                                         decisions(eee, th).tolist())]
+
+def main(kpis: dict | None = None, explain: dict | None = None):
     cfg = load_yaml(CFG)
     th  = cfg["eee_gate"]["threshold_score"]
     w   = cfg["eee_gate"]["weights"]
 
-    # cargar explicaciones y kpis
-    kpis = json.loads(KPIS.read_text(encoding="utf-8"))
-    explain = json.loads(EXPL.read_text(encoding="utf-8"))
+    # cargar explicaciones y kpis (salvo que lleguen en memoria desde pipeline_run)
+    if kpis is None:
+        kpis = json.loads(KPIS.read_text(encoding="utf-8"))
+    if explain is None:
+        explain = json.loads(EXPL.read_text(encoding="utf-8"))
 
-    # componentes
-    ev_score, ev_meta = evidence_component(cfg)
+    # componentes globales
+    check = cached_exists()
+    ev_score, ev_meta = evidence_component(cfg, check)
     ex_score, ex_meta = explicit_component(explain)
     ep_score, ep_meta = epistemic_component(explain)
 
@@ -87,17 +135,12 @@ def main():
         w["epistemic"]*ep_score + w["explicit"]*ex_score + w["evidence"]*ev_score, 4
     )
 
-    # decisión por DP (simple: aplica el mismo score; en real podrías granularizar por DP)
-    details = []
-    for dp in kpis.keys():
-        details.append({
-            "dp": dp,
-            "epistemic": ep_score,
-            "explicit": ex_score,
-            "evidence": ev_score,
-            "eee_score": eee_score,
-            "decision": decision(eee_score, th)
-        })
+    # decisión por DP: cada DP con sus propios componentes y evidencias
+    details = score_dps(kpis, explain, cfg, check)
+    summary = {k: 0 for k in ("publish", "review", "block")}
+    for d in details:
+        summary[d["decision"]] += 1
+    summary["critical_not_published"] = sum(1 for d in details if d["critical"] and d["decision"] != "publish")
 
     report = {
         "generated_utc": datetime.utcnow().isoformat()+"Z",
@@ -115,6 +158,7 @@ def main():
             "explicit": ex_meta,
             "epistemic": ep_meta
         },
+        "summary": summary,
         "details": details
     }
 
@@ -2,6 +2,7 @@ import json, os
 from pathlib import Path
 from datetime import datetime
 from merkle import build_manifest
+from merkle_verify import verify_proof
 
 RUN_ID = os.environ.get("STEELTRACE_RUN_ID", "2025Q1-ACME-0001")
 
@@ -31,7 +32,9 @@ def main():
 
     Path("evidence/evidence_manifest.json").write_text(json.dumps(man, indent=2, ensure_ascii=False))
     Path("evidence/tokens/2025Q1.tsr").write_text(json.dumps(token, indent=2))
-    Path("evidence/verify/2025Q1.txt").write_text("Verification: OK (simulated)\n")
+    # pruebas de inclusión comprobadas contra la raíz (TSA sigue simulada)
+    ok = all(verify_proof(r["sha256"], r["leaf"], r["proof"], man["merkle_root"]) for r in man["artifacts"])
+    Path("evidence/verify/2025Q1.txt").write_text(f"Verification: {'OK' if ok else 'FAILED'} ({len(man['artifacts'])} inclusion proofs, TSA simulated)\n")
     print("Evidence manifest → evidence/evidence_manifest.json")
 
 if __name__ == "__main__":
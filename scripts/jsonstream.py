@@ -0,0 +1,115 @@
+import json, os, re
+from itertools import islice
+from pathlib import Path
+
+# Lectura incremental de fuentes JSON (array de objetos o JSON Lines) sin
+# cargar el fichero completo: memoria acotada por bufsize + un registro. Los
+# normalizados en Parquet (normalized_store) se leen por lotes de columnas.
+
+_WS = re.compile(r"\s*")
+LINEAGE = Path("data/lineage.jsonl")
+
+def _detect(path: Path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return "empty"
+            s = chunk.lstrip()
+            if s:
+                return "array" if s[0] == "[" else "jsonl"
+
+def _iter_array(f, bufsize: int):
+    dec = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    started, expect_value, n = False, True, 0
+    while True:
+        pos = _WS.match(buf, pos).end()
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("array JSON sin cerrar")
+            chunk = f.read(bufsize)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        ch = buf[pos]
+        if not started:
+            if ch != "[":
+                raise ValueError("se esperaba un array JSON")
+            started, pos = True, pos + 1
+            continue
+        if ch == "]" and (not expect_value or n == 0):
+            return
+        if not expect_value:
+            if ch != ",":
+                raise ValueError(f"se esperaba ',' o ']' y se encontró {ch!r}")
+            expect_value, pos = True, pos + 1
+            continue
+        try:
+            obj, end = dec.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        # un valor que toca el final del buffer puede estar truncado (p.ej. un número)
+        if end is None or (end == len(buf) and not eof):
+            chunk = f.read(bufsize)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield obj
+        pos, expect_value, n = end, False, n + 1
+
+def iter_records(path: str | Path, bufsize: int = 1 << 20, columns: list[str] | None = None):
+    """Itera los registros de un array JSON, de un JSON Lines o de un Parquet (solo columns, si se indica)."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import normalized_store
+        yield from normalized_store.iter_records(path, columns)
+        return
+    kind = _detect(path)
+    if kind == "empty":
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        if kind == "array":
+            yield from _iter_array(f, bufsize)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def chunked(it, size: int):
+    it = iter(it)
+    while batch := list(islice(it, size)):
+        yield batch
+
+def write_ndjson(f, records: list[dict]) -> None:
+    f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+def active_normalized(lineage: Path = LINEAGE) -> dict[str, str]:
+    """Ruta base (x.json) → variante que escribió la última ingesta, según data/lineage.jsonl."""
+    try:
+        lines = lineage.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return {}
+    out = {}
+    for line in lines:
+        if line.strip():
+            p = Path(json.loads(line)["normalized"])
+            out[os.path.normpath(p.with_suffix(".json"))] = p.suffix
+    return out
+
+def resolve_normalized(path: str | Path) -> Path:
+    # data/normalized/x.json o sus variantes x.ndjson (modo streaming) y
+    # x.parquet (almacén columnar): manda la que registró la última ingesta en el
+    # linaje; fuera del linaje (p.ej. otros directorios), la más reciente
+    path = Path(path)
+    suffix = active_normalized().get(os.path.normpath(path.with_suffix(".json")))
+    if suffix is not None and path.with_suffix(suffix).exists():
+        return path.with_suffix(suffix)
+    cands = [p for p in (path, path.with_suffix(".ndjson"), path.with_suffix(".parquet")) if p.exists()]
+    return max(cands, key=lambda p: p.stat().st_mtime_ns) if cands else path
+
+def load_records(path: str | Path) -> list[dict]:
+    return list(iter_records(resolve_normalized(path)))
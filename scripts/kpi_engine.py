@@ -0,0 +1,136 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from jsonstream import chunked, iter_records, resolve_normalized
+
+# Motor de KPIs agrupado: E1 CO2e, S1 rotación y G1 tasa de resolución por
+# (company_id, period) en una pasada de group-by sobre todos los normalizados.
+# Cada dominio se reduce a sumas parciales por celda; los KPIs (por celda y
+# consolidados) se derivan de esas sumas con las mismas fórmulas del MVP. Los
+# normalizados en Parquet se leen por lotes Arrow con solo las columnas de COLUMNS.
+
+NORMALIZED = Path("data/normalized")
+KEYS = ["company_id", "period"]
+DOMAINS = {"energy": "E1", "hr": "S1", "ethics": "G1"}
+DEFAULT_EF = 0.23
+CHUNK = 200_000
+
+# sumas parciales por celda, en orden de columnas de la tabla
+PARTIALS = ["co2e_kg", "exits", "avg_employees", "cases_closed", "closed_with_resolution"]
+KPI_COLUMNS = ["E1-1.total_co2e_tons", "S1-1.employee_turnover", "G1-1.resolution_rate_pct"]
+# columnas de cada dominio que entran en las sumas parciales (proyección al leer Parquet)
+COLUMNS = {
+    "energy": ["company_id", "period_start", "kwh", "emission_factor_co2e"],
+    "hr": ["company_id", "period", "employees_start", "employees_end", "exits"],
+    "ethics": ["company_id", "period", "cases_closed", "closed_with_resolution"],
+}
+
+def normalized_files(domain: str, root: Path = NORMALIZED) -> list[Path]:
+    # x.json y sus variantes x.ndjson / x.parquet cuentan una vez (la que registra el linaje)
+    stems = sorted({p.with_suffix(".json") for p in root.glob(f"{domain}_*.*")
+                    if p.suffix in (".json", ".ndjson", ".parquet") and ".part" not in p.stem})
+    return [resolve_normalized(p) for p in stems]
+
+def _month(s: pd.Series) -> pd.Series:
+    # 'YYYY-MM' de fechas ISO en texto (JSON y Parquet) o de date32 de Parquet anteriores
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return pd.Series(s.to_numpy().astype("datetime64[M]").astype(str), index=s.index)
+    return s.astype(str).str[:7]
+
+def _partials_e1(df: pd.DataFrame) -> pd.DataFrame:
+    ef = df["emission_factor_co2e"] if "emission_factor_co2e" in df else pd.Series(np.nan, index=df.index)
+    return pd.DataFrame({
+        "company_id": df["company_id"],
+        "period": _month(df["period_start"]),
+        "co2e_kg": df["kwh"].astype(float) * ef.astype(float).fillna(DEFAULT_EF),
+    })
+
+def _partials_s1(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "company_id": df["company_id"], "period": df["period"],
+        "exits": df["exits"].astype(float),
+        "avg_employees": (df["employees_start"].astype(float) + df["employees_end"].astype(float)) / 2,
+    })
+
+def _partials_g1(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "company_id": df["company_id"], "period": df["period"],
+        "cases_closed": df["cases_closed"].astype(float),
+        "closed_with_resolution": df["closed_with_resolution"].astype(float),
+    })
+
+PARTIAL_FNS = {"energy": _partials_e1, "hr": _partials_s1, "ethics": _partials_g1}
+
+def frame_partials(domain: str, frames) -> pd.DataFrame:
+    """Sumas parciales por (company_id, period) de un iterable de bloques DataFrame."""
+    fn = PARTIAL_FNS[domain]
+    parts = [fn(df).groupby(KEYS, sort=False).sum() for df in frames]
+    if not parts:
+        return pd.DataFrame(columns=KEYS).set_index(KEYS)
+    return pd.concat(parts).groupby(level=KEYS, sort=False).sum()
+
+def domain_partials(domain: str, records, chunk_size: int = CHUNK) -> pd.DataFrame:
+    """Sumas parciales por (company_id, period) de un iterable de registros, por bloques."""
+    return frame_partials(domain, (pd.DataFrame.from_records(b) for b in chunked(records, chunk_size)))
+
+def file_frames(domain: str, path: str | Path, chunk_size: int = CHUNK):
+    """Bloques DataFrame de un normalizado: Parquet solo con las columnas del dominio, JSON por registros."""
+    if Path(path).suffix == ".parquet":
+        import normalized_store
+        for batch in normalized_store.iter_batches(path, COLUMNS[domain], chunk_size):
+            yield batch.to_pandas(date_as_object=False)
+    else:
+        for batch in chunked(iter_records(path), chunk_size):
+            yield pd.DataFrame.from_records(batch)
+
+def _combine(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    table = pd.concat(frames, axis=1).reindex(columns=PARTIALS)
+    return table.fillna(0.0).sort_index()
+
+def partials(sources: dict) -> pd.DataFrame:
+    """sources: dominio → iterable de registros. Devuelve las sumas parciales de todas las celdas."""
+    return _combine([domain_partials(d, recs) for d, recs in sources.items()])
+
+def load_partials(root: Path = NORMALIZED) -> pd.DataFrame:
+    def frames(domain):
+        for p in normalized_files(domain, root):
+            yield from file_frames(domain, p)
+    return _combine([frame_partials(d, frames(d)) for d in DOMAINS])
+
+def _kpis(co2e_kg, exits, avg_employees, cases_closed, closed_with_resolution):
+    # mismas fórmulas y redondeos que el cálculo original de una sola entidad
+    avg = np.where(avg_employees == 0, 1, avg_employees)
+    closed = np.where(cases_closed == 0, 1, cases_closed)
+    return (np.round(co2e_kg / 1000.0, 3),
+            np.round(exits / avg, 4),
+            np.round(closed_with_resolution / closed * 100, 2))
+
+def kpi_table(parts: pd.DataFrame) -> pd.DataFrame:
+    """Tabla columnar por (company_id, period): sumas parciales + KPIs."""
+    out = parts.copy()
+    for col, values in zip(KPI_COLUMNS, _kpis(*(parts[c].to_numpy() for c in PARTIALS))):
+        out[col] = values
+    return out.reset_index()
+
+def consolidated(parts: pd.DataFrame) -> dict:
+    """KPIs del perímetro completo (lo que sigue yendo a raga/kpis.json)."""
+    t = {c: float(v) for c, v in parts[PARTIALS].sum().items()}
+    # la plantilla es un stock, no un flujo: con varios periodos, el denominador de
+    # la rotación es la plantilla media por periodo (con un periodo, la de ese periodo)
+    headcount = parts["avg_employees"].groupby(level="period").sum()
+    headcount = headcount[headcount > 0]
+    t["avg_employees"] = float(headcount.mean()) if len(headcount) else 0.0
+    # round() de Python (como el cálculo original); np.round puede diferir en empates
+    return {
+        "E1-1.total_co2e_tons": round(t["co2e_kg"] / 1000.0, 3),
+        "S1-1.employee_turnover": round(t["exits"] / (t["avg_employees"] or 1), 4),
+        "G1-1.resolution_rate_pct": round(t["closed_with_resolution"] / (t["cases_closed"] or 1) * 100, 2),
+    }
+
+def write_table(table: pd.DataFrame, path: Path) -> None:
+    # Parquet vía pyarrow; en Arrow IPC (Feather) si la extensión es .arrow/.feather
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix in (".arrow", ".feather"):
+        table.to_feather(path)
+    else:
+        table.to_parquet(path, index=False)
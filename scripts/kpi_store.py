@@ -0,0 +1,103 @@
+import sqlite3
+from pathlib import Path
+import pandas as pd
+from kpi_engine import DOMAINS, KEYS, NORMALIZED, PARTIALS, file_frames, frame_partials, load_partials, normalized_files
+import artifacts
+
+# Agregados persistentes para KPIs incrementales (SQLite). Cada lote normalizado
+# se identifica por "<sha256>:<ruta>": el sha256 de su contenido (el
+# normalized_sha256 del linaje), tomado del registro de artefactos para no
+# releer los ficheros que no cambiaron, más la ruta, para que dos ficheros con
+# el mismo contenido cuenten los dos. Guarda sus sumas parciales por
+# (company_id, period) en `contributions`; `cells` mantiene la suma por celda.
+# Un lote nuevo o corregido solo recalcula las celdas que toca, y retirar una
+# clave resta exactamente lo que aportó.
+
+STORE = Path(".cache/raga/aggregates.sqlite")
+
+_COLS = ", ".join(PARTIALS)
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS batches (
+    hash TEXT PRIMARY KEY, domain TEXT NOT NULL, path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contributions (
+    hash TEXT NOT NULL, company_id TEXT NOT NULL, period TEXT NOT NULL,
+    {", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in PARTIALS)},
+    PRIMARY KEY (hash, company_id, period)
+);
+CREATE INDEX IF NOT EXISTS contributions_cell ON contributions (company_id, period);
+CREATE TABLE IF NOT EXISTS cells (
+    company_id TEXT NOT NULL, period TEXT NOT NULL,
+    {", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in PARTIALS)},
+    PRIMARY KEY (company_id, period)
+);
+"""
+
+def connect(path: Path = STORE) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    return con
+
+def _refresh_cells(con: sqlite3.Connection, cells: list[tuple]) -> None:
+    # cada celda afectada se recalcula desde sus aportaciones (sin deriva por restas)
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS touched (company_id TEXT, period TEXT)")
+    con.execute("DELETE FROM touched")
+    con.executemany("INSERT INTO touched VALUES (?, ?)", cells)
+    con.execute("DELETE FROM cells WHERE (company_id, period) IN (SELECT company_id, period FROM touched)")
+    con.execute(f"""
+        INSERT INTO cells (company_id, period, {_COLS})
+        SELECT c.company_id, c.period, {", ".join(f"SUM(c.{p})" for p in PARTIALS)}
+        FROM contributions c JOIN (SELECT DISTINCT company_id, period FROM touched) t
+          ON c.company_id = t.company_id AND c.period = t.period
+        GROUP BY c.company_id, c.period""")
+
+def add_batch(con: sqlite3.Connection, key: str, domain: str, frames, path: str = "") -> int:
+    """Registra las sumas parciales de un lote (bloques DataFrame); devuelve el número de celdas afectadas."""
+    if con.execute("SELECT 1 FROM batches WHERE hash = ?", (key,)).fetchone():
+        return 0
+    parts = frame_partials(domain, frames).reindex(columns=PARTIALS).fillna(0.0)
+    rows = [(key, cid, period, *vals) for (cid, period), vals in zip(parts.index, parts.itertuples(index=False))]
+    with con:
+        con.execute("INSERT INTO batches VALUES (?, ?, ?)", (key, domain, path))
+        con.executemany(f"INSERT INTO contributions (hash, company_id, period, {_COLS}) "
+                        f"VALUES ({', '.join('?' * (3 + len(PARTIALS)))})", rows)
+        _refresh_cells(con, [r[1:3] for r in rows])
+    return len(rows)
+
+def retract(con: sqlite3.Connection, key: str) -> int:
+    """Retira un lote por su clave; devuelve el número de celdas afectadas."""
+    cells = con.execute("SELECT company_id, period FROM contributions WHERE hash = ?", (key,)).fetchall()
+    with con:
+        con.execute("DELETE FROM contributions WHERE hash = ?", (key,))
+        con.execute("DELETE FROM batches WHERE hash = ?", (key,))
+        _refresh_cells(con, cells)
+    return len(cells)
+
+def sync(con: sqlite3.Connection, root: Path = NORMALIZED) -> dict:
+    """Alinea el store con los normalizados actuales: añade lotes nuevos y retira los que ya no están."""
+    files = [(domain, p) for domain in DOMAINS for p in normalized_files(domain, root)]
+    hashes = artifacts.sha256_many([p for _, p in files])
+    current = {f"{hashes[str(p)]}:{p}": (domain, p) for domain, p in files}
+    stored = {k for (k,) in con.execute("SELECT hash FROM batches")}
+    stats = {"added": 0, "retracted": 0, "cells": 0}
+    for k in stored - current.keys():
+        stats["cells"] += retract(con, k)
+        stats["retracted"] += 1
+    for k in current.keys() - stored:
+        domain, p = current[k]
+        stats["cells"] += add_batch(con, k, domain, file_frames(domain, p), str(p))
+        stats["added"] += 1
+    return stats
+
+def cell_partials(con: sqlite3.Connection) -> pd.DataFrame:
+    """Sumas parciales por celda, con el mismo formato que kpi_engine.partials."""
+    df = pd.read_sql_query(f"SELECT company_id, period, {_COLS} FROM cells", con)
+    return df.set_index(KEYS).sort_index()
+
+def verify(con: sqlite3.Connection, root: Path = NORMALIZED, tol: float = 1e-6) -> bool:
+    """Compara las celdas del store con una reconstrucción completa desde los normalizados."""
+    full, inc = load_partials(root), cell_partials(con)
+    if not full.index.equals(inc.index):
+        return False
+    return bool(((full[PARTIALS] - inc[PARTIALS]).abs() <= tol * (1 + full[PARTIALS].abs())).all().all())
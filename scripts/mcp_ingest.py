@@ -1,9 +1,12 @@
-import json, re
+import argparse, glob, json, shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
-from jsonschema import Draft202012Validator
-from utils_hash import sha256_file, sha256_json, write_json
+from utils_hash import canonical_json, sha256_lines, sha256_records, write_json
+import artifacts, merkle, normalized_store, record_hashes
+from dq_engine import compile_rules, count_passes, merge_counts, summarize, to_frame
+from jsonstream import chunked, iter_records, write_ndjson
+from schema_compile import get_checker
 import yaml # pyyaml es necesario para load_yaml
 
 # -------- Config --------
@@ -25,77 +28,14 @@ SAMPLES = {
     }
 }
 DQ_RULES_FILE = "contracts/dq_rules.yaml"
+RECORD_TREES = Path(".cache/merkle/records")  # un árbol Merkle por dominio, hojas = registros
 
-# -------- Helpers DQ --------
-def is_date_iso(s: str) -> bool:
-    try:
-        datetime.strptime(s, "%Y-%m-%d")
-        return True
-    except Exception:
-        return False
-
-def is_yyyy_mm(s: str) -> bool:
-    return bool(re.fullmatch(r"\d{4}-\d{2}", s))
-
-def within_month(date_str: str, month: str) -> bool:
-    # month = 'YYYY-MM'
-    return date_str.startswith(month)
-
-def apply_rule(row: dict, rule: dict, domain: str) -> bool:
-    # Supports simple predicates used in dq_rules.yaml
-    name = rule.get("rule")
-    field = rule.get("field")
-    if name == "not_null":
-        return row.get(field) is not None
-    if name == "is_date":
-        return is_date_iso(str(row.get(field, "")))
-    if name == "is_yyyy_mm":
-        return is_yyyy_mm(str(row.get(field, "")))
-    if name == ">=0":
-        try:
-            val = row.get(field)
-            if val is None: return False
-            return float(val) >= 0
-        except Exception:
-            return False
-    if name and name.startswith("within_month("):
-        m = re.search(r"within_month\('([^']+)'\)", name)
-        month = m.group(1) if m else ""
-        return within_month(str(row.get(field, "")), month)
-    if name and name.startswith("equals("):
-        m = re.search(r"equals\('([^']+)'\)", name)
-        ref = m.group(1) if m else ""
-        return str(row.get(field, "")) == ref
-    if name == "period_start <= period_end":
-        try:
-            ps = datetime.strptime(row.get("period_start"), "%Y-%m-%d")
-            pe = datetime.strptime(row.get("period_end"), "%Y-%m-%d")
-            return ps <= pe
-        except Exception:
-            return False
-    if name == "employees_end <= employees_start + 1000":
-        try:
-            return int(row.get("employees_end", 0)) <= int(row.get("employees_start", 0)) + 1000
-        except Exception:
-            return False
-    if name == "closed_with_resolution <= cases_closed":
-        try:
-            return int(row.get("closed_with_resolution", 0)) <= int(row.get("cases_closed", 0))
-        except Exception:
-            return False
-    return True
-
+# -------- DQ --------
 def evaluate_dq(records: list[dict], rules: dict, domain: str) -> dict:
-    res = {"completeness": [], "validity": [], "consistency": [], "timeliness": []}
-    for cat in res.keys():
-        for r in rules.get(cat, []):
-            passed = sum(1 for row in records if apply_rule(row, r, domain))
-            total = max(1, len(records))
-            res[cat].append({"rule": r, "pass_rate": passed / total})
-    # Aggregate
-    agg = {k: (sum(x["pass_rate"] for x in v) / max(1, len(v))) if v else 1.0 for k, v in res.items()}
-    agg["dq_pass"] = all(v >= 0.95 for v in agg.values())
-    return {"by_rule": res, "aggregate": agg}
+    # reglas compiladas una vez y evaluadas por columnas (ver dq_engine)
+    compiled = compile_rules(rules)
+    counts = count_passes(to_frame(records), compiled)
+    return summarize(compiled, counts, len(records))
 
 # -------- Load DQ rules --------
 def load_yaml(path: str) -> dict:
@@ -105,68 +45,253 @@ def load_yaml(path: str) -> dict:
 def json_load(path: str) -> dict | list:
     return json.loads(Path(path).read_text(encoding="utf-8"))
 
-# -------- Main --------
-def main():
-    dq_rules = load_yaml(DQ_RULES_FILE)
+# -------- Validación --------
+def validate_records(checker, records: list[dict], offset: int = 0) -> tuple[list[dict], list[dict]]:
+    # camino rápido con el checker compilado; la enumeración completa de
+    # errores (jsonschema) solo se ejecuta para los registros que no lo pasan
+    check, validator = checker
+    valid_records, errors = [], []
+    for i, rec in enumerate(records, start=offset):
+        if check is not None and check(rec):
+            valid_records.append(rec)
+            continue
+        errs = sorted(validator.iter_errors(rec), key=lambda e: e.path)
+        if errs:
+            errors.append({"index": i, "errors": [e.message for e in errs]})
+        else:
+            valid_records.append(rec)
+    return valid_records, errors
 
-    normalized_paths = []
-    dq_summary = {}
-
-    for domain, cfg in SAMPLES.items():
-        src = Path(cfg["input"])
-        sch = Path(cfg["schema"])
-        dst = Path(cfg["normalized"])
-        dst.parent.mkdir(parents=True, exist_ok=True)
-
-        # 1) Cargar datos
-        records = json_load(src)
-        if not isinstance(records, list):
-            raise ValueError(f"{src} debe ser una lista de objetos JSON")
-
-        # 2) Validar JSON Schema
-        schema = json_load(sch)
-        validator = Draft202012Validator(schema)
-        valid_records, errors = [], []
-        for i, rec in enumerate(records):
-            errs = sorted(validator.iter_errors(rec), key=lambda e: e.path)
-            if errs:
-                errors.append({"index": i, "errors": [e.message for e in errs]})
-            else:
-                valid_records.append(rec)
+# -------- Ingesta por shard --------
+def _ingest_batch(src: Path, checker, compiled: dict, dst: Path, hashes: bool, schema: dict) -> tuple:
+    # 1) Cargar datos
+    records = json_load(src)
+    if not isinstance(records, list):
+        raise ValueError(f"{src} debe ser una lista de objetos JSON")
+
+    # 2) Validar JSON Schema
+    valid_records, errors = validate_records(checker, records)
 
-        # 3) Escribir normalizados (solo válidos)
+    # 3) Escribir normalizados (solo válidos); en Parquet, con los tipos del contrato
+    stored = valid_records
+    if dst.suffix == ".parquet":
+        stored = normalized_store.coerce(valid_records, schema)
+        normalized_store.write(dst, stored, schema)
+    elif dst.suffix == ".ndjson":
+        with open(dst, "w", encoding="utf-8") as out:
+            write_ndjson(out, valid_records)
+    else:
         write_json(dst, valid_records)
-        normalized_paths.append(str(dst))
-
-        # 4) DQ por reglas
-        rules = dq_rules.get(domain, {})
-        dq = evaluate_dq(valid_records, rules, domain)
-        dq_summary[domain] = {
-            "source": str(src),
-            "schema": str(sch),
-            "records_total": len(records),
-            "records_valid": len(valid_records),
-            "schema_errors": errors,
-            "dq": dq
-        }
-
-    # 5) Linaje y hashes
+    if hashes:
+        with record_hashes.Writer(record_hashes.sidecar_path(dst)) as w:
+            w.write(sha256_records(stored))
+
+    # 4) DQ por reglas
+    counts = count_passes(to_frame(valid_records), compiled)
+    return len(records), len(valid_records), errors, counts
+
+def _ingest_stream(src: Path, checker, compiled: dict, dst: Path, chunk_size: int, hashes: bool,
+                   schema: dict) -> tuple:
+    # Lee la fuente de forma incremental, valida y puntúa DQ por bloques y
+    # escribe los normalizados en NDJSON según se producen. Los conteos DQ son
+    # enteros y se acumulan entre bloques: las tasas coinciden con el modo batch.
+    # Las líneas se escriben siempre en forma canónica (el fichero no depende de
+    # --no-record-hashes); con hashes, cada línea se hashea tal cual.
+    # En Parquet cada bloque añade row groups y se hashean los registros tipados.
+    counts = count_passes(to_frame([]), compiled)
+    total, n_valid, errors = 0, 0, []
+    side = record_hashes.Writer(record_hashes.sidecar_path(dst)) if hashes else None
+    parquet = dst.suffix == ".parquet"
+    with (normalized_store.Writer(dst, schema) if parquet else open(dst, "w", encoding="utf-8")) as out:
+        for chunk in chunked(iter_records(src), chunk_size):
+            valid_records, errs = validate_records(checker, chunk, offset=total)
+            if parquet:
+                stored = normalized_store.coerce(valid_records, schema)
+                out.write(stored)
+                if side is not None:
+                    side.write(sha256_records(stored))
+            else:
+                lines = [canonical_json(r) for r in valid_records]
+                out.write("".join(l + "\n" for l in lines))
+                if side is not None:
+                    side.write(sha256_lines(lines))
+            counts = merge_counts(counts, count_passes(to_frame(valid_records), compiled))
+            errors.extend(errs)
+            total += len(chunk)
+            n_valid += len(valid_records)
+    if side is not None:
+        side.close()
+    return total, n_valid, errors, counts
+
+def ingest_shard(task: dict) -> dict:
+    """Unidad de trabajo del pool: un dominio o un shard de un dominio."""
+    src, dst = Path(task["src"]), Path(task["dst"])
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    schema = json_load(task["schema"])
+    checker = get_checker(schema)
+    compiled = compile_rules(task["rules"])
+    hashes = task.get("record_hashes", True)
+    if not hashes:
+        record_hashes.sidecar_path(dst).unlink(missing_ok=True)  # no dejar un sidecar obsoleto
+    if task["stream"]:
+        total, n_valid, errors, counts = _ingest_stream(src, checker, compiled, dst, task["chunk_size"], hashes, schema)
+    else:
+        total, n_valid, errors, counts = _ingest_batch(src, checker, compiled, dst, hashes, schema)
+    return {
+        "domain": task["domain"],
+        "src": str(src),
+        "dst": str(dst),
+        "records_total": total,
+        "records_valid": n_valid,
+        "schema_errors": errors,
+        "counts": counts,
+    }
+
+# -------- Planificación y merge --------
+def shards(pattern: str) -> list[Path]:
+    # 'input' puede ser un fichero o un glob con los shards (p.ej. por planta)
+    if not any(c in pattern for c in "*?["):
+        return [Path(pattern)]
+    found = sorted(Path(p) for p in glob.glob(pattern))
+    if not found:
+        raise ValueError(f"{pattern}: no hay ficheros de entrada")
+    return found
+
+def normalized_path(cfg: dict, stream: bool, fmt: str = "json") -> Path:
+    dst = Path(cfg["normalized"])
+    if fmt == "parquet":
+        return dst.with_suffix(".parquet")
+    return dst.with_suffix(".ndjson") if stream else dst
+
+def plan_tasks(samples: dict, dq_rules: dict, stream: bool, chunk_size: int,
+               hashes: bool = True, fmt: str = "json") -> list[dict]:
+    tasks = []
+    for domain, cfg in samples.items():
+        final = normalized_path(cfg, stream, fmt)
+        srcs = shards(cfg["input"])
+        part = ".parquet" if fmt == "parquet" else ".ndjson"
+        for i, src in enumerate(srcs):
+            # con varios shards cada tarea escribe su parte (NDJSON o Parquet) y el padre las une en orden
+            dst = final if len(srcs) == 1 else final.with_name(f"{final.stem}.part{i:04d}{part}")
+            tasks.append({
+                "domain": domain, "src": str(src), "schema": cfg["schema"], "dst": str(dst),
+                "rules": dq_rules.get(domain, {}), "stream": stream, "chunk_size": chunk_size,
+                "record_hashes": hashes,
+            })
+    return tasks
+
+def merge_parts(parts: list[Path], dst: Path) -> None:
+    if dst.suffix == ".parquet":
+        normalized_store.merge(parts, dst)
+        return
+    if dst.suffix == ".ndjson":
+        with open(dst, "wb") as out:
+            for p in parts:
+                with open(p, "rb") as f:
+                    shutil.copyfileobj(f, out)
+    else:
+        # array JSON escrito registro a registro (sin cargar las partes en memoria)
+        with open(dst, "w", encoding="utf-8") as out:
+            out.write("[")
+            first = True
+            for p in parts:
+                with open(p, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            out.write(("\n  " if first else ",\n  ") + line.rstrip("\n"))
+                            first = False
+            out.write("]" if first else "\n]")
+    for p in parts:
+        p.unlink()
+
+def merge_domain(cfg: dict, rules: dict, results: list[dict]) -> dict:
+    # orden de shards fijo → conteos, índices de error y reporte deterministas
+    compiled = compile_rules(rules)
+    counts, errors, offset = None, [], 0
+    for r in results:
+        counts = r["counts"] if counts is None else merge_counts(counts, r["counts"])
+        errors += [{**e, "index": e["index"] + offset} for e in r["schema_errors"]]
+        offset += r["records_total"]
+    n_valid = sum(r["records_valid"] for r in results)
+    summary = {
+        "source": str(Path(cfg["input"])),
+        "schema": str(Path(cfg["schema"])),
+        "records_total": offset,
+        "records_valid": n_valid,
+        "schema_errors": errors,
+        "dq": summarize(compiled, counts, n_valid)
+    }
+    if len(results) > 1:
+        summary["shards"] = [r["src"] for r in results]
+    return summary
+
+def run_ingest(samples: dict, dq_rules: dict, workers: int = 1, stream: bool = False,
+               chunk_size: int = 50_000, hashes: bool = True, fmt: str = "json") -> tuple[dict, dict, list[dict]]:
+    """Ingesta de todos los dominios/shards; devuelve (normalizados, resumen DQ, linaje)."""
+    tasks = plan_tasks(samples, dq_rules, stream, chunk_size, hashes, fmt)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as ex:
+            results = list(ex.map(ingest_shard, tasks))  # map conserva el orden de las tareas
+    else:
+        results = [ingest_shard(t) for t in tasks]
+
+    normalized, dq_summary, lineage = {}, {}, []
+    for domain, cfg in samples.items():
+        dom_results = [r for r in results if r["domain"] == domain]
+        dst = normalized_path(cfg, stream, fmt)
+        if len(dom_results) > 1:
+            merge_parts([Path(r["dst"]) for r in dom_results], dst)
+            if hashes:
+                record_hashes.merge([record_hashes.sidecar_path(r["dst"]) for r in dom_results],
+                                    record_hashes.sidecar_path(dst))
+        normalized[domain] = dst
+        dq_summary[domain] = merge_domain(cfg, dq_rules.get(domain, {}), dom_results)
+
+        # 5) Linaje y hashes (un registro por shard, en orden estable)
+        dst_sha = artifacts.sha256(dst)
+        records = {}
+        if hashes:
+            # hojas = hashes de registro en orden: prueba de inclusión por registro
+            side = record_hashes.sidecar_path(dst)
+            tree = merkle.sync_tree(RECORD_TREES / domain, record_hashes.digests(side))
+            records = {"records_sha256": str(side), "records_merkle_root": f"SHA256:{tree.root()}"}
+        for r in dom_results:
+            lineage.append({
+                "domain": domain,
+                "src": r["src"],
+                "src_sha256": artifacts.sha256(r["src"]),
+                "normalized": str(dst),
+                "format": dst.suffix.lstrip("."),
+                "normalized_sha256": dst_sha,
+                **records,
+                "utc": datetime.utcnow().isoformat() + "Z"
+            })
+    return normalized, dq_summary, lineage
+
+# -------- Main --------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ingesta MCP: JSON Schema + reglas DQ + linaje")
+    ap.add_argument("--stream", action="store_true",
+                    help="lectura incremental por bloques y salida NDJSON o Parquet por bloques (memoria acotada)")
+    ap.add_argument("--chunk-size", type=int, default=50_000)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="procesos para ingerir dominios/shards en paralelo (1 = en proceso)")
+    ap.add_argument("--no-record-hashes", action="store_true",
+                    help="sin hashes por registro (sidecar .sha256 y árbol Merkle de registros)")
+    ap.add_argument("--format", choices=["parquet", "json"],
+                    default="parquet" if normalized_store.available() else "json",
+                    help="parquet: almacén columnar tipado (requiere pyarrow); json: array JSON o NDJSON con --stream")
+    ap.add_argument("--export-json", action="store_true",
+                    help=f"con --format parquet, exporta además a JSON en {normalized_store.EXPORT}/")
+    args = ap.parse_args(argv)
+
+    dq_rules = load_yaml(DQ_RULES_FILE)
+    normalized, dq_summary, lineage = run_ingest(SAMPLES, dq_rules, args.workers, args.stream,
+                                                 args.chunk_size, not args.no_record_hashes, args.format)
+
     lineage_path = Path("data/lineage.jsonl")
     lineage_path.parent.mkdir(parents=True, exist_ok=True)
-    lines = []
-    for domain, cfg in SAMPLES.items():
-        src = Path(cfg["input"])
-        dst = Path(cfg["normalized"])
-        lines.append(json.dumps({
-            "domain": domain,
-            "src": str(src),
-            "src_sha256": sha256_file(src),
-            "normalized": str(dst),
-            "normalized_sha256": sha256_file(dst),
-            "utc": datetime.utcnow().isoformat() + "Z"
-        }))
-
-    lineage_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    lineage_path.write_text("\n".join(json.dumps(l) for l in lineage) + "\n", encoding="utf-8")
 
     # 6) Reporte DQ agregado
     def ok(dom):
@@ -182,8 +307,12 @@ def main():
     print("Ingesta/DQ completada.")
     print("data/dq_report.json escrito.")
     print("data/lineage.jsonl escrito.")
-    for p in normalized_paths:
+    for p in normalized.values():
         print("OK →", p)
+        if args.export_json and p.suffix == ".parquet":
+            dst = normalized_store.EXPORT / f"{p.stem}.json"
+            normalized_store.export_json(p, dst)
+            print("   JSON →", dst)
 
 if __name__ == "__main__":
     main()
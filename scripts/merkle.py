@@ -1,9 +1,15 @@
 from pathlib import Path
-import hashlib, json
+import hashlib, json, os
+import artifacts
 
-def sha256_file(path: str | Path) -> str:
-    p = Path(path)
-    return hashlib.sha256(p.read_bytes()).hexdigest()
+# Árbol Merkle persistente: cada nivel es un fichero de nodos de 32 bytes
+# (level_0.bin = hojas) más meta.json con los tamaños. La raíz es la misma que
+# merkle_root_from_hashes: las hojas se hashean como su hex en UTF-8, el nodo
+# impar se empareja consigo mismo y la raíz es sha256 del nodo superior.
+# Cambiar una hoja recalcula solo su camino; añadir hojas, solo el borde derecho.
+
+NODE = 32
+BLOCK = 1 << 16  # padres recalculados por lectura de nivel
 
 def merkle_root_from_hashes(hashes: list[str]) -> str:
     if not hashes: return ""
@@ -17,10 +23,156 @@ def merkle_root_from_hashes(hashes: list[str]) -> str:
         level = nxt
     return hashlib.sha256(level[0]).hexdigest()
 
-def build_manifest(artifacts: list[str], run_id: str) -> dict:
-    rows = []
-    for a in artifacts:
-        sha = sha256_file(a)
-        rows.append({"path": a, "sha256": sha})
-    root = merkle_root_from_hashes([r["sha256"] for r in rows])
-    return {"run_id": run_id, "artifacts": rows, "merkle_root": f"SHA256:{root}"}
+def _counts(n: int) -> list[int]:
+    counts = [n]
+    while counts[-1] > 1:
+        counts.append((counts[-1] + 1) // 2)
+    return counts
+
+class MerkleTree:
+    """Árbol Merkle en disco (un directorio); hojas = sha256 en hex."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            self.n = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))["n"]
+        except FileNotFoundError:
+            self.n = 0
+        self.counts = _counts(self.n)
+
+    def _file(self, k: int) -> Path:
+        return self.path / f"level_{k}.bin"
+
+    def _read(self, k: int, lo: int, hi: int) -> bytes:
+        with open(self._file(k), "rb") as f:
+            f.seek(lo * NODE)
+            return f.read((hi - lo) * NODE)
+
+    def _write(self, k: int, lo: int, data: bytes, size: int) -> None:
+        p = self._file(k)
+        with open(p, "r+b" if p.exists() else "w+b") as f:
+            f.seek(lo * NODE)
+            f.write(data)
+            f.truncate(size * NODE)
+
+    def _node(self, k: int, i: int) -> bytes:
+        # bytes que entran en el hash del padre: hex de la hoja en el nivel 0
+        raw = self._read(k, i, i + 1)
+        return raw.hex().encode() if k == 0 else raw
+
+    def _save(self) -> None:
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps({"n": self.n, "levels": self.counts}), encoding="utf-8")
+        tmp.replace(self.path / "meta.json")
+
+    def _rehash_range(self, k: int, lo: int) -> None:
+        # recalcula los padres del nivel k desde el hijo lo hasta el final del nivel
+        count, sha = self.counts[k], hashlib.sha256
+        start = lo // 2
+        for plo in range(start, self.counts[k + 1], BLOCK):
+            phi = min(plo + BLOCK, self.counts[k + 1])
+            raw = self._read(k, 2 * plo, min(2 * phi, count))
+            nodes = [raw[i:i + NODE] for i in range(0, len(raw), NODE)]
+            if k == 0:
+                nodes = [b.hex().encode() for b in nodes]
+            if len(nodes) % 2:
+                nodes.append(nodes[-1])
+            out = b"".join(sha(nodes[i] + nodes[i + 1]).digest() for i in range(0, len(nodes), 2))
+            self._write(k + 1, plo, out, self.counts[k + 1])
+
+    def append(self, hashes) -> None:
+        """Añade hojas (sha256 en hex, o digests binarios concatenados); solo se recalcula el borde derecho."""
+        data = hashes if isinstance(hashes, bytes) else b"".join(bytes.fromhex(h) for h in hashes)
+        if not data:
+            return
+        old = self.n
+        self.n += len(data) // NODE
+        self.counts = _counts(self.n)
+        self._write(0, old, data, self.n)
+        lo = old
+        for k in range(len(self.counts) - 1):
+            # un padre preexistente cambia si su par era el nodo impar duplicado
+            self._rehash_range(k, lo)
+            lo //= 2
+        for k in range(len(self.counts), len(self.counts) + 64):
+            if not self._file(k).exists():
+                break
+            self._file(k).unlink()
+        self._save()
+
+    def update(self, changes: dict[int, str | bytes]) -> None:
+        """Sustituye hojas (índice → sha256); recalcula solo sus caminos a la raíz."""
+        dirty = set()
+        for i, h in changes.items():
+            if not 0 <= i < self.n:
+                raise IndexError(i)
+            self._write(0, i, h if isinstance(h, bytes) else bytes.fromhex(h), self.n)
+            dirty.add(i)
+        sha = hashlib.sha256
+        for k in range(len(self.counts) - 1):
+            parents = sorted({i // 2 for i in dirty})
+            for p in parents:
+                a = self._node(k, 2 * p)
+                b = self._node(k, 2 * p + 1) if 2 * p + 1 < self.counts[k] else a
+                self._write(k + 1, p, sha(a + b).digest(), self.counts[k + 1])
+            dirty = set(parents)
+        self._save()
+
+    def leaf(self, i: int) -> str:
+        return self._read(0, i, i + 1).hex()
+
+    def leaves(self) -> list[str]:
+        raw = self._read(0, 0, self.n) if self.n else b""
+        return [raw[i:i + NODE].hex() for i in range(0, len(raw), NODE)]
+
+    def root(self) -> str:
+        if not self.n:
+            return ""
+        return hashlib.sha256(self._node(len(self.counts) - 1, 0)).hexdigest()
+
+    def proof(self, i: int) -> list[str]:
+        """Hermanos del camino hoja → raíz, en hex (O(log n) lecturas)."""
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        out = []
+        for k in range(len(self.counts) - 1):
+            j = i ^ 1 if (i ^ 1) < self.counts[k] else i
+            out.append(self._read(k, j, j + 1).hex())
+            i //= 2
+        return out
+
+def _reset(path: Path) -> MerkleTree:
+    for f in path.glob("level_*.bin"):
+        os.remove(f)
+    (path / "meta.json").unlink(missing_ok=True)
+    return MerkleTree(path)
+
+def sync_tree(path: Path, hashes: list[str] | bytes) -> MerkleTree:
+    """Alinea el árbol persistido con la lista de hojas, tocando solo lo que cambió."""
+    data = hashes if isinstance(hashes, bytes) else b"".join(bytes.fromhex(h) for h in hashes)
+    tree = MerkleTree(path)
+    if tree.n > len(data) // NODE:
+        tree = _reset(path)
+    old, changes, step = tree._read(0, 0, tree.n) if tree.n else b"", {}, NODE * BLOCK
+    for lo in range(0, len(old), step):
+        if old[lo:lo + step] != data[lo:lo + step]:
+            for j in range(lo, min(lo + step, len(old)), NODE):
+                if old[j:j + NODE] != data[j:j + NODE]:
+                    changes[j // NODE] = data[j:j + NODE]
+    if len(changes) * 16 > tree.n:
+        # muchas hojas cambiadas: reconstruir por bloques sale más barato que camino a camino
+        tree = _reset(path)
+    elif changes:
+        tree.update(changes)
+    tree.append(data[tree.n * NODE:])
+    return tree
+
+def build_manifest(paths: list[str], run_id: str, tree_dir: Path = Path(".cache/merkle/evidence")) -> dict:
+    # vía el registro de artefactos: solo se leen (en paralelo) los que cambiaron
+    hashes = artifacts.sha256_many(paths)
+    tree = sync_tree(tree_dir, [hashes[a] for a in paths])
+    root = tree.root()
+    # cada artefacto lleva su prueba de inclusión (scripts/merkle_verify.py)
+    rows = [{"path": a, "sha256": hashes[a], "leaf": i, "proof": tree.proof(i)} for i, a in enumerate(paths)]
+    return {"run_id": run_id, "artifacts": rows, "merkle_root": f"SHA256:{root}", "leaves": len(paths)}
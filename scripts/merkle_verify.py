@@ -0,0 +1,66 @@
+import argparse, hashlib, json, sys
+from pathlib import Path
+
+# Verificador autónomo de manifiestos de evidencia (solo stdlib): rehashea cada
+# artefacto y comprueba su prueba de inclusión contra merkle_root, en O(log n)
+# por artefacto y sin el árbol en disco. Mismo esquema que merkle.MerkleTree.
+
+def verify_proof(leaf: str, index: int, proof: list[str], root: str) -> bool:
+    """True si la hoja (sha256 en hex) en la posición index pertenece al árbol de raíz root."""
+    cur = leaf.encode()
+    for k, sib in enumerate(proof):
+        sib = sib.encode() if k == 0 else bytes.fromhex(sib)
+        cur = hashlib.sha256(sib + cur if index & 1 else cur + sib).digest()
+        index >>= 1
+    return hashlib.sha256(cur).hexdigest() == root.removeprefix("SHA256:")
+
+def root_from_leaves(leaves: list[str]) -> str:
+    # manifiestos sin pruebas: se recalcula la raíz con todas las hojas
+    level = [h.encode() for h in leaves]
+    while len(level) > 1:
+        level = [hashlib.sha256(level[i] + level[min(i + 1, len(level) - 1)]).digest()
+                 for i in range(0, len(level), 2)]
+    return hashlib.sha256(level[0]).hexdigest() if level else ""
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Verifica artefactos contra un manifiesto de evidencia")
+    ap.add_argument("manifest", nargs="?", default="evidence/evidence_manifest.json")
+    ap.add_argument("--path", action="append", help="verifica solo estos artefactos (repetible)")
+    ap.add_argument("--no-rehash", action="store_true", help="solo comprueba las pruebas, sin leer los ficheros")
+    args = ap.parse_args(argv)
+
+    man = json.loads(Path(args.manifest).read_text(encoding="utf-8"))
+    rows = [r for r in man["artifacts"] if not args.path or r["path"] in args.path]
+    missing = set(args.path or []) - {r["path"] for r in rows}
+    ok = not missing
+    legacy = None
+    for p in sorted(missing):
+        print(f"FAIL {p}: no está en el manifiesto")
+    for r in rows:
+        if not args.no_rehash:
+            try:
+                if file_sha256(r["path"]) != r["sha256"]:
+                    print(f"FAIL {r['path']}: sha256 no coincide")
+                    ok = False
+                    continue
+            except OSError as e:
+                print(f"FAIL {r['path']}: {e}")
+                ok = False
+                continue
+        if "proof" in r:
+            good = verify_proof(r["sha256"], r["leaf"], r["proof"], man["merkle_root"])
+        else:
+            if legacy is None:
+                legacy = root_from_leaves([a["sha256"] for a in man["artifacts"]]) == man["merkle_root"].removeprefix("SHA256:")
+            good = legacy
+        print(f"{'OK  ' if good else 'FAIL'} {r['path']}")
+        ok &= good
+    print("Verification:", "OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import argparse, json
+from pathlib import Path
+
+# Almacén columnar de los normalizados: un Parquet por dominio y periodo
+# (data/normalized/<dominio>_<periodo>.parquet), tipado a partir del JSON Schema
+# del contrato (integer → int64, number → float64, string → string; lo no
+# obligatorio admite nulos). Las string/date se guardan como texto ISO marcado
+# con format=date: el contrato no valida el formato y una fecha imposible
+# (2024-01-32) debe llegar a la regla DQ is_date igual que en JSON, no abortar
+# la escritura; quien necesite date32 las convierte al leer. Aguas abajo se lee con
+# proyección de columnas (iter_batches/read_table) y memory-map; los auditores
+# tienen la exportación JSON en data/export/ con el mismo formato que antes.
+# pyarrow es opcional: sin él, mcp_ingest sigue escribiendo JSON.
+
+EXPORT = Path("data/export")
+COMPRESSION = "zstd"
+ROW_GROUP = 64_000   # filas por row group (estadísticas min/max para filtros)
+BATCH = 64_000       # filas por lote al leer
+
+def available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def arrow_schema(schema: dict):
+    """Esquema Arrow de un JSON Schema de contrato (objeto plano, sin propiedades adicionales)."""
+    import pyarrow as pa
+    if schema.get("additionalProperties") is not False:
+        raise ValueError(f"{schema.get('title')}: el contrato debe fijar additionalProperties: false")
+    required = set(schema.get("required", []))
+    fields = []
+    for name, prop in schema["properties"].items():
+        kind = prop.get("type")
+        if kind == "integer":
+            t = pa.int64()
+        elif kind == "number":
+            t = pa.float64()
+        elif kind == "boolean":
+            t = pa.bool_()
+        elif kind == "string":
+            t = pa.string()
+        else:
+            raise ValueError(f"{schema.get('title')}.{name}: tipo {kind!r} sin columna equivalente")
+        meta = {"format": prop["format"]} if prop.get("format") else None
+        fields.append(pa.field(name, t, nullable=name not in required, metadata=meta))
+    return pa.schema(fields, metadata={"steeltrace.contract": schema.get("title", "")})
+
+_EXACT = 2.0 ** 53
+
+def _json_number(v: float):
+    # JSON no distingue 12300 de 12300.0: los number enteros se representan como int
+    return int(v) if v.is_integer() and abs(v) < _EXACT else v
+
+def coerce(records: list[dict], schema: dict) -> list[dict]:
+    """Registros en la forma que devuelve el almacén (lo que se hashea y se exporta)."""
+    props = schema["properties"]
+    nums = [k for k, p in props.items() if p.get("type") in ("number", "integer")]
+    out = []
+    for r in records:
+        fix = {k: _json_number(r[k]) for k in nums if type(r.get(k)) is float}
+        out.append({**r, **fix} if fix else r)
+    return out
+
+def to_table(records: list[dict], schema: dict):
+    import pyarrow as pa
+    sch = arrow_schema(schema)
+    cols = [pa.array([r.get(field.name) for r in records], field.type) for field in sch]
+    return pa.Table.from_arrays(cols, schema=sch)
+
+class Writer:
+    """Parquet escrito por bloques (modo streaming de mcp_ingest); cada write() añade row groups."""
+    def __init__(self, path: str | Path, schema: dict, compression: str = COMPRESSION, row_group: int = ROW_GROUP):
+        import pyarrow.parquet as pq
+        self.schema, self.row_group, self.rows = schema, row_group, 0
+        self._w = pq.ParquetWriter(str(path), arrow_schema(schema), compression=compression)
+
+    def write(self, records: list[dict]) -> None:
+        if records:
+            self._w.write_table(to_table(records, self.schema), row_group_size=self.row_group)
+            self.rows += len(records)
+
+    def close(self) -> None:
+        self._w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write(path: str | Path, records: list[dict], schema: dict) -> None:
+    with Writer(path, schema) as w:
+        w.write(records)
+
+def read_table(path: str | Path, columns: list[str] | None = None, filters=None):
+    """Tabla Arrow con proyección (columns) y filtros sobre las estadísticas de row group."""
+    import pyarrow.parquet as pq
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+
+def iter_batches(path: str | Path, columns: list[str] | None = None, batch_size: int = BATCH):
+    import pyarrow.parquet as pq
+    yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns)
+
+def count(path: str | Path) -> int:
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).metadata.num_rows
+
+def _json_rows(batch) -> list[dict]:
+    # fechas en ISO (date32 en Parquet escritos antes de guardarlas como texto), number enteros como int y sin claves nulas: los mismos dicts que el normalizado JSON
+    import pyarrow as pa
+    cols = [c.cast(pa.string()) if pa.types.is_date32(c.type) else c for c in batch.columns]
+    floats = {f.name for f in batch.schema if pa.types.is_floating(f.type)}
+    rows = pa.RecordBatch.from_arrays(cols, names=batch.schema.names).to_pylist()
+    return [{k: _json_number(v) if k in floats else v for k, v in r.items() if v is not None} for r in rows]
+
+def iter_records(path: str | Path, columns: list[str] | None = None, batch_size: int = BATCH):
+    """Registros (dicts en forma JSON) por lotes, leyendo solo las columnas pedidas."""
+    for batch in iter_batches(path, columns, batch_size):
+        yield from _json_rows(batch)
+
+def merge(parts: list[Path], dst: Path) -> None:
+    """Une los Parquet de varios shards en orden (row group a row group) y borra las partes."""
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for p in parts:
+            f = pq.ParquetFile(p)
+            if writer is None:
+                writer = pq.ParquetWriter(str(dst), f.schema_arrow, compression=COMPRESSION)
+            for i in range(f.num_row_groups):
+                writer.write_table(f.read_row_group(i))
+    finally:
+        if writer is not None:
+            writer.close()
+    for p in parts:
+        p.unlink()
+
+def export_json(src: str | Path, dst: str | Path) -> int:
+    """Exporta un Parquet al array JSON con indent=2 de utils_hash.write_json, en flujo."""
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(dst, "w", encoding="utf-8") as out:
+        out.write("[")
+        for batch in iter_batches(src):
+            for r in _json_rows(batch):
+                body = json.dumps(r, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                out.write(("\n  " if n == 0 else ",\n  ") + body)
+                n += 1
+        out.write("\n]" if n else "]")
+    return n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Almacén columnar de normalizados (Parquet)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="exporta a JSON para auditoría")
+    ex.add_argument("paths", nargs="*", help="Parquet a exportar (por defecto data/normalized/*.parquet)")
+    ex.add_argument("--out-dir", default=str(EXPORT))
+    args = ap.parse_args(argv)
+
+    paths = [Path(p) for p in args.paths] or sorted(Path("data/normalized").glob("*.parquet"))
+    for p in paths:
+        dst = Path(args.out_dir) / f"{p.stem}.json"
+        print(f"{p} → {dst} ({export_json(p, dst)} registros)")
+
+if __name__ == "__main__":
+    main()
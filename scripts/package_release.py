@@ -1,11 +1,16 @@
-import zipfile
+import argparse, json, zipfile
 from pathlib import Path
 from datetime import datetime
+import artifacts, normalized_store, release_store
+from jsonstream import resolve_normalized
 
-ARTS = [
+# normalizados: se empaqueta la variante vigente (JSON, NDJSON o Parquet)
+NORMALIZED = [
     "data/normalized/energy_2024-01.json",
     "data/normalized/hr_2024-01.json",
     "data/normalized/ethics_2024-01.json",
+]
+ARTS = [
     "ontology/validation.log","ontology/linaje.ttl",
     "raga/kpis.json","raga/explain.json",
     "ops/gate_report.json","eee/eee_report.json",
@@ -14,14 +19,54 @@ ARTS = [
     "ops/slo_report.json","ops/hitl_kappa.json"
 ]
 
-def main():
+def exports(normalized: list[Path]) -> list[str]:
+    """Exportación JSON para auditores, regenerada desde el Parquet vigente (nunca una copia anterior)."""
+    out = []
+    for p in normalized:
+        if p.suffix == ".parquet":
+            dst = normalized_store.EXPORT / f"{p.stem}.json"
+            normalized_store.export_json(p, dst)
+            out.append(str(dst))
+    return out
+
+def package_store(paths: list[str], out: Path, level: int = 6, workers: int = release_store.WORKERS) -> dict:
+    """Release vía el almacén de contenido: comprime en paralelo solo lo nuevo y escribe el zip en flujo."""
+    # registro de artefactos: solo se leen los ficheros cuya huella (size, mtime_ns, inode) cambió
+    hashes = artifacts.sha256_many(paths)
+    blobs = release_store.put_many([(p, hashes[p]) for p in paths], level=level, workers=workers)
+    members = [{"name": p, "sha256": hashes[p], "mtime": artifacts.stat(p).st_mtime} for p in paths]
+    with open(out, "wb") as f:
+        size = release_store.write_zip(f, members)
+    listing = {"zip": str(out), "bytes": size,
+               "members": [{**m, "size": b["size"], "reused": b["reused"]} for m, b in zip(members, blobs)]}
+    out.with_suffix(".json").write_text(json.dumps(listing, indent=2), encoding="utf-8")
+    return listing
+
+def package_zipfile(paths: list[str], out: Path) -> None:
+    # modo original: un único zip comprimido en serie
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        for p in paths:
+            z.write(p)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Paquete de auditoría (zip)")
+    ap.add_argument("--mode", choices=["store", "zipfile"], default="store",
+                    help="store: almacén deduplicado en release/store + zip en flujo; zipfile: compresión en serie")
+    ap.add_argument("--level", type=int, default=6, help="nivel de deflate (modo store)")
+    ap.add_argument("--workers", type=int, default=release_store.WORKERS, help="hilos de compresión (modo store)")
+    args = ap.parse_args(argv)
+
     run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}"
     out = Path(f"release/audit/STEELTRACE_LAB_{run_id}.zip")
     out.parent.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
-        for p in ARTS:
-            if Path(p).exists():
-                z.write(p)
+    normalized = [p for p in (resolve_normalized(n) for n in NORMALIZED) if artifacts.exists(p)]
+    paths = [str(p) for p in normalized] + exports(normalized) + [p for p in ARTS if artifacts.exists(p)]
+    if args.mode == "zipfile":
+        package_zipfile(paths, out)
+    else:
+        listing = package_store(paths, out, args.level, args.workers)
+        reused = sum(m["reused"] for m in listing["members"])
+        print(f"Almacén: {reused}/{len(paths)} artefactos reutilizados de {release_store.STORE}")
     print("ZIP listo:", out)
 
 if __name__ == "__main__":
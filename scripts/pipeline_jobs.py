@@ -0,0 +1,169 @@
+import json, os, shutil, subprocess, sys, time, uuid
+from pathlib import Path
+
+# Registro de ejecuciones del pipeline en segundo plano (lo usa app.py). Cada
+# ejecución es un subproceso de pipeline_run.py con --events en
+# .cache/jobs/<id>/events.jsonl; cualquier sesión puede sondear ese fichero, así
+# que varios auditores ven la misma ejecución. running.lock impide lanzar una
+# segunda ejecución mientras la actual siga viva: se publica completo con
+# os.link (nunca vacío) y guarda pid + instante de arranque del proceso, para
+# que un pid reutilizado por otro proceso no pase por la ejecución en curso.
+# Un lock huérfano se retira apartándolo con os.rename y solo se descarta si es
+# el mismo que se leyó; si otra sesión ya lo había sustituido, se devuelve.
+
+ROOT = Path(__file__).resolve().parents[1]
+JOBS = ROOT / ".cache" / "jobs"
+LOCK = JOBS / "running.lock"
+PIPELINE = ROOT / "scripts" / "pipeline_run.py"
+
+class JobRunning(RuntimeError):
+    """Ya hay una ejecución en curso (job_id en .args[0])."""
+
+def _proc_stat(pid: int) -> list[str] | None:
+    # campos de /proc/<pid>/stat a partir del estado (el nombre puede llevar espacios)
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    return stat[stat.rfind(")") + 2:].split()
+
+def _start_time(pid: int) -> int | None:
+    """Instante de arranque del proceso (ticks desde el boot), o None sin /proc."""
+    fields = _proc_stat(pid)
+    return int(fields[19]) if fields else None
+
+def _alive(pid: int, start: int | None = None) -> bool:
+    # un hijo terminado queda como zombi hasta que alguien lo recoge
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass  # no es hijo de este proceso (otra sesión lo lanzó)
+    fields = _proc_stat(pid)
+    if fields is not None:
+        return fields[0] != "Z" and (start is None or int(fields[19]) == start)
+    if Path("/proc").is_dir():
+        return False
+    try:  # sin /proc solo queda kill(pid, 0)
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _read_lock() -> dict | None:
+    try:
+        return json.loads(LOCK.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def _lock_alive(lock: dict) -> bool:
+    return _alive(lock["pid"], lock.get("start"))
+
+def _write_lock(data: dict, create: bool) -> None:
+    # create: os.link falla con FileExistsError si ya hay lock; si no, se sustituye
+    tmp = JOBS / f"running.lock.{os.getpid()}.{data['job_id']}.tmp"
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    try:
+        if create:
+            os.link(tmp, LOCK)
+        else:
+            os.replace(tmp, LOCK)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def _discard(stale: dict) -> None:
+    # rename es atómico: o se aparta el lock huérfano leído o el de otra sesión,
+    # que se devuelve sin pisar uno que se haya creado entretanto
+    taken = JOBS / f"running.lock.{os.getpid()}.{uuid.uuid4().hex}.stale"
+    try:
+        os.rename(LOCK, taken)
+    except FileNotFoundError:
+        return  # otra sesión ya lo retiró
+    try:
+        lock = json.loads(taken.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        lock = None
+    if lock != stale:
+        try:
+            os.link(taken, LOCK)
+        except FileExistsError:
+            pass
+    taken.unlink(missing_ok=True)
+
+def current() -> str | None:
+    """job_id de la ejecución en curso, o None (libera un lock huérfano)."""
+    lock = _read_lock()
+    if lock is None:
+        return None
+    if _lock_alive(lock) and not status(lock["job_id"])["done"]:
+        return lock["job_id"]
+    _discard(lock)
+    return None
+
+def start(args: list[str] | None = None) -> str:
+    """Lanza pipeline_run.py en segundo plano y devuelve su job_id; JobRunning si ya hay una."""
+    JOBS.mkdir(parents=True, exist_ok=True)
+    running = current()
+    if running is not None:
+        raise JobRunning(running)
+    job_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:6]
+    # mientras se lanza, el lock apunta a este proceso; luego, al pipeline
+    try:
+        _write_lock({"job_id": job_id, "pid": os.getpid(), "start": _start_time(os.getpid())}, create=True)
+    except FileExistsError:
+        raise JobRunning((_read_lock() or {}).get("job_id"))
+    job = JOBS / job_id
+    try:
+        job.mkdir()
+        with open(job / "output.log", "wb") as log:
+            proc = subprocess.Popen([sys.executable, str(PIPELINE), "--events", str(job / "events.jsonl"), *(args or [])],
+                                    cwd=ROOT, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        _write_lock({"job_id": job_id, "pid": proc.pid, "start": _start_time(proc.pid)}, create=False)
+    except BaseException:
+        LOCK.unlink(missing_ok=True)
+        shutil.rmtree(job, ignore_errors=True)
+        raise
+    (JOBS / "latest").write_text(job_id, encoding="utf-8")
+    return job_id
+
+def latest() -> str | None:
+    try:
+        return (JOBS / "latest").read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+def status(job_id: str) -> dict:
+    """Progreso a partir de los eventos: pasos terminados, en curso, fallos y si acabó."""
+    out = {"job_id": job_id, "steps": [], "running": [], "finished": {}, "done": False, "ok": None, "error": None}
+    try:
+        lines = (JOBS / job_id / "events.jsonl").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        lines = []
+    for line in lines:
+        try:
+            e = json.loads(line)
+        except ValueError:
+            continue  # línea a medio escribir
+        if e["event"] == "start":
+            out["steps"] = e["steps"]
+        elif e["event"] == "step_start":
+            out["running"].append(e["step"])
+        elif e["event"] == "step_end":
+            out["running"] = [s for s in out["running"] if s != e["step"]]
+            out["finished"][e["step"]] = e
+        elif e["event"] == "done":
+            out.update(done=True, ok=e.get("ok"), error=e.get("error"))
+    out["progress"] = len(out["finished"]) / len(out["steps"]) if out["steps"] else 0.0
+    if not out["done"]:
+        # el proceso murió sin evento final (p.ej. matado): se da por terminado con error
+        lock = _read_lock()
+        if not (lock and lock["job_id"] == job_id and _lock_alive(lock)):
+            out.update(done=True, ok=False, error=out["error"] or "el proceso terminó sin evento final")
+    return out
+
+def output(job_id: str, tail: int = 4000) -> str:
+    try:
+        return (JOBS / job_id / "output.log").read_text(encoding="utf-8", errors="replace")[-tail:]
+    except OSError:
+        return ""
@@ -1,7 +1,11 @@
-import json, subprocess, time, sys
+import argparse, glob, gzip, importlib, io, json, os, shutil, subprocess, threading, time, sys, traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from statistics import quantiles
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from utils_hash import hash_stats, sha256_json
+import artifacts
+from slo_sketch import dd_add, dd_mean, dd_merge, dd_new, dd_quantile
 
 # Definimos los pasos del pipeline.
 # Usamos sys.executable para asegurar que se usa el mismo intérprete de Python.
@@ -14,8 +18,72 @@ STEPS = [
     ("EVIDENCE.build",  [sys.executable, "scripts/evidence_build.py"])
 ]
 
+# Especificación por paso:
+#   inputs/outputs: globs relativos a la raíz; un paso se salta si la huella de
+#     sus entradas coincide con la del manifiesto de caché y sus salidas siguen intactas.
+#   module/kwargs: función main() del script para el modo en proceso.
+#   after: dependencias del DAG (los pasos sin relación se ejecutan en paralelo).
+#   consumes: objetos en memoria que main() acepta de pasos anteriores
+#     (si el productor vino de caché, el paso los lee de disco como siempre).
+CODE = ["scripts/*.py"]
+STEP_SPEC = {
+    "MCP.ingest": {
+        "module": "mcp_ingest", "kwargs": {"argv": []}, "after": [],
+        "inputs": CODE + ["data/samples/*", "contracts/*.schema.json", "contracts/dq_rules.yaml"],
+        "outputs": ["data/normalized/*", "data/dq_report.json", "data/lineage.jsonl"],
+    },
+    "SHACL.validate": {
+        "module": "shacl_validate", "kwargs": {"argv": []}, "after": ["MCP.ingest"],
+        "inputs": CODE + ["data/normalized/*", "ontology/esrs.owl", "contracts/shacl_*.ttl"],
+        "outputs": ["ontology/validation.log", "ontology/linaje.ttl"],
+    },
+    "RAGA.compute": {
+        "module": "raga_compute", "kwargs": {"argv": []}, "after": ["MCP.ingest"],
+        "inputs": CODE + ["data/normalized/*", "rag/index.jsonl"],
+        "outputs": ["raga/kpis.json", "raga/explain.json", "raga/kpis_by_entity.parquet"],
+    },
+    "EEE.gate": {
+        "module": "eee_gate", "after": ["RAGA.compute", "SHACL.validate"], "consumes": ["kpis", "explain"],
+        "inputs": CODE + ["ops/eee_gate.yaml", "raga/kpis.json", "raga/explain.json", "ontology/validation.log"],
+        "outputs": ["ops/gate_report.json", "eee/eee_report.json"],
+    },
+    "XBRL.generate": {
+        "module": "xbrl_generate", "kwargs": {"argv": []}, "after": ["RAGA.compute"],
+        "consumes": ["kpis", "kpi_table"],
+        "inputs": CODE + ["raga/kpis.json", "raga/kpis_by_entity.parquet", "xbrl/schema/basic_xbrl.xsd"],
+        "outputs": ["xbrl/informe.xbrl", "xbrl/validation.log", "xbrl/entities/*/*.xbrl"],
+    },
+    "EVIDENCE.build": {
+        "module": "evidence_build", "after": ["SHACL.validate", "RAGA.compute", "EEE.gate", "XBRL.generate"],
+        "inputs": CODE + ["raga/*.json", "ontology/validation.log", "ontology/linaje.ttl",
+                          "ops/gate_report.json", "eee/eee_report.json", "xbrl/informe.xbrl", "xbrl/validation.log"],
+        "outputs": ["evidence/evidence_manifest.json", "evidence/tokens/*", "evidence/verify/*"],
+        "env": ["STEELTRACE_RUN_ID"],
+    },
+}
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
 SLO_FILE = Path("ops/slo_report.json")
 HISTORY  = Path("ops/slo_history.jsonl")
+SLO_SUMMARY = Path("ops/slo_summary.json")
+RECENT_RUNS = 20                 # ventana "últimas N ejecuciones"
+WINDOW_DAYS = 30                 # ventana temporal del reporte
+RETAIN_DAYS = 90                 # sketches diarios conservados
+ROTATE_BYTES = 8 * 1024 * 1024   # tamaño a partir del cual se rota el histórico
+CACHE_MANIFEST = Path(".cache/pipeline/manifest.json")
+
+# -------- Eventos de progreso --------
+# Con --events, cada inicio/fin de paso se añade como una línea JSON al fichero
+# (lo sondean app.py y pipeline_jobs para mostrar el progreso real de la ejecución).
+_events, _events_lock = None, threading.Lock()
+
+def emit(event: str, **fields) -> None:
+    if _events is None:
+        return
+    line = json.dumps({"event": event, "utc": datetime.utcnow().isoformat() + "Z", **fields}, ensure_ascii=False)
+    with _events_lock:
+        _events.write(line + "\n")
+        _events.flush()
 
 def run_step(name, cmd):
     t0 = time.perf_counter()
@@ -40,6 +108,89 @@ def run_step(name, cmd):
         "stderr": proc.stderr[-4000:]
     }
 
+class _ThreadStdout(io.TextIOBase):
+    # en modo en proceso varios pasos imprimen a la vez: cada hilo captura su salida
+    def __init__(self, base):
+        self.base, self.bufs = base, {}
+    def write(self, s):
+        buf = self.bufs.get(threading.get_ident())
+        if buf is not None:
+            buf.write(s)
+        return self.base.write(s)
+    def flush(self):
+        self.base.flush()
+
+def run_inproc(name, ctx: dict):
+    spec = STEP_SPEC[name]
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    out = sys.stdout.bufs.setdefault(threading.get_ident(), io.StringIO()) if isinstance(sys.stdout, _ThreadStdout) else None
+    t0, t1 = time.perf_counter(), None
+    ok, err, produced = True, "", None
+    try:
+        # la importación se mide aparte: rdflib, pandas, lxml... se cargan una sola vez
+        mod = importlib.import_module(spec["module"])
+        t1 = time.perf_counter()
+        kwargs = dict(spec.get("kwargs", {}))
+        kwargs.update({k: ctx[k] for k in spec.get("consumes", []) if k in ctx})
+        produced = mod.main(**kwargs)
+    except BaseException:
+        ok, err = False, traceback.format_exc()
+    t2 = time.perf_counter()
+    t1 = t1 or t2
+    if out is not None:
+        sys.stdout.bufs.pop(threading.get_ident(), None)
+
+    if not ok:
+        print(f"[{name}] FAILED:")
+        print(err)
+    else:
+        print(f"[{name}] OK ({t2 - t0:.2f}s, import {t1 - t0:.2f}s)")
+    if isinstance(produced, dict):
+        ctx.update(produced)
+    return {
+        "name": name,
+        "ok": ok,
+        "duration_sec": t2 - t0,
+        "import_sec": t1 - t0,
+        "work_sec": t2 - t1,
+        "stdout": out.getvalue()[-4000:] if out is not None else "",
+        "stderr": err[-4000:]
+    }
+
+# -------- Caché de pasos --------
+def expand(patterns: list[str]) -> list[str]:
+    return sorted({p for pat in patterns for p in glob.glob(pat) if Path(p).is_file()})
+
+def fingerprint(name: str, cmd: list[str]) -> str:
+    io = STEP_SPEC.get(name, {})
+    return sha256_json({
+        "cmd": cmd[1:],  # el intérprete concreto no cambia el resultado
+        "inputs": artifacts.sha256_many(expand(io.get("inputs", []))),
+        "env": {k: os.environ.get(k) for k in io.get("env", [])},
+    })
+
+def output_hashes(name: str) -> dict:
+    return artifacts.sha256_many(expand(STEP_SPEC.get(name, {}).get("outputs", [])))
+
+def load_cache() -> dict:
+    try:
+        return json.loads(CACHE_MANIFEST.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def save_cache(cache: dict) -> None:
+    CACHE_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    CACHE_MANIFEST.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+
+def is_hit(entry: dict | None, key: str) -> bool:
+    if not entry or entry.get("key") != key:
+        return False
+    outs = entry.get("outputs", {})
+    if not outs or not all(artifacts.exists(p) for p in outs):
+        return False
+    return artifacts.sha256_many(outs) == outs
+
 def p95(values):
     if not values:
         return None
@@ -48,44 +199,191 @@ def p95(values):
         return max(values)
     return quantiles(values, n=100)[94]
 
-def aggregate(history):
-    # history: lista de runs con pasos y duraciones
+# -------- Resumen SLO incremental --------
+# El histórico es solo de añadido; las métricas salen de un resumen por paso
+# con tamaño acotado (sketch global, sketches diarios y últimas N duraciones),
+# así que cada ejecución cuesta O(1) aunque el histórico crezca.
+def new_step_summary() -> dict:
+    return {"all": dd_new(), "days": {}, "recent": []}
+
+def update_summary(summary: dict, run: dict) -> None:
+    day = run["utc"][:10]
+    cutoff = (date.fromisoformat(day) - timedelta(days=RETAIN_DAYS)).isoformat()
+    for s in run["steps"]:
+        if s.get("cached"):
+            continue  # un acierto de caché no es una ejecución del paso
+        st = summary["steps"].setdefault(s["name"], new_step_summary())
+        v = s["duration_sec"]
+        dd_add(st["all"], v)
+        dd_add(st["days"].setdefault(day, dd_new()), v)
+        st["recent"] = (st["recent"] + [v])[-RECENT_RUNS:]
+        for d in [d for d in st["days"] if d < cutoff]:
+            del st["days"][d]
+
+def rebuild_summary() -> dict:
+    # solo si no existe el resumen (primera ejecución tras migrar): recorre el histórico una vez
+    summary = {"steps": {}}
+    if HISTORY.exists():
+        with open(HISTORY, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    update_summary(summary, json.loads(line))
+                except Exception:
+                    pass
+    return summary
+
+def load_summary() -> dict | None:
+    try:
+        return json.loads(SLO_SUMMARY.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+def sketch_stats(sk: dict) -> dict:
+    if not sk["count"]:
+        return {"count": 0}
+    r = lambda q: round(dd_quantile(sk, q), 4)
+    # mismo criterio que p95(): con pocas muestras, el máximo
+    hi = (lambda q: round(sk["max"], 4)) if sk["count"] < 20 else r
+    return {"count": sk["count"], "p50_sec": r(0.50), "p95_sec": hi(0.95), "p99_sec": hi(0.99),
+            "mean_sec": round(dd_mean(sk), 4)}
+
+def aggregate(summary: dict, today: str) -> dict:
+    since = (date.fromisoformat(today) - timedelta(days=WINDOW_DAYS - 1)).isoformat()
     agg = {}
-    for run in history:
-        for s in run["steps"]:
-            agg.setdefault(s["name"], []).append(s["duration_sec"])
-    return {k: {"count": len(v), "p95_sec": round(p95(v), 4), "mean_sec": round(sum(v)/len(v), 4)} for k,v in agg.items()}
+    for name, st in summary["steps"].items():
+        window = dd_new()
+        for d, sk in st["days"].items():
+            if d >= since:
+                window = dd_merge(window, sk)
+        recent = st["recent"]
+        agg[name] = {
+            **sketch_stats(st["all"]),
+            "windows": {
+                f"last_{RECENT_RUNS}_runs": {"count": len(recent), "p95_sec": round(p95(recent), 4),
+                                             "mean_sec": round(sum(recent)/len(recent), 4)} if recent else {"count": 0},
+                f"last_{WINDOW_DAYS}d": sketch_stats(window),
+            },
+        }
+    return agg
 
-def main():
-    Path("ops").mkdir(exist_ok=True)
+def rotate_history() -> Path | None:
+    # compacta el histórico en un .jsonl.gz cuando supera ROTATE_BYTES; el resumen no cambia
+    if not HISTORY.exists() or HISTORY.stat().st_size < ROTATE_BYTES:
+        return None
+    dst = HISTORY.with_name(f"{HISTORY.stem}.{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.jsonl.gz")
+    with open(HISTORY, "rb") as src, gzip.open(dst, "wb") as out:
+        shutil.copyfileobj(src, out)
+    HISTORY.unlink()
+    return dst
+
+def run_dag(mode: str, jobs: int, cache: dict) -> list[dict]:
+    """Ejecuta STEPS respetando 'after'; los pasos independientes van en paralelo."""
+    cmds = dict(STEPS)
+    pending = {n: set(STEP_SPEC.get(n, {}).get("after", [])) for n, _ in STEPS}
+    results, done, ctx, lock = {}, set(), {}, threading.Lock()
 
-    # Ejecutar secuencialmente
-    steps_results = []
-    for n, c in STEPS:
-        res = run_step(n, c)
-        steps_results.append(res)
-        # Si falla un paso crítico, podríamos detenernos,
-        # pero para el reporte SLO dejamos que corra lo que pueda o marcamos error.
-        # En este MVP, continuamos.
+    def task(n):
+        emit("step_start", step=n)
+        res = _task(n)
+        emit("step_end", step=n, ok=res["ok"], cached=res["cached"], duration_sec=res["duration_sec"],
+             stderr=res["stderr"][-2000:])
+        return res
+
+    def _task(n):
+        t0 = time.perf_counter()
+        key = fingerprint(n, cmds[n])
+        with lock:
+            hit = is_hit(cache.get(n), key)
+        if hit:
+            dur = time.perf_counter() - t0
+            print(f"[{n}] CACHED ({dur:.3f}s)")
+            return {"name": n, "ok": True, "cached": True, "duration_sec": dur, "stdout": "", "stderr": ""}
+        res = run_inproc(n, ctx) if mode == "inproc" else run_step(n, cmds[n])
+        res["cached"] = False
+        with lock:
+            if res["ok"]:
+                cache[n] = {"key": key, "outputs": output_hashes(n)}
+            else:
+                cache.pop(n, None)
+        return res
+
+    base_stdout = sys.stdout
+    if mode == "inproc":
+        sys.stdout = _ThreadStdout(base_stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+            running = {}
+            while pending or running:
+                for n in [n for n, _ in STEPS if n in pending and pending[n] <= done]:
+                    del pending[n]
+                    running[ex.submit(task, n)] = n
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    n = running.pop(f)
+                    results[n] = f.result()
+                    # Si falla un paso crítico, podríamos detenernos,
+                    # pero para el reporte SLO dejamos que corra lo que pueda o marcamos error.
+                    # En este MVP, continuamos.
+                    done.add(n)
+    finally:
+        sys.stdout = base_stdout
+    return [results[n] for n, _ in STEPS]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Orquestador STEELTRACE")
+    ap.add_argument("--force", action="store_true", help="ignora la caché y ejecuta todos los pasos")
+    ap.add_argument("--mode", choices=["inproc", "subprocess"], default="inproc",
+                    help="inproc: importa el main() de cada paso; subprocess: un intérprete por paso")
+    ap.add_argument("--jobs", type=int, default=4, help="pasos independientes en paralelo")
+    ap.add_argument("--events", help="fichero JSONL donde se añaden los eventos de progreso por paso")
+    args = ap.parse_args(argv)
+
+    global _events
+    if args.events:
+        Path(args.events).parent.mkdir(parents=True, exist_ok=True)
+        _events = open(args.events, "a", encoding="utf-8")
+    try:
+        _run(args)
+    except BaseException as e:
+        emit("done", ok=False, error=repr(e))
+        raise
+    finally:
+        if _events is not None:
+            _events.close()
+            _events = None
+
+def _run(args):
+    Path("ops").mkdir(exist_ok=True)
+    cache = {} if args.force else load_cache()
+    emit("start", steps=[n for n, _ in STEPS], mode=args.mode)
+    hash_stats(reset=True)
+    steps_results = run_dag(args.mode, args.jobs, cache)
+    save_cache(cache)
+    artifacts.flush()
 
     run = {"utc": datetime.utcnow().isoformat()+"Z", "steps": steps_results}
 
-    # Guardar histórico
-    current_history = HISTORY.read_text(encoding="utf-8") if HISTORY.exists() else ""
-    HISTORY.write_text(current_history + json.dumps(run) + "\n", encoding="utf-8")
+    # Guardar histórico (solo añadido)
+    with open(HISTORY, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
 
-    # Reconstruir métricas agregadas
-    hist = []
-    if HISTORY.exists():
-        for line in HISTORY.read_text(encoding="utf-8").splitlines():
-            try:
-                hist.append(json.loads(line))
-            except Exception:
-                pass
-
-    agg = aggregate(hist)
-    SLO_FILE.write_text(json.dumps({"utc": run["utc"], "agg": agg, "last_run": steps_results}, indent=2, ensure_ascii=False), encoding="utf-8")
+    # Actualizar el resumen incremental
+    summary = load_summary()
+    if summary is None:
+        summary = rebuild_summary()  # incluye ya este run
+    else:
+        update_summary(summary, run)
+    SLO_SUMMARY.write_text(json.dumps(summary), encoding="utf-8")
+    rotated = rotate_history()
+    if rotated:
+        print("Histórico SLO rotado →", rotated)
+
+    agg = aggregate(summary, run["utc"][:10])
+    cache_hits = [r["name"] for r in steps_results if r.get("cached")]
+    SLO_FILE.write_text(json.dumps({"utc": run["utc"], "agg": agg, "cache_hits": cache_hits, "hashing": hash_stats(), "last_run": steps_results}, indent=2, ensure_ascii=False), encoding="utf-8")
     print("SLO report →", SLO_FILE)
+    emit("done", ok=all(r["ok"] for r in steps_results),
+         failed=[r["name"] for r in steps_results if not r["ok"]], cache_hits=cache_hits)
 
 if __name__ == "__main__":
     main()
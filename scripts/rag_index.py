@@ -0,0 +1,186 @@
+import hashlib, json, math, mmap, re, struct
+from heapq import nlargest
+from pathlib import Path
+import artifacts
+
+# Índice de citas RAG: mapa id → pasaje e índice invertido de tokens (id, título
+# y snippet) con ranking BM25. Se serializa a un binario compacto que se abre
+# con mmap: solo las tablas de ids/tokens se decodifican al cargar; pasajes y
+# postings se leen del mapa bajo demanda. La cabecera guarda el sha256 de
+# index.jsonl (registro de artefactos) y se reconstruye cuando no coincide.
+
+IDX = Path("rag/index.jsonl")
+BIN = Path(".cache/rag/index.bin")
+MAGIC = b"STRAG002"
+# magic, sha256 de index.jsonl, n_docs, n_tokens y 6 offsets de sección (uint64, little endian)
+HEADER = struct.Struct("<8s32sQQ6Q")
+_TOKEN = re.compile(r"[^\W_]+")
+K1, B = 1.2, 0.75
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+def _doc_tokens(obj: dict) -> list[str]:
+    return tokenize(" ".join(str(obj.get(k) or "") for k in ("id", "title", "snippet")))
+
+def _strings(items: list[bytes]) -> tuple[bytes, bytes]:
+    # tabla de offsets (n+1 uint64) + blob concatenado
+    offs, pos = [0], 0
+    for b in items:
+        pos += len(b)
+        offs.append(pos)
+    return struct.pack(f"<{len(offs)}Q", *offs), b"".join(items)
+
+def build(src: Path = IDX, dst: Path = BIN) -> Path:
+    """Serializa index.jsonl a dst: pasajes, ids, longitudes y postings (doc, tf) por token."""
+    data = src.read_bytes()
+    docs, ids, lengths, postings = [], [], [], {}
+    for line in data.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        obj = json.loads(line)
+        n = len(docs)
+        docs.append(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        ids.append(str(obj["id"]).encode("utf-8"))
+        toks = _doc_tokens(obj)
+        lengths.append(len(toks))
+        tf = {}
+        for t in toks:
+            tf[t] = tf.get(t, 0) + 1
+        for t, c in tf.items():
+            postings.setdefault(t, []).append((n, c))
+    tokens = sorted(postings)
+    post_offs, flat = [0], []
+    for t in tokens:
+        for d, c in postings[t]:
+            flat += (d, c)
+        post_offs.append(len(flat) // 2)
+    sections = [
+        *_strings(docs), *_strings(ids),
+        struct.pack(f"<{len(lengths)}I", *lengths),
+        # tabla de tokens (offsets + blob) seguida de offsets de postings y postings
+        b"".join(_strings([t.encode("utf-8") for t in tokens]))
+        + struct.pack(f"<{len(post_offs)}Q", *post_offs) + struct.pack(f"<{len(flat)}I", *flat),
+    ]
+    # 6 secciones: doc_offs, doc_blob, id_offs, id_blob, lengths, tokens+postings
+    offs, pos = [], HEADER.size
+    for s in sections:
+        offs.append(pos)
+        pos += len(s)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, hashlib.sha256(data).digest(), len(docs), len(tokens), *offs))
+        for s in sections:
+            f.write(s)
+    tmp.replace(dst)
+    return dst
+
+class RagIndex:
+    """Vista sobre el binario mapeado en memoria."""
+
+    def __init__(self, path: Path = BIN):
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        mv = memoryview(self._mm)
+        magic, sha, n, n_tok, *offs = HEADER.unpack_from(mv, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: no es un índice RAG ({magic!r})")
+        self.src_sha256, self.n = sha.hex(), n
+        self._doc_offs = mv[offs[0]:offs[0] + 8 * (n + 1)].cast("Q")
+        self._doc_blob = offs[1]
+        id_offs = mv[offs[2]:offs[2] + 8 * (n + 1)].cast("Q")
+        id_blob = bytes(mv[offs[3]:offs[4]])
+        self.ids = {id_blob[id_offs[i]:id_offs[i + 1]].decode("utf-8"): i for i in range(n)}
+        self._lengths = mv[offs[4]:offs[4] + 4 * n].cast("I")
+        base = offs[5]
+        tok_offs = mv[base:base + 8 * (n_tok + 1)].cast("Q")
+        base += 8 * (n_tok + 1)
+        tok_blob = bytes(mv[base:base + tok_offs[n_tok]])
+        self.tokens = {tok_blob[tok_offs[i]:tok_offs[i + 1]].decode("utf-8"): i for i in range(n_tok)}
+        base += tok_offs[n_tok]
+        self._post_offs = mv[base:base + 8 * (n_tok + 1)].cast("Q")
+        base += 8 * (n_tok + 1)
+        self._postings = mv[base:base + 8 * self._post_offs[n_tok]].cast("I")
+        avgdl = (sum(self._lengths) / n) if n else 1.0
+        # término de normalización por longitud de BM25, precalculado por documento
+        self._norm = [K1 * (1 - B + B * l / avgdl) for l in self._lengths]
+
+    def doc(self, i: int) -> dict:
+        a, b = self._doc_offs[i], self._doc_offs[i + 1]
+        return json.loads(self._mm[self._doc_blob + a:self._doc_blob + b])
+
+    def get(self, id_: str) -> dict | None:
+        i = self.ids.get(id_)
+        return None if i is None else self.doc(i)
+
+    def get_many(self, ids: list[str]) -> list[dict]:
+        return [self.doc(self.ids[i]) for i in ids if i in self.ids]
+
+    def scores(self, query: str) -> dict[int, float]:
+        """Puntuación BM25 por documento para los tokens de la consulta."""
+        out = {}
+        for t in set(tokenize(query)):
+            k = self.tokens.get(t)
+            if k is None:
+                continue
+            a, b = self._post_offs[k], self._post_offs[k + 1]
+            df = b - a
+            idf = math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+            post, norm, w = self._postings[2 * a:2 * b], self._norm, idf * (K1 + 1)
+            for d, tf in zip(post[::2], post[1::2]):
+                out[d] = out.get(d, 0.0) + w * tf / (tf + norm[d])
+        return out
+
+    def matches(self, query: str, limit: int = 5, skip=()) -> list[int]:
+        """Búsqueda original en orden del índice: subcadena en el id o regex en el título."""
+        try:
+            title = re.compile(query, re.I).search
+        except re.error:
+            title = re.compile(re.escape(query), re.I).search
+        q, out = query.lower(), []
+        for i in range(self.n):
+            if len(out) >= limit:
+                break
+            if i in skip:
+                continue
+            obj = self.doc(i)
+            if q in str(obj["id"]).lower() or title(str(obj.get("title") or "")):
+                out.append(i)
+        return out
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        """Pasajes mejor puntuados; un id exacto va siempre primero y, si BM25 no llena
+        el límite (subcadenas de id, regex de título), se completa con la búsqueda original."""
+        sc = self.scores(query)
+        exact = self.ids.get(query)
+        if exact is not None:
+            sc[exact] = math.inf
+        top = [d for d, _ in nlargest(limit, sc.items(), key=lambda kv: (kv[1], -kv[0]))]
+        if len(top) < limit:
+            top += self.matches(query, limit - len(top), skip=set(top))
+        return [self.doc(d) for d in top]
+
+_LOADED: dict[tuple, RagIndex] = {}
+
+def _built_from(dst: Path) -> str | None:
+    # sha256 de index.jsonl guardado en la cabecera (None si falta o es de otro formato)
+    try:
+        with open(dst, "rb") as f:
+            head = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(head) < HEADER.size or head[:8] != MAGIC:
+        return None
+    return HEADER.unpack(head)[1].hex()
+
+def load(src: Path = IDX, dst: Path = BIN) -> RagIndex:
+    """Índice cargado una vez por proceso; se reconstruye si el sha256 de index.jsonl no es el de la cabecera."""
+    key, sha = (str(src), str(dst)), artifacts.sha256(src)
+    idx = _LOADED.get(key)
+    if idx is not None and idx.src_sha256 == sha:
+        return idx
+    if _built_from(dst) != sha:
+        build(src, dst)
+    _LOADED[key] = RagIndex(dst)
+    return _LOADED[key]
@@ -1,18 +1,19 @@
-import json, re
-from pathlib import Path
-IDX = Path("rag/index.jsonl")
+import json
+from rag_index import load
 
 def search(query: str, limit=5):
-    items = []
-    for line in IDX.read_text(encoding="utf-8").splitlines():
-        obj = json.loads(line)
-        hay = (query.lower() in obj["id"].lower()) or (re.search(query, obj["title"], re.I) is not None)
-        if hay:
-            items.append(obj)
-        if len(items) >= limit: break
-    return items
+    # búsqueda por palabras clave (BM25 sobre id, título y snippet); un id exacto va primero
+    return load().search(query, limit)
+
+def semantic_search(query: str, limit=5):
+    # vecinos más próximos en el índice vectorial (modelo local o hashing vectorizer)
+    import rag_vectors
+    hits = rag_vectors.load().search_batch([query], limit)[0]
+    return [{**load().get(id_), "score": round(score, 4)} for id_, score in hits]
 
 if __name__ == "__main__":
     import sys
-    q = sys.argv[1] if len(sys.argv)>1 else "E1"
-    print(json.dumps(search(q), indent=2, ensure_ascii=False))
+    args = [a for a in sys.argv[1:] if a != "--semantic"]
+    q = args[0] if args else "E1"
+    fn = semantic_search if "--semantic" in sys.argv else search
+    print(json.dumps(fn(q), indent=2, ensure_ascii=False))
@@ -0,0 +1,163 @@
+import hashlib, json, os
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import rag_index
+import artifacts
+
+# Recuperación vectorial de citas ESRS, sin red: los pasajes de rag/index.jsonl
+# se embeben por lotes en CPU con un modelo sentence-transformers ya cacheado en
+# local o, si no hay modelo, con un hashing vectorizer determinista. La matriz
+# float32 normalizada vive en un np.memmap y se indexa con HNSW (hnswlib, que
+# llega con chromadb); sin hnswlib se busca por producto escalar exacto.
+
+CACHE = Path(".cache/rag")
+MODEL = os.environ.get("STEELTRACE_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+HASH_DIM = 1024
+BATCH = 256
+QUERY_CACHE = 4096
+
+class HashingEmbedder:
+    """Tokens y bigramas con signo en HASH_DIM posiciones (blake2b), normalizado L2."""
+    name = f"hashing-{HASH_DIM}"
+    dim = HASH_DIM
+
+    def _features(self, text: str) -> list[str]:
+        toks = rag_index.tokenize(text)
+        return toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for f in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+                out[i, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+class SentenceEmbedder:
+    """Modelo sentence-transformers leído solo de la caché local (sin descargas)."""
+
+    def __init__(self, model: str = MODEL):
+        from sentence_transformers import SentenceTransformer
+        self._m = SentenceTransformer(model, device="cpu", local_files_only=True)
+        self.name, self.dim = model, self._m.get_sentence_embedding_dimension()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return self._m.encode(texts, batch_size=BATCH, convert_to_numpy=True,
+                              normalize_embeddings=True, show_progress_bar=False).astype(np.float32)
+
+def embedder(backend: str = "auto"):
+    if backend in ("auto", "model"):
+        try:
+            return SentenceEmbedder()
+        except Exception as e:  # sin paquete o sin modelo en caché: modo offline
+            if backend == "model":
+                raise
+            print(f"RAG vectores: hashing vectorizer ({type(e).__name__}: {e})")
+    return HashingEmbedder()
+
+def passage_text(doc: dict) -> str:
+    return " ".join(str(doc.get(k) or "") for k in ("id", "title", "snippet"))
+
+class VectorIndex:
+    def __init__(self, emb, vectors: np.ndarray, ids: list[str], ann=None):
+        self.emb, self.vectors, self.ids, self.ann = emb, vectors, ids, ann
+        self._qcache = OrderedDict()
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        """Embeddings de consulta con caché LRU: las hipótesis repetidas no se recalculan."""
+        missing = list(dict.fromkeys(t for t in texts if t not in self._qcache))
+        if missing:
+            for t, v in zip(missing, self.emb.encode(missing)):
+                self._qcache[t] = v
+        out = np.empty((len(texts), self.emb.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            self._qcache.move_to_end(t)
+            out[i] = self._qcache[t]
+        while len(self._qcache) > QUERY_CACHE:
+            self._qcache.popitem(last=False)
+        return out
+
+    def search_batch(self, texts: list[str], k: int = 3) -> list[list[tuple[str, float]]]:
+        """Top-k (id, similitud coseno) por consulta."""
+        if not texts or not self.ids:
+            return [[] for _ in texts]
+        k = min(k, len(self.ids))
+        q = self.embed_queries(texts)
+        if self.ann is not None:
+            self.ann.set_ef(max(50, 2 * k))
+            labels, dist = self.ann.knn_query(q, k=k)
+            sims = 1.0 - dist  # espacio "ip": distancia = 1 - producto escalar
+        else:
+            scores = q @ self.vectors.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+            labels = np.take_along_axis(top, order, axis=1)
+            sims = np.take_along_axis(scores, labels, axis=1)
+        return [[(self.ids[j], float(s)) for j, s in zip(row, srow)] for row, srow in zip(labels, sims)]
+
+def _build_ann(vectors: np.ndarray, path: Path):
+    try:
+        import hnswlib
+    except ImportError:
+        return None
+    ann = hnswlib.Index(space="ip", dim=vectors.shape[1])
+    ann.init_index(max_elements=max(1, len(vectors)), ef_construction=200, M=16)
+    if len(vectors):
+        ann.add_items(vectors, np.arange(len(vectors)))
+    ann.save_index(str(path))
+    return ann
+
+def _load_ann(path: Path, dim: int, n: int):
+    try:
+        import hnswlib
+    except ImportError:
+        return None
+    if not path.exists():
+        return None
+    ann = hnswlib.Index(space="ip", dim=dim)
+    ann.load_index(str(path), max_elements=max(1, n))
+    return ann
+
+def _stem(emb) -> str:
+    # un juego de ficheros por backend/modelo
+    return hashlib.sha256(emb.name.encode("utf-8")).hexdigest()[:12]
+
+def build(src: Path = rag_index.IDX, backend: str = "auto", cache: Path = CACHE) -> VectorIndex:
+    """Embebe los pasajes por lotes a un memmap float32 y construye el índice HNSW."""
+    return _build(src, embedder(backend), cache)
+
+def _build(src: Path, emb, cache: Path) -> VectorIndex:
+    idx = rag_index.load(src, cache / "index.bin")
+    ids = sorted(idx.ids, key=idx.ids.get)
+    stem = _stem(emb)
+    vec_path, ann_path = cache / f"vectors.{stem}.npy", cache / f"vectors.{stem}.hnsw"
+    cache.mkdir(parents=True, exist_ok=True)
+    vectors = np.lib.format.open_memmap(vec_path, mode="w+", dtype=np.float32, shape=(len(ids), emb.dim))
+    for a in range(0, len(ids), BATCH):
+        vectors[a:a + BATCH] = emb.encode([passage_text(idx.doc(i)) for i in range(a, min(a + BATCH, len(ids)))])
+    vectors.flush()
+    ann = _build_ann(np.asarray(vectors), ann_path)
+    meta = {"backend": emb.name, "dim": emb.dim, "n": len(ids), "src_sha256": artifacts.sha256(src),
+            "vectors": vec_path.name, "ann": ann_path.name if ann is not None else None, "ids": ids}
+    (cache / f"vectors.{stem}.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return VectorIndex(emb, np.load(vec_path, mmap_mode="r"), ids, ann)
+
+_LOADED: dict[tuple, VectorIndex] = {}
+
+def load(src: Path = rag_index.IDX, backend: str = "auto", cache: Path = CACHE) -> VectorIndex:
+    """Índice vectorial cargado una vez por proceso; se reconstruye si cambia index.jsonl o el modelo."""
+    key = (str(src), backend, str(cache))
+    if key in _LOADED:
+        return _LOADED[key]
+    emb = embedder(backend)
+    meta_path = cache / f"vectors.{_stem(emb)}.json"
+    vi = None
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta["src_sha256"] == artifacts.sha256(src) and (cache / meta["vectors"]).exists():
+            ann = _load_ann(cache / meta["ann"], meta["dim"], meta["n"]) if meta["ann"] else None
+            vi = VectorIndex(emb, np.load(cache / meta["vectors"], mmap_mode="r"), meta["ids"], ann)
+    _LOADED[key] = vi = vi or _build(src, emb, cache)
+    return vi
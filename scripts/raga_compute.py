@@ -1,64 +1,106 @@
-import json, pathlib, statistics
+import argparse, json, pathlib, statistics, time
 from pathlib import Path
+from kpi_engine import consolidated, kpi_table, load_partials, normalized_files, write_table
+import kpi_store, rag_index, rag_vectors
+
+KPI_TABLE = Path("raga/kpis_by_entity.parquet")
 
 def load_json(p): return json.loads(Path(p).read_text(encoding="utf-8"))
 
 def cite(ids: list[str]):
-    # carga el pequeño índice y devuelve solo las entradas pedidas
-    idx = [json.loads(l) for l in Path("rag/index.jsonl").read_text(encoding="utf-8").splitlines()]
-    by_id = {x["id"]: x for x in idx}
-    return [by_id[i] for i in ids if i in by_id]
+    # índice RAG cargado una vez por proceso (mapa id → pasaje)
+    return rag_index.load().get_many(ids)
 
-def compute_kpis():
-    # E1
-    e1 = load_json("data/normalized/energy_2024-01.json")
-    total_co2e = round(sum(r["kwh"]*r.get("emission_factor_co2e",0.23) for r in e1)/1000.0, 3)
+def compute_kpis(parts=None):
+    # KPIs consolidados de todas las entidades y periodos normalizados
+    parts = load_partials() if parts is None else parts
+    return consolidated(parts)
 
-    # S1
-    s1 = load_json("data/normalized/hr_2024-01.json")
-    s1r = s1[0] if s1 else {"employees_start":0,"employees_end":0,"exits":0}
-    avg_emp = (s1r["employees_start"] + s1r["employees_end"])/2 or 1
-    turnover = round(s1r["exits"]/avg_emp, 4)
+# hipótesis, dominio, evidencias y citas fijadas por datapoint; la evidencia
+# empieza por los normalizados del dominio que se han leído (todos los periodos).
+# Sin cita fijada (o si no está en el índice) se recupera por similitud con rag_vectors
+KPI_SPECS = {
+    "E1-1.total_co2e_tons": {
+        "hypothesis": "Σ(kWh_i * emission_factor_i)/1000",
+        "domain": "energy",
+        "evidence": ["ontology/validation.log"],
+        "citations": ["ESRS_E1_DR1"],
+    },
+    "S1-1.employee_turnover": {
+        "hypothesis": "Σ exits / mean_period(Σ mean(employees_start, employees_end))",
+        "domain": "hr",
+        "evidence": ["ontology/validation.log"],
+        "citations": ["ESRS_S1_DR1"],
+    },
+    "G1-1.resolution_rate_pct": {
+        "hypothesis": "closed_with_resolution / cases_closed * 100",
+        "domain": "ethics",
+        "evidence": ["ontology/validation.log"],
+        "citations": ["ESRS_G1_DR1"],
+    },
+}
 
-    # G1
-    g1 = load_json("data/normalized/ethics_2024-01.json")
-    g1r = g1[0] if g1 else {"cases_closed":0,"closed_with_resolution":0}
-    pct_resolution = round((g1r["closed_with_resolution"]/(g1r["cases_closed"] or 1))*100, 2)
+def retrieve(queries: list[str], k: int = 1) -> list[list[dict]]:
+    # una sola pasada de embedding + ANN para todas las consultas
+    hits = rag_vectors.load().search_batch(queries, k)
+    return [cite([id_ for id_, _ in h]) for h in hits]
 
-    return {
-        "E1-1.total_co2e_tons": total_co2e,
-        "S1-1.employee_turnover": turnover,
-        "G1-1.resolution_rate_pct": pct_resolution
-    }
+def explain(kpis: dict, k: int = 1):
+    out, pending = {}, []
+    for dp in kpis:
+        spec = KPI_SPECS.get(dp, {"hypothesis": dp, "evidence": ["ontology/validation.log"], "citations": []})
+        # los mismos ficheros que lee kpi_engine: la variante vigente de cada periodo
+        evidence = [str(p) for p in normalized_files(spec["domain"])] if "domain" in spec else []
+        evidence += spec["evidence"]
+        out[dp] = {"hypothesis": spec["hypothesis"], "evidence": evidence,
+                   "citations": cite(spec["citations"]), "residual": 0.0}
+        if not out[dp]["citations"]:
+            pending.append(dp)
+    if pending:
+        for dp, cits in zip(pending, retrieve([f"{dp} {out[dp]['hypothesis']}" for dp in pending], k)):
+            out[dp]["citations"] = cits
+    return out
 
-def explain(kpis: dict):
-    return {
-      "E1-1.total_co2e_tons": {
-        "hypothesis": "Σ(kWh_i * emission_factor_i)/1000",
-        "evidence": ["data/normalized/energy_2024-01.json","ontology/validation.log"],
-        "citations": cite(["ESRS_E1_DR1"]),
-        "residual": 0.0
-      },
-      "S1-1.employee_turnover": {
-        "hypothesis": "exits / mean(employees_start, employees_end)",
-        "evidence": ["data/normalized/hr_2024-01.json","ontology/validation.log"],
-        "citations": cite(["ESRS_S1_DR1"]),
-        "residual": 0.0
-      },
-      "G1-1.resolution_rate_pct": {
-        "hypothesis": "closed_with_resolution / cases_closed * 100",
-        "evidence": ["data/normalized/ethics_2024-01.json","ontology/validation.log"],
-        "citations": cite(["ESRS_G1_DR1"]),
-        "residual": 0.0
-      }
-    }
+def incremental_partials(verify: bool = False):
+    # solo los lotes nuevos/corregidos (por hash de linaje) tocan el store
+    t0 = time.perf_counter()
+    con = kpi_store.connect()
+    try:
+        stats = kpi_store.sync(con)
+        parts = kpi_store.cell_partials(con)
+        print(f"RAGA agregados: +{stats['added']} lotes, -{stats['retracted']} lotes, "
+              f"{stats['cells']} celdas actualizadas ({time.perf_counter() - t0:.3f}s)")
+        if verify:
+            ok = kpi_store.verify(con)
+            print("RAGA verificación contra reconstrucción completa:", "OK" if ok else "DIFERENCIAS")
+            if not ok:
+                raise SystemExit("agregados incrementales distintos de la reconstrucción completa (usa --full)")
+    finally:
+        con.close()
+    return parts
 
-def main():
-    kpis = compute_kpis()
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="KPIs ESRS + explicaciones RAGA")
+    ap.add_argument("--full", action="store_true",
+                    help="recalcula desde todos los normalizados sin usar el store de agregados")
+    ap.add_argument("--verify", action="store_true",
+                    help="comprueba el store incremental contra una reconstrucción completa")
+    args = ap.parse_args(argv)
+    parts = load_partials() if args.full else incremental_partials(args.verify)
+    kpis = compute_kpis(parts)
+    expl = explain(kpis)
     Path("raga").mkdir(exist_ok=True)
+    table = kpi_table(parts)
+    try:
+        write_table(table, KPI_TABLE)
+        print(f"RAGA tabla por entidad/periodo → {KPI_TABLE} ({len(parts)} celdas)")
+    except ImportError:
+        print(f"RAGA: sin {KPI_TABLE} (Parquet necesita pyarrow)")
     Path("raga/kpis.json").write_text(json.dumps(kpis, indent=2, ensure_ascii=False))
-    Path("raga/explain.json").write_text(json.dumps(explain(kpis), indent=2, ensure_ascii=False))
+    Path("raga/explain.json").write_text(json.dumps(expl, indent=2, ensure_ascii=False))
     print("RAGA OK → raga/kpis.json, raga/explain.json")
+    # pipeline_run (modo en proceso) pasa estos objetos a EEE.gate y XBRL.generate
+    return {"kpis": kpis, "explain": expl, "kpi_table": table}
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+import mmap, os, shutil, struct
+from pathlib import Path
+
+# Sidecar binario con el sha256 de cada registro normalizado (forma canónica de
+# utils_hash.canonical_json), indexado por ordinal: cabecera + n digests de 32
+# bytes, de modo que el hash del registro i está en HEADER.size + 32 * i.
+
+MAGIC = b"STREC001"
+HEADER = struct.Struct("<8sQ")  # magic, número de registros
+DIGEST = 32
+
+def sidecar_path(normalized: str | Path) -> Path:
+    return Path(f"{normalized}.sha256")
+
+class Writer:
+    """Escribe digests por lotes; la cabecera con el total se fija al cerrar."""
+
+    def __init__(self, path: str | Path):
+        self.path, self.n = Path(path), 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.path, "wb")
+        self.f.write(HEADER.pack(MAGIC, 0))
+
+    def write(self, digests: bytes) -> None:
+        self.f.write(digests)
+        self.n += len(digests) // DIGEST
+
+    def close(self) -> None:
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, self.n))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def count(path: str | Path) -> int:
+    with open(path, "rb") as f:
+        magic, n = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path}: no es un sidecar de hashes de registro")
+    return n
+
+def lookup(path: str | Path, i: int) -> str:
+    """sha256 (hex) del registro i."""
+    if not 0 <= i < count(path):
+        raise IndexError(i)
+    with open(path, "rb") as f:
+        f.seek(HEADER.size + DIGEST * i)
+        return f.read(DIGEST).hex()
+
+def digests(path: str | Path) -> bytes:
+    """Todos los digests concatenados (vía mmap, sin la cabecera)."""
+    n = count(path)
+    if not n:
+        return b""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return m[HEADER.size:HEADER.size + DIGEST * n]
+
+def merge(parts: list[Path], dst: Path) -> None:
+    # une los sidecars de los shards en orden (los ordinales siguen al normalizado unido)
+    with Writer(dst) as w:
+        for p in parts:
+            with open(p, "rb") as f:
+                f.seek(HEADER.size)
+                shutil.copyfileobj(f, w.f)
+            w.n += count(p)
+    for p in parts:
+        os.remove(p)
@@ -0,0 +1,106 @@
+import json, os, struct, time, zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Almacén de contenido para releases: cada artefacto se guarda una sola vez,
+# comprimido con deflate crudo, en release/store/<sha[:2]>/<sha>.deflate (+ .json
+# con crc32 y tamaños), indexado por el sha256 del contenido sin comprimir. Un
+# zip de release se escribe en flujo copiando esos blobs tras las cabeceras, así
+# que los artefactos que no cambian entre releases no se vuelven a comprimir.
+
+STORE = Path("release/store")
+BUF = 1 << 20
+WORKERS = min(8, os.cpu_count() or 1)
+
+def blob_path(sha: str, store: Path = STORE) -> Path:
+    return store / sha[:2] / f"{sha}.deflate"
+
+def _meta_path(sha: str, store: Path) -> Path:
+    return store / sha[:2] / f"{sha}.json"
+
+def meta(sha: str, store: Path = STORE) -> dict | None:
+    try:
+        return json.loads(_meta_path(sha, store).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def put(path: str | Path, sha: str, store: Path = STORE, level: int = 6) -> dict:
+    """Comprime path al almacén si su sha256 aún no está; devuelve los metadatos del blob."""
+    m = meta(sha, store)
+    if m is not None and blob_path(sha, store).exists():
+        return {**m, "reused": True}
+    dst = blob_path(sha, store)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.{id(dst)}.tmp")
+    comp, crc, size = zlib.compressobj(level, zlib.DEFLATED, -15), 0, 0
+    with open(path, "rb") as f, open(tmp, "wb") as out:
+        # zlib suelta el GIL al comprimir: varios blobs avanzan en paralelo en hilos
+        while chunk := f.read(BUF):
+            crc, size = zlib.crc32(chunk, crc), size + len(chunk)
+            out.write(comp.compress(chunk))
+        out.write(comp.flush())
+    m = {"size": size, "crc32": crc, "csize": tmp.stat().st_size, "level": level}
+    tmp.replace(dst)
+    _meta_path(sha, store).write_text(json.dumps(m), encoding="utf-8")
+    return {**m, "reused": False}
+
+def put_many(items: list[tuple[str, str]], store: Path = STORE, level: int = 6,
+             workers: int = WORKERS) -> list[dict]:
+    """items: [(path, sha256)]. Comprime en un pool de hilos los que falten en el almacén."""
+    if workers <= 1 or len(items) <= 1:
+        return [put(p, h, store, level) for p, h in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as ex:
+        return list(ex.map(lambda it: put(it[0], it[1], store, level), items))
+
+# -------- zip en flujo a partir de blobs --------
+_U32 = 0xFFFFFFFF
+
+def _dos_time(ts: float) -> tuple[int, int]:
+    t = time.localtime(max(ts, 315532800))  # zip no admite fechas anteriores a 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+def write_zip(out, members: list[dict], store: Path = STORE) -> int:
+    """
+    Escribe un zip (deflate, ZIP64 si hace falta) en el fichero binario out.
+    members: [{"name", "sha256", "mtime"}] con su blob ya en el almacén. Devuelve bytes escritos.
+    """
+    central, pos = [], 0
+    for m in members:
+        bm = meta(m["sha256"], store)
+        name = m["name"].encode("utf-8")
+        dtime, ddate = _dos_time(m.get("mtime", time.time()))
+        big = bm["size"] >= _U32 or bm["csize"] >= _U32
+        extra = struct.pack("<HHQQ", 1, 16, bm["size"], bm["csize"]) if big else b""
+        out.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 45 if big else 20, 0x0800, 8, dtime, ddate,
+                              bm["crc32"], _U32 if big else bm["csize"], _U32 if big else bm["size"],
+                              len(name), len(extra)) + name + extra)
+        offset = pos
+        pos += 30 + len(name) + len(extra)
+        with open(blob_path(m["sha256"], store), "rb") as f:
+            while chunk := f.read(BUF):
+                out.write(chunk)
+        pos += bm["csize"]
+        central.append((name, bm, dtime, ddate, offset))
+
+    cd_start = pos
+    for name, bm, dtime, ddate, offset in central:
+        z64 = [v for v in (bm["size"], bm["csize"]) if bm["size"] >= _U32 or bm["csize"] >= _U32]
+        if offset >= _U32:
+            z64.append(offset)
+        extra = struct.pack(f"<HH{len(z64)}Q", 1, 8 * len(z64), *z64) if z64 else b""
+        big = bool(z64)
+        rec = struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | (45 if big else 20), 45 if big else 20,
+                          0x0800, 8, dtime, ddate, bm["crc32"],
+                          _U32 if len(z64) >= 2 else bm["csize"], _U32 if len(z64) >= 2 else bm["size"],
+                          len(name), len(extra), 0, 0, 0, 0o100644 << 16, min(offset, _U32))
+        out.write(rec + name + extra)
+        pos += len(rec) + len(name) + len(extra)
+
+    n, cd_size = len(central), pos - cd_start
+    if n >= 0xFFFF or cd_start >= _U32 or cd_size >= _U32:
+        out.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, n, n, cd_size, cd_start))
+        out.write(struct.pack("<IIQI", 0x07064B50, 0, pos, 1))
+        pos += 56 + 20
+    out.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, min(n, 0xFFFF), min(n, 0xFFFF),
+                          min(cd_size, _U32), min(cd_start, _U32), 0))
+    return pos + 22
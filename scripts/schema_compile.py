@@ -0,0 +1,105 @@
+import os
+from pathlib import Path
+from jsonschema import Draft202012Validator
+from utils_hash import sha256_json
+
+# Compilación de los contratos planos de contracts/*.schema.json (objeto con
+# properties tipadas, required y additionalProperties) a una función Python
+# generada: check(rec) -> bool. Es conservadora: True garantiza que el registro
+# es válido; con False se ejecuta el validador completo para enumerar errores.
+# El código generado se cachea en disco por hash del schema.
+
+CACHE_DIR = Path(".cache/schemas")
+GENERATOR_VERSION = 1
+
+TOP_KEYS = {"$schema", "$id", "title", "description", "type", "properties", "required", "additionalProperties"}
+PROP_KEYS = {"type", "title", "description", "format", "minLength", "maxLength", "pattern",
+             "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"}
+
+# pruebas de tipo estrictas (bool no es integer; 1.0 integer cae al validador completo)
+TYPE_TESTS = {
+    "string": "isinstance(v, str)",
+    "integer": "type(v) is int",
+    "number": "(type(v) is int or type(v) is float)",
+    "boolean": "type(v) is bool",
+    "null": "v is None",
+}
+NUMERIC = {"minimum": "v < {!r}", "maximum": "v > {!r}",
+           "exclusiveMinimum": "v <= {!r}", "exclusiveMaximum": "v >= {!r}"}
+STRING = {"minLength": "len(v) < {!r}", "maxLength": "len(v) > {!r}"}
+
+_LOADED: dict[str, tuple] = {}
+
+def schema_hash(schema: dict) -> str:
+    return sha256_json({"generator": GENERATOR_VERSION, "schema": schema})
+
+def generate_source(schema: dict) -> str | None:
+    """Código fuente del checker, o None si el schema usa algo fuera del subconjunto plano."""
+    if set(schema) - TOP_KEYS or schema.get("type") != "object":
+        return None
+    props = schema.get("properties", {})
+    required = schema.get("required", [])
+    addl = schema.get("additionalProperties", True)
+    if addl not in (True, False):
+        return None
+
+    head = [
+        f"# {schema.get('title', 'schema')} sha256={schema_hash(schema)}",
+        "import re",
+        f"_REQ = frozenset({sorted(required)!r})",
+        f"_ALLOWED = frozenset({sorted(props)!r})",
+    ]
+    body = [
+        "def check(rec):",
+        "    if type(rec) is not dict: return False",
+        "    if not _REQ <= rec.keys(): return False",
+    ]
+    if addl is False:
+        body.append("    if not rec.keys() <= _ALLOWED: return False")
+
+    for i, (name, spec) in enumerate(props.items()):
+        if not isinstance(spec, dict) or set(spec) - PROP_KEYS or spec.get("type") not in TYPE_TESTS:
+            return None
+        t = spec["type"]
+        fails = [f"not {TYPE_TESTS[t]}"]
+        if t in ("integer", "number"):
+            fails += [tpl.format(spec[k]) for k, tpl in NUMERIC.items() if k in spec]
+        if t == "string":
+            fails += [tpl.format(spec[k]) for k, tpl in STRING.items() if k in spec]
+            if "pattern" in spec:
+                head.append(f"_P{i} = re.compile({spec['pattern']!r})")
+                fails.append(f"_P{i}.search(v) is None")
+        # 'format' es solo anotación para Draft202012Validator sin format_checker
+
+        indent = "    "
+        if name not in required:
+            body.append(f"    if {name!r} in rec:")
+            indent = "        "
+        body.append(f"{indent}v = rec[{name!r}]")
+        body.append(f"{indent}if {' or '.join(fails)}: return False")
+    body.append("    return True")
+    return "\n".join(head + [""] + body) + "\n"
+
+def _compile(source: str, origin: str):
+    ns = {}
+    exec(compile(source, origin, "exec"), ns)
+    return ns["check"]
+
+def get_checker(schema: dict) -> tuple:
+    """(check | None, Draft202012Validator) cacheados por hash del schema."""
+    h = schema_hash(schema)
+    if h in _LOADED:
+        return _LOADED[h]
+    cached = CACHE_DIR / f"{h}.py"
+    if cached.exists():
+        source = cached.read_text(encoding="utf-8")
+    else:
+        source = generate_source(schema)
+        if source is not None:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(source, encoding="utf-8")
+            tmp.replace(cached)
+    check = _compile(source, str(cached)) if source is not None else None
+    _LOADED[h] = (check, Draft202012Validator(schema))
+    return _LOADED[h]
@@ -0,0 +1,241 @@
+import re
+from datetime import date, datetime, time
+from decimal import Decimal
+from rdflib import Graph, Literal, BNode, URIRef, RDF, RDFS, OWL, XSD
+from rdflib.namespace import SH
+from pyshacl.rdfutil import stringify_node
+from pyshacl.rdfutil.compare import compare_literal
+
+# Validador SHACL nativo para la familia de shapes de contracts/shacl_*.ttl:
+# NodeShape con sh:targetClass y property shapes con sh:path (IRI), sh:datatype,
+# sh:minCount, sh:minInclusive y sh:pattern. Recorre los triples una sola vez
+# (grafo materializado o generador desde los registros), aplica la parte de RDFS
+# que afecta a los focus nodes (subClassOf/domain) y reproduce la semántica y el
+# texto de resultados de pyshacl. Si un shape o la ontología salen del
+# subconjunto, compile_shapes/rdfs_targets devuelven None y se usa pyshacl.
+
+NODE_KEYS = {RDF.type, SH.targetClass, SH.property}
+PROP_KEYS = {RDF.type, SH.path, SH.datatype, SH.minCount, SH.minInclusive, SH.pattern, SH.flags}
+SHAPE_TYPES = {SH.NodeShape, SH.PropertyShape}
+RESERVED = (str(RDF), str(RDFS), str(OWL), str(SH))
+
+# mismas comprobaciones de valor Python que pyshacl (_assert_actual_datatype)
+PY_TYPES = {
+    XSD.string: (str, bytes), RDF.langString: (str, bytes), XSD.integer: int, XSD.float: float,
+    XSD.decimal: Decimal, XSD.boolean: bool, XSD.date: date, XSD.time: time, XSD.dateTime: datetime,
+}
+
+def _actual(v: Literal, rule) -> bool:
+    t = PY_TYPES.get(rule)
+    return t is None or isinstance(v.value, t)
+
+def _datatype_test(rule):
+    def test(v):
+        if not isinstance(v, Literal):
+            return False
+        if v.datatype == rule:
+            return getattr(v, "ill_typed", None) is not True and _actual(v, rule)
+        if rule == RDFS.Literal:
+            return True
+        if rule == RDFS.Datatype and v.datatype:
+            return True
+        if v.datatype is None and v.language is None and rule == XSD.string:
+            return _actual(v, rule)
+        if rule == RDF.langString and v.language:
+            return _actual(v, rule)
+        return False
+    return test
+
+def _min_inclusive_test(m):
+    m_is_string = isinstance(m.value, str)
+    def test(v):
+        if not isinstance(v, Literal) or isinstance(v.value, str) != m_is_string:
+            return False
+        try:
+            return compare_literal(v, m) >= 0
+        except (TypeError, NotImplementedError):
+            return False
+    return test
+
+def _pattern_test(p, flags):
+    re_flags = 0
+    if flags is not None:
+        f = str(flags.value).lower()
+        re_flags |= (re.I if "i" in f else 0) | (re.M if "m" in f else 0)
+    rx = re.compile(str(p.value) if p.value is not None and len(p.value) > 1 else str(p), re_flags)
+    def test(v):
+        if isinstance(v, BNode):
+            return False
+        if isinstance(v, Literal) and v.value is not None and v.datatype in (None, RDF.langString, XSD.string):
+            s = str(v.value)
+        else:
+            s = str(v)
+        return rx.search(s) is not None
+    return test
+
+def _one(sg: Graph, node, pred):
+    vals = list(sg.objects(node, pred))
+    if len(vals) > 1:
+        raise ValueError(pred)
+    return vals[0] if vals else None
+
+def _memo(test):
+    # los literales se repiten mucho (fechas, periodos, ids): veredicto por término
+    cache = {}
+    def memo(v):
+        r = cache.get(v)
+        if r is None:
+            r = cache[v] = test(v)
+        return r
+    return memo
+
+def compile_shapes(sg: Graph) -> dict | None:
+    """Plan de validación para un grafo de shapes, o None si sale del subconjunto soportado."""
+    nodes = set(sg.subjects(RDF.type, SH.NodeShape))
+    props = {p for n in nodes for p in sg.objects(n, SH.property)}
+    # todo triple del fichero debe pertenecer a un shape y usar un predicado conocido
+    for s, p, o in sg:
+        allowed = NODE_KEYS if s in nodes else PROP_KEYS if s in props else None
+        if allowed is None or p not in allowed or (p == RDF.type and o not in SHAPE_TYPES):
+            return None
+    sev = stringify_node(sg, SH.Violation)
+    shapes = []
+    try:
+        for n in sorted(nodes):
+            targets = set(sg.objects(n, SH.targetClass))
+            if not targets or any(not isinstance(t, URIRef) or str(t).startswith(RESERVED) for t in targets):
+                return None
+            checks = []
+            for ps in sorted(props & set(sg.objects(n, SH.property))):
+                path = _one(sg, ps, SH.path)
+                if not isinstance(path, URIRef) or ps in nodes:
+                    return None
+                prop = {"path": path, "src": stringify_node(sg, ps), "path_s": stringify_node(sg, path),
+                        "min_count": None, "value": []}
+                dt, mc = _one(sg, ps, SH.datatype), _one(sg, ps, SH.minCount)
+                mi, pat, flags = _one(sg, ps, SH.minInclusive), _one(sg, ps, SH.pattern), _one(sg, ps, SH.flags)
+                if dt is not None:
+                    prop["value"].append(("DatatypeConstraintComponent", _memo(_datatype_test(dt)),
+                                          f"Value is not Literal with datatype {stringify_node(sg, dt)}"))
+                if mi is not None:
+                    if not isinstance(mi, Literal):
+                        return None
+                    prop["value"].append(("MinInclusiveConstraintComponent", _memo(_min_inclusive_test(mi)),
+                                          f"Value is not >= {stringify_node(sg, mi)}"))
+                if pat is not None:
+                    if not isinstance(pat, Literal):
+                        return None
+                    prop["value"].append(("PatternConstraintComponent", _memo(_pattern_test(pat, flags)),
+                                          f"Value does not match pattern '{pat.value}'"))
+                if mc is not None:
+                    if not isinstance(mc, Literal) or not isinstance(mc.value, int):
+                        return None
+                    prop["min_count"] = mc.value if mc.value > 0 else None
+                    prop["min_count_s"] = str(mc.value)
+                checks.append(prop)
+            shapes.append({"targets": targets, "props": checks})
+    except ValueError:
+        return None  # parámetros repetidos (p.ej. dos sh:datatype): lo resuelve pyshacl
+    return {"shapes": shapes, "sev": sev, "sg": sg}
+
+def rdfs_targets(schema: Graph, plans: list[dict]) -> dict | None:
+    """Clases objetivo alcanzables por rdf:type (+subClassOf) o rdfs:domain; None si hace falta más RDFS."""
+    targets = {t for plan in plans for sh in plan["shapes"] for t in sh["targets"]}
+    if next(iter(schema.triples((None, RDFS.subPropertyOf, None))), None) is not None:
+        return None
+    parents = {}
+    for c, sup in schema.subject_objects(RDFS.subClassOf):
+        parents.setdefault(c, set()).add(sup)
+
+    def supers(c):
+        seen, todo = {c}, [c]
+        while todo:
+            for sup in parents.get(todo.pop(), ()):
+                if sup not in seen:
+                    seen.add(sup); todo.append(sup)
+        return seen
+
+    if any(supers(r) & targets for r in schema.objects(None, RDFS.range)):
+        return None  # objetos tipados por rdfs:range: el one-pass por sujeto no basta
+    by_domain = {}
+    for p, d in schema.subject_objects(RDFS.domain):
+        hit = supers(d) & targets
+        if hit:
+            by_domain.setdefault(p, set()).update(hit)
+    cache = {}
+    def classes_of(t):
+        if t not in cache:
+            cache[t] = supers(t) & targets
+        return cache[t]
+    return {"classes_of": classes_of, "by_domain": by_domain}
+
+def _focus_results(plan: dict, focus, classes: set, vals: dict, ns: Graph) -> list[str]:
+    out, focus_s = [], None
+    for sh in plan["shapes"]:
+        if not (sh["targets"] & classes):
+            continue
+        for prop in sh["props"]:
+            values = vals.get(prop["path"], ())
+            fails = [(name, msg, v) for name, test, msg in prop["value"] for v in values if not test(v)]
+            short = prop["min_count"] is not None and len(values) < prop["min_count"]
+            if not fails and not short:
+                continue
+            focus_s = focus_s or stringify_node(ns, focus)
+            head = f"\tSeverity: {plan['sev']}\n\tSource Shape: {prop['src']}\n\tFocus Node: {focus_s}\n"
+            tail = f"\tResult Path: {prop['path_s']}\n"
+            for name, msg, v in fails:
+                out.append(f"Constraint Violation in {name} ({SH[name]}):\n" + head
+                           + f"\tValue Node: {stringify_node(ns, v)}\n" + tail + f"\tMessage: {msg}\n")
+            if short:
+                name = "MinCountConstraintComponent"
+                msg = f"Less than {prop['min_count_s']} values on {focus_s}->{prop['path_s']}"
+                out.append(f"Constraint Violation in {name} ({SH[name]}):\n" + head + tail + f"\tMessage: {msg}\n")
+    return out
+
+def validate(plans: list[dict], triples, schema: Graph, ns: Graph | None = None,
+             grouped: bool = False) -> list[tuple[bool, str]] | None:
+    """
+    Valida todos los planes en una pasada sobre `triples`. Con grouped=True el
+    llamador garantiza que los triples de cada sujeto llegan contiguos (p.ej.
+    generados registro a registro) y cada sujeto se evalúa y descarta al
+    cambiar: memoria acotada. Devuelve [(conforms, texto)] por plan.
+    """
+    rdfs = rdfs_targets(schema, plans)
+    if rdfs is None:
+        return None
+    ns = schema if ns is None else ns
+    classes_of, by_domain = rdfs["classes_of"], rdfs["by_domain"]
+    wanted = {prop["path"] for plan in plans for sh in plan["shapes"] for prop in sh["props"]}
+    wanted |= set(by_domain) | {RDF.type}
+    results = [[] for _ in plans]
+    subjects = {}
+
+    def flush(s, st):
+        classes = set()
+        for t in st.get(RDF.type, ()):
+            classes |= classes_of(t)
+        for p in st:
+            classes |= by_domain.get(p, set())
+        if classes:
+            for res, plan in zip(results, plans):
+                res += _focus_results(plan, s, classes, st, ns)
+
+    current = None
+    for s, p, o in triples:
+        if p not in wanted:
+            continue
+        if grouped and s is not current and s != current:
+            if current is not None:
+                flush(current, subjects.pop(current))
+            current = s
+        subjects.setdefault(s, {}).setdefault(p, set()).add(o)
+    for s, st in subjects.items():
+        flush(s, st)
+
+    reports = []
+    for res in results:
+        text = f"Validation Report\nConforms: {not res}\n"
+        if res:
+            text += f"Results ({len(res)}):\n" + "".join(sorted(res))
+        reports.append((not res, text))
+    return reports
@@ -1,8 +1,15 @@
-import json
+import argparse, os, shutil, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
 from datetime import datetime
 from rdflib import Graph, Namespace, Literal, RDF, XSD, URIRef
+from rdflib.namespace import SH
 from pyshacl import validate
+from owlrl import DeductiveClosure, RDFS_Semantics
+from jsonstream import iter_records, resolve_normalized
+from shacl_fast import compile_shapes, rdfs_targets, validate as fast_validate
 
 ROOT = Path(".")
 ONTOLOGY_FILE = ROOT / "ontology" / "esrs.owl"
@@ -11,101 +18,305 @@ SHACL_S1 = ROOT / "contracts" / "shacl_s1.ttl"
 SHACL_G1 = ROOT / "contracts" / "shacl_g1.ttl"
 OUT_VALIDATION = ROOT / "ontology" / "validation.log"
 OUT_LINEAGE    = ROOT / "ontology" / "linaje.ttl"
+RDF_STORE      = ROOT / ".cache" / "rdf_store"
+BATCH = 50_000  # quads por llamada a addN
 
 EX = Namespace("http://example.com/esrs#")
 
-def _load_json(path: Path):
-    return json.loads(path.read_text(encoding="utf-8"))
+# (clave del registro, propiedad, datatype) por dominio
+E1_FIELDS = [
+    ("company_id", EX.companyId, XSD.string),
+    ("period_start", EX.periodStart, XSD.date),
+    ("period_end", EX.periodEnd, XSD.date),
+    ("kwh", EX.kwh, XSD.decimal),
+    ("emission_factor_co2e", EX.emissionFactor, XSD.decimal),
+]
+S1_FIELDS = [
+    ("company_id", EX.companyId, XSD.string),
+    ("period", EX.period, XSD.string),
+    ("employees_start", EX.employeesStart, XSD.integer),
+    ("employees_end", EX.employeesEnd, XSD.integer),
+    ("exits", EX.exits, XSD.integer),
+]
+G1_FIELDS = [
+    ("company_id", EX.companyId, XSD.string),
+    ("period", EX.period, XSD.string),
+    ("cases_opened", EX.casesOpened, XSD.integer),
+    ("cases_closed", EX.casesClosed, XSD.integer),
+    ("closed_with_resolution", EX.closedWithResolution, XSD.integer),
+]
 
-def _add_evidence(g: Graph, subj: URIRef, ev_path: str):
+@lru_cache(maxsize=1 << 16, typed=True)
+def _lit(value, datatype) -> Literal:
+    # ids, fechas y periodos se repiten entre registros: un Literal por valor
+    return Literal(value, datatype=datatype)
+
+def _evidence_triples(subj: URIRef, ev_path: str):
     ev = URIRef(str(subj) + "/evidence/1")
-    g.add((subj, EX.hasEvidence, ev))
-    g.add((ev, RDF.type, EX.Evidencia))
-    g.add((ev, EX.evidencePath, Literal(ev_path, datatype=XSD.string)))
+    yield (subj, EX.hasEvidence, ev)
+    yield (ev, RDF.type, EX.Evidencia)
+    yield (ev, EX.evidencePath, _lit(ev_path, XSD.string))
 
-def materialize_e1(g: Graph, data_path: Path):
-    records = _load_json(data_path)
-    for i, r in enumerate(records, start=1):
+def e1_triples(data_path: Path):
+    # array JSON (modo batch), NDJSON (mcp_ingest --stream) o Parquet (solo las
+    # columnas mapeadas); triples contiguos por registro
+    for i, r in enumerate(iter_records(data_path, columns=[k for k, _, _ in E1_FIELDS]), start=1):
         subj = URIRef(f"http://example.com/esrs#E1Record/{i}")
-        g.add((subj, RDF.type, EX.E1Record))
-        if "company_id" in r: g.add((subj, EX.companyId, Literal(r["company_id"], datatype=XSD.string)))
-        if "period_start" in r: g.add((subj, EX.periodStart, Literal(r["period_start"], datatype=XSD.date)))
-        if "period_end" in r: g.add((subj, EX.periodEnd, Literal(r["period_end"], datatype=XSD.date)))
-        if "kwh" in r: g.add((subj, EX.kwh, Literal(r["kwh"], datatype=XSD.decimal)))
-        if "emission_factor_co2e" in r: g.add((subj, EX.emissionFactor, Literal(r["emission_factor_co2e"], datatype=XSD.decimal)))
-        _add_evidence(g, subj, ev_path=f"data/normalized/{data_path.name}")
+        yield (subj, RDF.type, EX.E1Record)
+        for k, prop, dtype in E1_FIELDS:
+            if k in r: yield (subj, prop, _lit(r[k], dtype))
+        yield from _evidence_triples(subj, ev_path=f"data/normalized/{data_path.name}")
 
-def materialize_s1(g: Graph, data_path: Path):
-    records = _load_json(data_path)
-    for i, r in enumerate(records, start=1):
+def s1_triples(data_path: Path):
+    for i, r in enumerate(iter_records(data_path, columns=[k for k, _, _ in S1_FIELDS]), start=1):
         subj = URIRef(f"http://example.com/esrs#S1Record/{i}")
-        g.add((subj, RDF.type, EX.S1Record))
-        for k, prop, dtype in [
-            ("company_id", EX.companyId, XSD.string),
-            ("period", EX.period, XSD.string),
-            ("employees_start", EX.employeesStart, XSD.integer),
-            ("employees_end", EX.employeesEnd, XSD.integer),
-            ("exits", EX.exits, XSD.integer),
-        ]:
-            if k in r: g.add((subj, prop, Literal(r[k], datatype=dtype)))
-        _add_evidence(g, subj, ev_path=f"data/normalized/{data_path.name}")
+        yield (subj, RDF.type, EX.S1Record)
+        for k, prop, dtype in S1_FIELDS:
+            if k in r: yield (subj, prop, _lit(r[k], dtype))
+        yield from _evidence_triples(subj, ev_path=f"data/normalized/{data_path.name}")
 
-def materialize_g1(g: Graph, data_path: Path):
-    records = _load_json(data_path)
-    for i, r in enumerate(records, start=1):
+def g1_triples(data_path: Path):
+    for i, r in enumerate(iter_records(data_path, columns=[k for k, _, _ in G1_FIELDS]), start=1):
         subj = URIRef(f"http://example.com/esrs#G1Record/{i}")
-        g.add((subj, RDF.type, EX.G1Record))
-        for k, prop, dtype in [
-            ("company_id", EX.companyId, XSD.string),
-            ("period", EX.period, XSD.string),
-            ("cases_opened", EX.casesOpened, XSD.integer),
-            ("cases_closed", EX.casesClosed, XSD.integer),
-            ("closed_with_resolution", EX.closedWithResolution, XSD.integer),
-        ]:
-            if k in r: g.add((subj, prop, Literal(r[k], datatype=dtype)))
-        _add_evidence(g, subj, ev_path=f"data/normalized/{data_path.name}")
-
-def run_shacl(data_graph: Graph, shape_path: Path, title: str) -> tuple[bool, str]:
-    sh = Graph(); sh.parse(shape_path, format="turtle")
+        yield (subj, RDF.type, EX.G1Record)
+        for k, prop, dtype in G1_FIELDS:
+            if k in r: yield (subj, prop, _lit(r[k], dtype))
+        yield from _evidence_triples(subj, ev_path=f"data/normalized/{data_path.name}")
+
+def materialize(g: Graph, triples, batch: int = BATCH):
+    # addN por lotes: una llamada al store por bloque en lugar de una por triple
+    buf = []
+    for s, p, o in triples:
+        buf.append((s, p, o, g))
+        if len(buf) >= batch:
+            g.addN(buf)
+            buf = []
+    if buf:
+        g.addN(buf)
+
+def materialize_e1(g: Graph, data_path: Path):
+    materialize(g, e1_triples(data_path))
+
+def materialize_s1(g: Graph, data_path: Path):
+    materialize(g, s1_triples(data_path))
+
+def materialize_g1(g: Graph, data_path: Path):
+    materialize(g, g1_triples(data_path))
+
+def write_ntriples(f, triples):
+    # N-Triples es también Turtle válido: linaje.ttl sigue leyéndose igual aguas abajo
+    f.writelines(f"{s.n3()} {p.n3()} {o.n3()} .\n" for s, p, o in triples)
+
+def tee_ntriples(f, triples):
+    """Escribe cada triple como N-Triples y lo vuelve a emitir (materializar y validar sin grafo)."""
+    for t in triples:
+        f.write(f"{t[0].n3()} {t[1].n3()} {t[2].n3()} .\n")
+        yield t
+
+def open_graph(store: str = "memory") -> Graph:
+    if store == "memory":
+        return Graph()
+    # store en disco (rdflib BerkeleyDB, requiere el paquete berkeleydb); se recrea en cada ejecución
+    shutil.rmtree(RDF_STORE, ignore_errors=True)
+    RDF_STORE.mkdir(parents=True)
+    g = Graph(store="BerkeleyDB")
+    try:
+        g.open(str(RDF_STORE), create=True)
+    except ImportError as e:
+        raise SystemExit(f"--store berkeleydb requiere el paquete berkeleydb ({e})")
+    return g
+
+def section(title: str, conforms: bool, results_text: str) -> str:
+    return f"=== {title} ===\nconforms = {conforms}\n" + results_text + "\n"
+
+def run_shacl(data_graph: Graph, sh: Graph, title: str, inference: str | None = "rdfs") -> tuple[bool, str]:
     conforms, _, results_text = validate(
         data_graph=data_graph, shacl_graph=sh,
-        inference="rdfs", abort_on_first=False,
+        inference=inference, abort_on_first=False,
         allow_infos=True, allow_warnings=True
     )
-    header = f"=== {title} ===\nconforms = {conforms}\n"
-    return conforms, header + results_text + "\n"
+    return conforms, section(title, conforms, results_text)
+
+def rdfs_closure(g: Graph) -> Graph:
+    """Copia de g con la clausura RDFS (la misma que aplica pyshacl con inference="rdfs")."""
+    inf = Graph()
+    for prefix, ns in g.namespaces():
+        inf.bind(prefix, ns, override=True, replace=True)
+    inf += g
+    DeductiveClosure(RDFS_Semantics).expand(inf)
+    return inf
+
+def partition(inf: Graph, classes) -> Graph:
+    """Subgrafo con los focus nodes de `classes` y lo alcanzable desde ellos (sin seguir rdf:type)."""
+    sub = Graph()
+    for prefix, ns in inf.namespaces():
+        sub.bind(prefix, ns, override=True, replace=True)
+    todo = list({s for c in classes for s in inf.subjects(RDF.type, c)})
+    seen = set(todo)
+    while todo:
+        s = todo.pop()
+        for t in inf.triples((s, None, None)):
+            sub.add(t)
+            o = t[2]
+            if t[1] != RDF.type and not isinstance(o, Literal) and o not in seen:
+                seen.add(o); todo.append(o)
+    return sub
+
+def _encode(t):
+    # los Literal se reconstruyen desde su valor Python, no desde el léxico: pyshacl
+    # comprueba el tipo del valor (p.ej. Literal(12300, xsd:decimal) sigue siendo int)
+    return tuple(("L", str(n), n.value, n.datatype, n.language) if isinstance(n, Literal) else n for n in t)
 
-def main():
+def _decode(n):
+    if not isinstance(n, tuple):
+        return n
+    _, lexical, value, datatype, lang = n
+    if value is None or lang:
+        return Literal(lexical, lang=lang, datatype=datatype)
+    return Literal(value, datatype=datatype)
+
+def _validate_partition(task: tuple) -> tuple[bool, str]:
+    # en el worker: el subgrafo viaja como triples + prefijos (mismos nombres en el reporte)
+    triples, prefixes, shapes_ttl, title = task
+    data = Graph()
+    for prefix, ns in prefixes:
+        data.bind(prefix, ns, override=True, replace=True)
+    data.addN((*map(_decode, t), data) for t in triples)
+    sh = Graph().parse(data=shapes_ttl, format="turtle")
+    return run_shacl(data, sh, title, inference=None)
+
+def run_pyshacl(g: Graph, pending: list[tuple[Graph, str]], workers: int, timings: dict) -> list[tuple[bool, str]]:
+    """
+    pyshacl para los shapes que el motor nativo no cubre: la inferencia RDFS se
+    calcula una vez sobre el grafo combinado y cada shape valida solo el
+    subgrafo de sus clases objetivo, en procesos paralelos.
+    """
+    t0 = time.perf_counter()
+    inf = rdfs_closure(g)
+    t1 = time.perf_counter()
+    prefixes = list(inf.namespaces())
+    tasks = []
+    for sg, title in pending:
+        sub = partition(inf, set(sg.objects(None, SH.targetClass)))
+        tasks.append(([_encode(t) for t in sub], prefixes, sg.serialize(format="turtle"), title))
+    del inf
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as ex:
+            out = list(ex.map(_validate_partition, tasks))
+    else:
+        out = [_validate_partition(t) for t in tasks]
+    timings["inference_s"] = t1 - t0
+    timings["partition_validate_s"] = time.perf_counter() - t1
+    return out
+
+def load_shapes(engine: str = "auto") -> list[tuple[str, Graph, dict | None]]:
+    """(título, shapes graph, plan nativo o None si va por pyshacl) para E1/S1/G1."""
+    shapes = [(SHACL_E1, "SHACL E1"), (SHACL_S1, "SHACL S1"), (SHACL_G1, "SHACL G1")]
+    out = []
+    for path, title in shapes:
+        sg = Graph().parse(path, format="turtle")  # una sola vez para ambos motores
+        out.append((title, sg, None if engine == "pyshacl" else compile_shapes(sg)))
+    return out
+
+def run_checks(g: Graph, engine: str = "auto", workers: int = 1, timings: dict | None = None,
+               shapes: list | None = None, triples=None) -> list[tuple[bool, str]]:
+    """
+    Valida E1/S1/G1: motor nativo (una pasada, sin inferencia) donde el shape lo
+    permite, pyshacl si no. Con `triples` (generados registro a registro) el motor
+    nativo valida el flujo y `g` solo aporta la ontología; el llamador garantiza
+    entonces que todos los shapes son nativos.
+    """
+    timings = {} if timings is None else timings
+    if shapes is None:
+        t0 = time.perf_counter()
+        shapes = load_shapes(engine)
+        timings["parse_shapes_s"] = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    plans = [plan for _, _, plan in shapes]
+    native = [pl for pl in plans if pl is not None]
+    source = g if triples is None else triples
+    reports = fast_validate(native, source, schema=g, grouped=triples is not None) if native else []
+    if reports is None:  # la ontología necesita más RDFS del que cubre el motor nativo
+        plans, reports = [None] * len(shapes), []
+    timings["native_s"] = time.perf_counter() - t1
+    if engine == "native" and None in plans:
+        raise SystemExit("motor nativo: shapes u ontología fuera del subconjunto soportado (usa --engine auto)")
+    pending = [(sg, title) for (title, sg, _), plan in zip(shapes, plans) if plan is None]
+    if pending and triples is not None:
+        raise ValueError("validación en flujo solo para shapes nativos")
+    fallback = iter(run_pyshacl(g, pending, workers, timings) if pending else [])
+    out, it = [], iter(reports)
+    for (title, _, _), plan in zip(shapes, plans):
+        if plan is None:
+            out.append(next(fallback))
+        else:
+            conforms, text = next(it)
+            out.append((conforms, section(title, conforms, text)))
+        print(f"{title}: {'nativo' if plan is not None else 'pyshacl'}")
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Validación SHACL E1/S1/G1 + linaje RDF")
+    ap.add_argument("--engine", choices=["auto", "native", "pyshacl"], default="auto",
+                    help="auto: validador nativo para el subconjunto soportado y pyshacl para el resto")
+    ap.add_argument("--workers", type=int, default=min(3, os.cpu_count() or 1),
+                    help="procesos para validar con pyshacl los subgrafos E1/S1/G1 en paralelo (1 = en proceso)")
+    ap.add_argument("--pretty-ttl", action="store_true",
+                    help="linaje.ttl como Turtle con prefijos (lento y con todo el grafo en memoria); por defecto N-Triples")
+    ap.add_argument("--store", choices=["memory", "berkeleydb"], default="memory",
+                    help="store rdflib del grafo de datos; berkeleydb lo mantiene en disco (.cache/rdf_store)")
+    args = ap.parse_args(argv)
     OUT_VALIDATION.parent.mkdir(parents=True, exist_ok=True)
 
-    g = Graph()
+    timings = {}
+    t0 = time.perf_counter()
+    shapes = load_shapes(args.engine)
+    timings["parse_shapes_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    g = open_graph(args.store)
     if ONTOLOGY_FILE.exists():
         g.parse(ONTOLOGY_FILE, format="turtle")
 
-    e1 = ROOT / "data" / "normalized" / "energy_2024-01.json"
-    s1 = ROOT / "data" / "normalized" / "hr_2024-01.json"
-    g1 = ROOT / "data" / "normalized" / "ethics_2024-01.json"
+    e1 = resolve_normalized(ROOT / "data" / "normalized" / "energy_2024-01.json")
+    s1 = resolve_normalized(ROOT / "data" / "normalized" / "hr_2024-01.json")
+    g1 = resolve_normalized(ROOT / "data" / "normalized" / "ethics_2024-01.json")
     for p in [e1, s1, g1]:
         if not p.exists():
             raise SystemExit(f"No existe {p}. Ejecuta primero mcp_ingest.py")
+    data = chain(e1_triples(e1), s1_triples(s1), g1_triples(g1))
 
-    materialize_e1(g, e1)
-    materialize_s1(g, s1)
-    materialize_g1(g, g1)
-
-    results = []
-    c1, t1 = run_shacl(g, SHACL_E1, "SHACL E1")
-    c2, t2 = run_shacl(g, SHACL_S1, "SHACL S1")
-    c3, t3 = run_shacl(g, SHACL_G1, "SHACL G1")
+    plans = [plan for _, _, plan in shapes]
+    streaming = (not args.pretty_ttl and args.store == "memory" and None not in plans
+                 and rdfs_targets(g, plans) is not None)
+    if streaming:
+        # sin grafo de datos: los triples se escriben a linaje.ttl (N-Triples) mientras se validan
+        # (native_s incluye entonces la lectura de registros y la escritura del linaje)
+        with open(OUT_LINEAGE, "w", encoding="utf-8") as f:
+            write_ntriples(f, g)
+            checks = run_checks(g, args.engine, args.workers, timings, shapes, triples=tee_ntriples(f, data))
+    else:
+        materialize(g, data)
+        timings["materialize_s"] = time.perf_counter() - t0
+        checks = run_checks(g, args.engine, args.workers, timings, shapes)
+        t0 = time.perf_counter()
+        if args.pretty_ttl:
+            g.serialize(destination=OUT_LINEAGE, format="turtle")
+        else:
+            with open(OUT_LINEAGE, "w", encoding="utf-8") as f:
+                write_ntriples(f, g)
+        timings["serialize_s"] = time.perf_counter() - t0
+    (c1, t1), (c2, t2), (c3, t3) = checks
 
     ts = datetime.utcnow().isoformat() + "Z"
     report = f"[{ts}] GLOBAL_CONFORMS = {all([c1,c2,c3])}\n\n" + t1 + "\n" + t2 + "\n" + t3
     OUT_VALIDATION.write_text(report, encoding="utf-8")
-    g.serialize(destination=OUT_LINEAGE, format="turtle")
+    if args.store != "memory":
+        g.close()
 
     print("SHACL GLOBAL:", "OK" if all([c1,c2,c3]) else "CONSTRAINTS FAILED")
     print(f"- Reporte: {OUT_VALIDATION}")
     print(f"- Linaje RDF: {OUT_LINEAGE}")
+    print("- Tiempos: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
 
 if __name__ == "__main__":
     main()
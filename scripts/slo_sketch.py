@@ -0,0 +1,67 @@
+import math
+
+# DDSketch mínimo sobre dicts serializables en JSON: cuantiles con error
+# relativo acotado (alpha) y tamaño acotado (max_bins), con inserción y merge
+# en O(1) respecto al número de muestras. Solo valores >= 0 (duraciones).
+
+def dd_new(alpha: float = 0.01, max_bins: int = 2048) -> dict:
+    return {"alpha": alpha, "max_bins": max_bins, "bins": {}, "zeros": 0,
+            "count": 0, "sum": 0.0, "min": None, "max": None}
+
+def _gamma(sk: dict) -> float:
+    return (1 + sk["alpha"]) / (1 - sk["alpha"])
+
+def _collapse(sk: dict) -> None:
+    # se pliegan los bins más bajos: el error relativo se conserva en los cuantiles altos (p95/p99)
+    bins = sk["bins"]
+    if len(bins) <= sk["max_bins"]:
+        return
+    keys = sorted(bins, key=int)
+    extra = len(keys) - sk["max_bins"]
+    target = keys[extra]
+    bins[target] += sum(bins.pop(k) for k in keys[:extra])
+
+def dd_add(sk: dict, v: float, n: int = 1) -> None:
+    v = float(v)
+    if v <= 1e-9:
+        sk["zeros"] += n
+    else:
+        k = str(math.ceil(math.log(v, _gamma(sk))))
+        sk["bins"][k] = sk["bins"].get(k, 0) + n
+        _collapse(sk)
+    sk["count"] += n
+    sk["sum"] += v * n
+    sk["min"] = v if sk["min"] is None else min(sk["min"], v)
+    sk["max"] = v if sk["max"] is None else max(sk["max"], v)
+
+def dd_merge(a: dict, b: dict) -> dict:
+    out = dd_new(a["alpha"], a["max_bins"])
+    for sk in (a, b):
+        for k, c in sk["bins"].items():
+            out["bins"][k] = out["bins"].get(k, 0) + c
+        out["zeros"] += sk["zeros"]
+        out["count"] += sk["count"]
+        out["sum"] += sk["sum"]
+        for f, fn in (("min", min), ("max", max)):
+            if sk[f] is not None:
+                out[f] = sk[f] if out[f] is None else fn(out[f], sk[f])
+    _collapse(out)
+    return out
+
+def dd_quantile(sk: dict, q: float) -> float | None:
+    if not sk["count"]:
+        return None
+    rank = q * (sk["count"] - 1)
+    if rank < sk["zeros"]:
+        return 0.0
+    seen = sk["zeros"]
+    g = _gamma(sk)
+    for k in sorted(sk["bins"], key=int):
+        seen += sk["bins"][k]
+        if seen > rank:
+            est = 2 * g ** int(k) / (g + 1)
+            return min(max(est, sk["min"]), sk["max"])
+    return sk["max"]
+
+def dd_mean(sk: dict) -> float | None:
+    return sk["sum"] / sk["count"] if sk["count"] else None
@@ -1,18 +1,27 @@
 from pathlib import Path
-import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import argparse, json, re, shutil
 from lxml import etree
 
 KPI_FILE = Path("raga/kpis.json")
+KPI_TABLE = Path("raga/kpis_by_entity.parquet")
 OUT_XML  = Path("xbrl/informe.xbrl")
+ENTITY_DIR = Path("xbrl/entities")
 XSD_FILE = Path("xbrl/schema/basic_xbrl.xsd")
 VAL_LOG  = Path("xbrl/validation.log")
+NS = "http://example.com/xbrl"
 
-def build_xml(entity="ACME", period="2024-01"):
+def _q(tag: str) -> str:
+    return f"{{{NS}}}{tag}"
+
+def build_xml(entity="ACME", period="2024-01", kpis: dict | None = None):
     ns = {"x": "http://example.com/xbrl"}
     root = etree.Element("{http://example.com/xbrl}Report", version="0.1")
     etree.SubElement(root, "{http://example.com/xbrl}Entity").text = entity
     etree.SubElement(root, "{http://example.com/xbrl}Period").text = period
-    kpis = json.loads(KPI_FILE.read_text(encoding="utf-8"))
+    if kpis is None:
+        kpis = json.loads(KPI_FILE.read_text(encoding="utf-8"))
     for k, v in kpis.items():
         kpi = etree.SubElement(root, "{http://example.com/xbrl}KPI")
         etree.SubElement(kpi, "{http://example.com/xbrl}Id").text = k
@@ -21,23 +30,124 @@ def build_xml(entity="ACME", period="2024-01"):
         # etree.SubElement(kpi, "{http://example.com/xbrl}Unit").text = "tCO2e"  # etc.
     return root
 
+def write_instance(path: Path, entity: str, period: str, kpis: dict) -> None:
+    # escritura incremental con etree.xmlfile: el árbol completo nunca está en memoria.
+    # Mismo formato que tree.write(pretty_print=True) de build_xml.
+    with open(path, "wb") as f:
+        with etree.xmlfile(f, encoding="UTF-8") as xf:
+            xf.write_declaration()
+            with xf.element(_q("Report"), {"version": "0.1"}, nsmap={"ns0": NS}):
+                for tag, text in (("Entity", entity), ("Period", period)):
+                    xf.write("\n  ")
+                    with xf.element(_q(tag)):
+                        xf.write(text)
+                for k, v in kpis.items():
+                    xf.write("\n  ")
+                    with xf.element(_q("KPI")):
+                        for tag, text in (("Id", k), ("Value", str(v))):
+                            xf.write("\n    ")
+                            with xf.element(_q(tag)):
+                                xf.write(text)
+                        xf.write("\n  ")
+                xf.write("\n")
+        f.write(b"\n")
+
+@lru_cache(maxsize=None)
+def compiled_schema(xsd: str = str(XSD_FILE)) -> etree.XMLSchema:
+    # el XSD se compila una vez por proceso
+    return etree.XMLSchema(etree.parse(xsd))
+
 def validate_xml(xml_tree):
-    schema_doc = etree.parse(str(XSD_FILE))
-    schema = etree.XMLSchema(schema_doc)
+    schema = compiled_schema()
     return schema.validate(xml_tree), schema.error_log
 
-def main():
+def _instances(chunk: list[tuple]) -> list[tuple]:
+    # en el worker: escribe y valida un bloque de instancias (path, entidad, periodo, kpis)
+    out = []
+    for path, entity, period, kpis in chunk:
+        write_instance(Path(path), entity, period, kpis)
+        ok, errors = validate_xml(etree.parse(path))
+        out.append((path, ok, "" if ok else str(errors)))
+    return out
+
+def _safe_name(s: str) -> str:
+    # un solo componente de ruta: sin separadores ni "." / ".." que salgan de out_dir
+    safe = re.sub(r"[^\w.-]", "_", s)
+    return "_" + safe if safe.strip(".") == "" else safe
+
+def entity_tasks(table, out_dir: Path = ENTITY_DIR) -> list[tuple]:
+    """Una instancia por (company_id, period) de la tabla de KPIs de raga."""
+    from kpi_engine import KPI_COLUMNS
+    cols = [c for c in KPI_COLUMNS if c in table.columns]
+    tasks, seen = [], {}
+    for row in table[["company_id", "period", *cols]].itertuples(index=False):
+        entity, period, values = str(row[0]), str(row[1]), row[2:]
+        path = str(out_dir / _safe_name(entity) / f"{_safe_name(period)}.xbrl")
+        if path in seen:
+            raise ValueError(f"{entity} {period} y {seen[path][0]} {seen[path][1]} van al mismo fichero {path}")
+        seen[path] = (entity, period)
+        tasks.append((path, entity, period, {c: float(v) for c, v in zip(cols, values)}))
+    return tasks
+
+def generate_entities(tasks: list[tuple], workers: int = 1, chunk_size: int = 100) -> list[tuple]:
+    """Escribe y valida las instancias; devuelve [(path, ok, errores)] en el orden de tasks."""
+    for d in {Path(p).parent for p, *_ in tasks}:
+        d.mkdir(parents=True, exist_ok=True)
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as ex:
+            return [r for rs in ex.map(_instances, chunks) for r in rs]
+    return [r for c in chunks for r in _instances(c)]
+
+def load_table():
+    try:
+        import pandas as pd
+        return pd.read_parquet(KPI_TABLE)
+    except (ImportError, OSError):
+        return None
+
+def report_context(table) -> tuple[str, str]:
+    """Entidad y periodo de la instancia consolidada: el perímetro de la tabla de KPIs."""
+    if table is None:
+        # sin raga/kpis_by_entity.parquet (pyarrow ausente): las claves salen de los normalizados
+        from kpi_engine import load_partials
+        table = load_partials().reset_index()
+    entities = sorted({str(v) for v in table["company_id"]})
+    periods = sorted({str(v) for v in table["period"]})
+    if not entities:
+        raise ValueError("tabla de KPIs vacía: no hay entidad ni periodo para la instancia consolidada")
+    period = periods[0] if len(periods) == 1 else f"{periods[0]}/{periods[-1]}"
+    return ",".join(entities), period
+
+def main(kpis: dict | None = None, kpi_table=None, argv=None):
+    ap = argparse.ArgumentParser(description="Instancias XBRL: consolidada y por entidad/periodo")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="procesos para escribir y validar instancias por entidad en paralelo")
+    ap.add_argument("--no-entities", action="store_true", help="solo la instancia consolidada")
+    args = ap.parse_args(argv)
+
     OUT_XML.parent.mkdir(parents=True, exist_ok=True)
-    xml = build_xml()
-    tree = etree.ElementTree(xml)
-    ok, errors = validate_xml(tree)
-    tree.write(str(OUT_XML), encoding="utf-8", xml_declaration=True, pretty_print=True)
+    if kpis is None:
+        kpis = json.loads(KPI_FILE.read_text(encoding="utf-8"))
+    table = kpi_table if kpi_table is not None else load_table()
+    write_instance(OUT_XML, *report_context(table), kpis)
+    ok, errors = validate_xml(etree.parse(str(OUT_XML)))
+    log = "XBRL basic schema validation: OK\n" if ok else "XBRL validation: FAILED\n" + str(errors)
+
+    if not args.no_entities and ENTITY_DIR.exists():
+        shutil.rmtree(ENTITY_DIR)  # sin instancias de entidades que ya no están en la tabla
+    if not args.no_entities and table is not None and len(table):
+        results = generate_entities(entity_tasks(table), args.workers)
+        failed = [(p, e) for p, good, e in results if not good]
+        log += f"Entity instances: {len(results) - len(failed)} OK, {len(failed)} FAILED ({ENTITY_DIR})\n"
+        log += "".join(f"{p}: {e}\n" for p, e in failed)
+        ok = ok and not failed
+        print(f"XBRL por entidad → {ENTITY_DIR} ({len(results)} instancias)")
+    VAL_LOG.write_text(log, encoding="utf-8")
 
     if ok:
-        VAL_LOG.write_text("XBRL basic schema validation: OK\n", encoding="utf-8")
         print("XBRL OK →", OUT_XML)
     else:
-        VAL_LOG.write_text("XBRL validation: FAILED\n" + str(errors), encoding="utf-8")
         print("XBRL FAILED. See", VAL_LOG)
 
 if __name__ == "__main__":